@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Dōsatsu Forecast Backtesting
+Rolling-origin evaluation of GenreForecaster backends on historical genre shares
+"""
+
+import io
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+from analysis.genre_forecaster import (
+    GenreForecaster, MAJOR_GENRES, _forecast_worker, _genre_slug, series_fingerprint
+)
+from analysis.forecast_backends import get_backend
+
+# Lead times scored, in weeks (1 month, 1 quarter, half a year, a year)
+HORIZONS = (4, 13, 26, 52)
+
+
+def rolling_origins(series, horizon, n_splits=8, step_weeks=26, min_train_weeks=156):
+    """
+    Forecast origins for a weekly ds/y series, oldest first
+    The latest origin leaves `horizon` weeks of actuals after it; earlier
+    ones step back `step_weeks` at a time while min_train_weeks remain
+    """
+    last = len(series) - horizon - 1
+    origins = list(range(last, min_train_weeks - 2, -step_weeks))[:n_splits]
+    return [series['ds'].iloc[i] for i in reversed(origins)]
+
+
+def score_points(points, horizons=HORIZONS):
+    """
+    MAE, MAPE and interval coverage per genre, backend and horizon
+    A horizon of h scores every forecast made 1 to h weeks ahead
+    """
+    rows = []
+    for horizon in horizons:
+        window = points[points['lead'] <= horizon]
+        for (genre, backend), group in window.groupby(['genre', 'backend'], sort=False):
+            error = (group['y'] - group['yhat']).abs()
+            nonzero = group['y'] > 0
+            rows.append({
+                'genre': genre,
+                'backend': backend,
+                'horizon': horizon,
+                'mae': error.mean(),
+                'mape': (error[nonzero] / group['y'][nonzero]).mean() * 100,
+                'coverage': group['y'].between(group['yhat_lower'], group['yhat_upper']).mean(),
+                'splits': group['origin'].nunique()
+            })
+    return pd.DataFrame(rows)
+
+
+class ForecastBacktest:
+    """
+    Backtest forecasting backends with rolling-origin splits
+
+    Each split trains on a genre's weekly series up to an origin (via
+    train_until_date) and forecasts the weeks after it. Splits are fitted in
+    parallel worker processes, and each split's forecast is cached in
+    cache_dir under a fingerprint of its training series and settings, so
+    reruns (and runs after new chart weeks arrive) only fit the new splits.
+
+    backends maps a label to (backend name, params), so several settings of
+    one backend can be compared; a list of backend names uses their defaults.
+    """
+
+    def __init__(self, forecaster=None, backends=None, horizons=HORIZONS, n_splits=8,
+                 step_weeks=26, min_train_weeks=156, cache_dir=None):
+        if forecaster is None:
+            forecaster = GenreForecaster()
+            forecaster.load_data()
+            forecaster.prepare_weekly_genre_data()
+        if backends is None:
+            backends = {forecaster.backend.name: (forecaster.backend.name, forecaster.backend_params)}
+        elif not isinstance(backends, dict):
+            backends = {name: (name, None) for name in backends}
+        if cache_dir is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            cache_dir = os.path.join(project_root, 'data', 'forecast_backtests')
+
+        self.forecaster = forecaster
+        self.backends = {
+            label: (name, {**get_backend(name).default_params, **(params or {})})
+            for label, (name, params) in backends.items()
+        }
+        self.horizons = sorted(horizons)
+        self.n_splits = n_splits
+        self.step_weeks = step_weeks
+        self.min_train_weeks = min_train_weeks
+        self.cache_dir = cache_dir
+        self.stats = {'splits': 0, 'cached': 0, 'fitted': 0, 'failed': 0}
+
+    def _splits(self, genres):
+        """(genre, label, origin, training series) for every split"""
+        horizon = self.horizons[-1]
+        for genre in genres:
+            series = self.forecaster._genre_series(genre)
+            for origin in rolling_origins(series, horizon, self.n_splits, self.step_weeks, self.min_train_weeks):
+                train = self.forecaster._genre_series(genre, train_until_date=origin)
+                for label in self.backends:
+                    yield genre, label, origin, train
+
+    def _split_path(self, genre, label, train):
+        name, params = self.backends[label]
+        fingerprint = series_fingerprint(train, {'backend': name, **params, 'periods': self.horizons[-1]})
+        return os.path.join(self.cache_dir, f"{_genre_slug(genre)}-{name}-{fingerprint}.json")
+
+    def _load_split(self, path):
+        try:
+            with open(path, 'r') as f:
+                return pd.read_json(io.StringIO(json.load(f)['forecast']), orient='split', convert_dates=['ds'])
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _store_split(self, path, genre, label, forecast):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        name, params = self.backends[label]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'genre': genre,
+                'backend': name,
+                'params': params,
+                'forecast': forecast.to_json(orient='split', date_format='iso', index=False, double_precision=15)
+            }, f)
+        os.replace(tmp_path, path)
+
+    def run(self, genres=None, workers=None, timeout=300):
+        """
+        Fit every split (cached ones are reused) and score them
+        workers=None uses one process per CPU, workers=1 fits in this process;
+        a split that fails or runs past `timeout` seconds is left out of the scores
+
+        Returns:
+            DataFrame of genre, backend, horizon, mae, mape, coverage, splits
+        """
+        genres = genres or [genre for genre in MAJOR_GENRES if genre in self.forecaster.genre_matrix.columns]
+        start = time.time()
+
+        forecasts = {}
+        to_fit = {}
+        for genre, label, origin, train in self._splits(genres):
+            self.stats['splits'] += 1
+            path = self._split_path(genre, label, train)
+            forecast = self._load_split(path)
+            if forecast is not None:
+                forecasts[genre, label, origin] = forecast
+                self.stats['cached'] += 1
+            else:
+                to_fit[genre, label, origin] = (path, train)
+
+        print(f"Backtesting {len(genres)} genres × {len(self.backends)} backends: "
+              f"{self.stats['splits']} splits ({self.stats['cached']} cached)")
+
+        workers = min(workers or os.cpu_count() or 1, max(len(to_fit), 1))
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        def finish(key, fit):
+            genre, label, origin = key
+            try:
+                _, forecast = fit()
+            except Exception as e:
+                print(f"  Could not fit {genre} / {label} at {origin:%Y-%m-%d}: {e}")
+                self.stats['failed'] += 1
+                return
+            self._store_split(to_fit[key][0], genre, label, forecast)
+            forecasts[key] = forecast
+            self.stats['fitted'] += 1
+            if self.stats['fitted'] % 25 == 0:
+                print(f"  {self.stats['fitted']}/{len(to_fit)} splits fitted ({time.time() - start:.0f}s)")
+
+        try:
+            if pool:
+                futures = {
+                    pool.submit(_forecast_worker, *self.backends[key[1]], train, self.horizons[-1], timeout): key
+                    for key, (path, train) in to_fit.items()
+                }
+                for future in as_completed(futures):
+                    finish(futures[future], future.result)
+            else:
+                for key, (path, train) in to_fit.items():
+                    finish(key, partial(_forecast_worker, *self.backends[key[1]], train, self.horizons[-1], timeout))
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+        print(f"✓ {self.stats['fitted']} fitted, {self.stats['failed']} failed in {time.time() - start:.1f}s")
+        return score_points(self._points(forecasts), self.horizons)
+
+    def _points(self, forecasts):
+        """One row per forecast week: the prediction, the actual and its lead time"""
+        actuals = {}
+        frames = []
+        for (genre, label, origin), forecast in forecasts.items():
+            if genre not in actuals:
+                actuals[genre] = self.forecaster._genre_series(genre)
+            merged = forecast.head(self.horizons[-1]).merge(actuals[genre], on='ds')
+            merged['lead'] = np.arange(1, len(merged) + 1)
+            merged['genre'] = genre
+            merged['backend'] = label
+            merged['origin'] = origin
+            frames.append(merged)
+
+        if not frames:
+            return pd.DataFrame(columns=['genre', 'backend', 'origin', 'lead', 'y', 'yhat', 'yhat_lower', 'yhat_upper'])
+        return pd.concat(frames, ignore_index=True)
+
+
+def print_report(scores):
+    """Per-backend averages across genres, then per-genre detail"""
+    print()
+    print("="*70)
+    print("BACKTEST SUMMARY (mean across genres)")
+    print("="*70)
+    summary = scores.groupby(['backend', 'horizon'])[['mae', 'mape', 'coverage']].mean().reset_index()
+    print(f"{'Backend':<20} {'Horizon':>8} {'MAE':>8} {'MAPE':>8} {'Coverage':>9}")
+    for _, row in summary.iterrows():
+        print(f"{row['backend']:<20} {row['horizon']:>6}wk {row['mae']:>7.2f}% {row['mape']:>7.1f}% {row['coverage']:>8.0%}")
+
+    print()
+    print("="*70)
+    print("BY GENRE")
+    print("="*70)
+    print(f"{'Genre':<12} {'Backend':<20} {'Horizon':>8} {'MAE':>8} {'MAPE':>8} {'Coverage':>9}")
+    for _, row in scores.sort_values(['genre', 'backend', 'horizon']).iterrows():
+        print(f"{row['genre']:<12} {row['backend']:<20} {row['horizon']:>6}wk "
+              f"{row['mae']:>7.2f}% {row['mape']:>7.1f}% {row['coverage']:>8.0%}")
+    print()
+
+
+def main():
+    """Usage: python -m analysis.forecast_backtest [backend ...]"""
+    backends = sys.argv[1:] or None
+
+    print("="*70)
+    print("DŌSATSU FORECAST BACKTEST")
+    print("="*70)
+    print()
+
+    backtest = ForecastBacktest(backends=backends)
+    print_report(backtest.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,115 @@
 #!/usr/bin/env python3
 """
 Dōsatsu Genre Forecaster
-Prophet-based forecasting for Billboard genre trends
+Forecasting for Billboard genre trends (NumPy Holt-Winters by default, Prophet opt-in)
 """
 
+import hashlib
+import io
 import json
+import re
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from prophet import Prophet
-from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import signal
+import threading
 import warnings
 import os
+from analysis.forecast_backends import get_backend
+from src.utils.cache_store import open_cache
 warnings.filterwarnings('ignore')
 
-class GenreForecaster:
-    """Forecast genre market share using Prophet"""
+MAJOR_GENRES = ['Hip-Hop', 'Pop', 'Country', 'R&B', 'Rock', 'Alternative', 'Latin']
+
+# Weeks of forecast stored with each persisted model (8 quarters)
+FORECAST_HORIZON = 104
+
+
+def series_fingerprint(series, params):
+    """Hash of a weekly ds/y series and the hyperparameters fitted on it"""
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode())
+    digest.update(series['ds'].to_numpy(dtype='datetime64[ns]').tobytes())
+    digest.update(series['y'].to_numpy(dtype='float64').tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _genre_slug(genre):
+    return re.sub(r'[^a-z0-9]+', '-', genre.lower()).strip('-')
+
+
+def quarterly_summary(weekly_forecast):
+    """Average a weekly forecast into quarters (the forecast_quarterly format)"""
+    weekly_forecast = weekly_forecast.copy()
+    weekly_forecast['quarter'] = pd.PeriodIndex(weekly_forecast['ds'], freq='Q')
+
+    quarterly = weekly_forecast.groupby('quarter').agg({
+        'yhat': 'mean',
+        'yhat_lower': 'mean',
+        'yhat_upper': 'mean'
+    }).reset_index()
+
+    results = []
+    for _, row in quarterly.iterrows():
+        results.append({
+            'quarter': str(row['quarter']),
+            'forecast': row['yhat'],
+            'lower_bound': row['yhat_lower'],
+            'upper_bound': row['yhat_upper'],
+            'confidence_95': row['yhat_upper'] - row['yhat_lower']
+        })
+
+    return results
+
 
-    def __init__(self, billboard_data_file=None, genre_cache_file=None):
+@contextmanager
+def time_limit(seconds):
+    """
+    Raise TimeoutError if the block runs longer than `seconds`
+    Needs SIGALRM on the main thread; elsewhere (Windows, Streamlit script threads) there is no limit
+    """
+    if not seconds or not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signum, frame):
+        raise TimeoutError(f"model fit exceeded {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _forecast_worker(backend_name, params, series, periods, timeout):
+    """Process-pool job: fit one genre and return (model JSON, weekly forecast)"""
+    with time_limit(timeout):
+        model = get_backend(backend_name)(params).fit(series)
+        forecast = model.predict(periods=periods)
+    return model.to_json(), forecast
+
+
+class GenreForecaster:
+    """
+    Forecast genre market share
+
+    The model comes from a pluggable backend (analysis/forecast_backends.py):
+    'holt_winters' (default) fits in milliseconds with only NumPy, while
+    'prophet' is the slower, opt-in high-accuracy mode. Both produce the
+    same ds/yhat/yhat_lower/yhat_upper frames.
+
+    Fitted models are saved to model_dir with FORECAST_HORIZON weeks of
+    forecast, keyed by a fingerprint of the genre's weekly series and the
+    hyperparameters. A new process loads them instead of refitting, and
+    serves forecasts from the stored frame, as long as the data hasn't changed.
+    """
+
+    def __init__(self, billboard_data_file=None, genre_cache_file=None, model_dir=None,
+                 backend='holt_winters', backend_params=None):
         # Use absolute paths relative to project root
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -25,103 +117,213 @@ class GenreForecaster:
             billboard_data_file = os.path.join(project_root, 'data', 'billboard', 'billboard_67years.json')
         if genre_cache_file is None:
             genre_cache_file = os.path.join(project_root, 'data', 'billboard', 'hybrid_genre_cache.json')
+        if model_dir is None:
+            model_dir = os.path.join(project_root, 'data', 'forecast_models')
 
         self.billboard_data_file = billboard_data_file
         self.genre_cache_file = genre_cache_file
+        self.model_dir = model_dir
+        self.backend = get_backend(backend)
+        self.backend_params = {**self.backend.default_params, **(backend_params or {})}
         self.billboard_data = None
         self.genre_cache = None
-        self.weekly_genre_data = None
+        self.genre_matrix = None       # chart date x genre percentages (NaN when a genre didn't chart)
+        self.weekly_matrix = None      # genre_matrix resampled to weeks, gaps interpolated
+        self.weekly_genre_data = None  # long date/genre/percentage view of genre_matrix
         self.models = {}
+        self.forecasts = {}  # genre -> stored weekly forecast frame
 
     def load_data(self):
         """Load Billboard and genre cache data"""
         with open(self.billboard_data_file, 'r') as f:
             self.billboard_data = json.load(f)
 
-        with open(self.genre_cache_file, 'r') as f:
-            self.genre_cache = json.load(f)
+        # Through open_cache so log entries (or the shared metadata store) are included
+        self.genre_cache = dict(open_cache(self.genre_cache_file, 'artists', 'hybrid').items())
 
     def prepare_weekly_genre_data(self):
         """
         Convert Billboard data to weekly genre percentages
+        Builds genre_matrix and weekly_matrix (one column per genre)
         Returns DataFrame with columns: date, genre, percentage
         """
-        weekly_data = []
-
-        for date_str, chart in self.billboard_data.items():
-            date = pd.to_datetime(date_str)
-
-            # Count genres for this week (top 40)
-            genre_counts = Counter()
-            for song in chart[:40]:
-                artist = song.get('artist')
-                artist_data = self.genre_cache.get(artist)
-                if artist_data:
-                    genre = artist_data.get('dosatsu_genre', 'Unknown')
-                else:
-                    genre = 'Unknown'
-
-                if genre and genre != 'Unknown':
-                    genre_counts[genre] += 1
-
-            # Calculate percentages
-            total = sum(genre_counts.values())
-            if total > 0:
-                for genre, count in genre_counts.items():
-                    percentage = (count / total) * 100
-                    weekly_data.append({
-                        'date': date,
-                        'genre': genre,
-                        'percentage': percentage
-                    })
-
-        self.weekly_genre_data = pd.DataFrame(weekly_data)
+        self._set_genre_matrix(self._genre_matrix(list(self.billboard_data)))
         return self.weekly_genre_data
 
+    def _genre_matrix(self, date_strs):
+        """Chart date x genre percentages of the top 40 for the given chart dates"""
+        charts = [self.billboard_data[date_str][:40] for date_str in date_strs]
+        artists = pd.Series([song.get('artist') for chart in charts for song in chart], dtype=object)
+        weeks = np.repeat(np.arange(len(charts)), [len(chart) for chart in charts])
+
+        # Artists without a known genre don't count toward the total
+        artist_genres = {
+            artist: data['dosatsu_genre'] for artist, data in self.genre_cache.items()
+            if data and data.get('dosatsu_genre') not in (None, '', 'Unknown')
+        }
+        codes, genres = pd.factorize(artists.map(artist_genres), sort=True)
+        known = codes >= 0
+
+        counts = np.bincount(
+            weeks[known] * len(genres) + codes[known], minlength=len(charts) * len(genres)
+        ).reshape(len(charts), len(genres))
+        totals = counts.sum(axis=1)
+        charted = totals > 0
+
+        with np.errstate(invalid='ignore'):
+            percentages = np.where(counts > 0, counts / totals[:, None] * 100, np.nan)
+
+        return pd.DataFrame(
+            percentages[charted],
+            index=pd.DatetimeIndex(pd.to_datetime(np.array(date_strs)[charted]), name='date'),
+            columns=pd.Index(genres, name='genre')
+        )
+
+    def _set_genre_matrix(self, matrix):
+        """Store the genre matrix and derive the weekly series and long view from it"""
+        self.genre_matrix = matrix.sort_index().dropna(axis=1, how='all')
+        self.weekly_matrix = self._resample_weekly(self.genre_matrix)
+        self.weekly_genre_data = self.genre_matrix.reset_index().melt(
+            id_vars='date', value_name='percentage'
+        ).dropna(subset=['percentage']).sort_values(['date', 'genre']).reset_index(drop=True)
+
+    @staticmethod
+    def _resample_weekly(matrix):
+        """Weekly means, with gaps between a genre's first and last chart week interpolated"""
+        return matrix.resample('W').mean().interpolate(method='linear', limit_area='inside')
+
+    def apply_genre_changes(self, changes):
+        """
+        Update weekly genre data after artists were remapped, without a full rebuild
+
+        Args:
+            changes: List of {'artist', 'new_genre'} dicts
+                     (e.g. HybridClassifier.remap_cache()['changes'])
+
+        Returns:
+            List of chart dates whose genre percentages changed
+        """
+        changed_artists = {}
+        for change in changes:
+            changed_artists[change['artist']] = change['new_genre']
+            entry = self.genre_cache.get(change['artist'])
+            if entry:
+                entry['dosatsu_genre'] = change['new_genre']
+
+        if not changed_artists:
+            return []
+
+        affected_dates = [
+            date_str for date_str, chart in self.billboard_data.items()
+            if any(song.get('artist') in changed_artists for song in chart[:40])
+        ]
+
+        # Replace only the affected weeks
+        kept = self.genre_matrix.drop(index=pd.to_datetime(affected_dates), errors='ignore')
+        self._set_genre_matrix(pd.concat([kept, self._genre_matrix(affected_dates)]))
+
+        # Models trained on the old series are stale
+        stale_genres = set(changed_artists.values()) | {
+            change.get('old_genre') for change in changes
+        }
+        for genre in stale_genres:
+            self.models.pop(genre, None)
+            self.forecasts.pop(genre, None)
+
+        return affected_dates
+
     def train_genre_model(self, genre, train_until_date=None):
         """
-        Train Prophet model for a specific genre
+        Train the forecasting model for a specific genre
 
         Args:
             genre: Genre name (e.g., 'Hip-Hop', 'Pop')
             train_until_date: Train only up to this date (for backtesting)
 
         Returns:
-            Fitted Prophet model
+            Fitted ForecastBackend
         """
-        # Filter data for this genre
-        genre_data = self.weekly_genre_data[
-            self.weekly_genre_data['genre'] == genre
-        ].copy()
+        series = self._genre_series(genre, train_until_date)
 
+        # Backtest models are never persisted
         if train_until_date:
-            genre_data = genre_data[genre_data['date'] <= train_until_date]
+            self.models[genre] = self.backend(self.backend_params).fit(series)
+            self.forecasts.pop(genre, None)
+            return self.models[genre]
 
-        # Prepare for Prophet (requires 'ds' and 'y' columns)
-        df = pd.DataFrame({
-            'ds': genre_data['date'],
-            'y': genre_data['percentage']
-        })
+        fingerprint = self._fingerprint(series)
+        if self._load_model(genre, fingerprint):
+            return self.models[genre]
 
-        # Fill missing weeks with interpolation
-        df = df.set_index('ds').resample('W').mean().interpolate(method='linear').reset_index()
+        model = self.backend(self.backend_params).fit(series)
+        self._store_model(genre, fingerprint, model, model.predict(FORECAST_HORIZON))
+        return model
 
-        # Train Prophet model
-        model = Prophet(
-            yearly_seasonality=True,
-            weekly_seasonality=False,
-            daily_seasonality=False,
-            changepoint_prior_scale=0.05,  # Flexibility for trend changes
-            seasonality_mode='multiplicative'
-        )
+    def _fingerprint(self, series):
+        return series_fingerprint(series, {'backend': self.backend.name, **self.backend_params})
+
+    def _model_path(self, genre, fingerprint):
+        return os.path.join(self.model_dir, f"{_genre_slug(genre)}-{self.backend.name}-{fingerprint}.json")
 
-        # Suppress Prophet's verbose output
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            model.fit(df)
+    def _load_model(self, genre, fingerprint):
+        """Load a persisted model and forecast if one matches the fingerprint"""
+        try:
+            with open(self._model_path(genre, fingerprint), 'r') as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
 
+        self.models[genre] = self.backend.from_json(saved['model'])
+        self.forecasts[genre] = pd.read_json(io.StringIO(saved['forecast']), orient='split', convert_dates=['ds'])
+        return True
+
+    def _store_model(self, genre, fingerprint, model, forecast):
+        """Keep a fitted model in memory and on disk, replacing the genre's older files"""
         self.models[genre] = model
-        return model
+        self.forecasts[genre] = forecast
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        path = self._model_path(genre, fingerprint)
+        old_file = re.compile(rf"{re.escape(_genre_slug(genre))}-{self.backend.name}-[0-9a-f]{{16}}\.json")
+        for name in os.listdir(self.model_dir):
+            if old_file.fullmatch(name) and name != os.path.basename(path):
+                os.remove(os.path.join(self.model_dir, name))
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'genre': genre,
+                'fingerprint': fingerprint,
+                'backend': self.backend.name,
+                'params': self.backend_params,
+                'model': model.to_json(),
+                'forecast': forecast.to_json(orient='split', date_format='iso', index=False, double_precision=15)
+            }, f)
+        os.replace(tmp_path, path)
+
+    def load_models(self, genres=None):
+        """
+        Load every persisted model whose fingerprint matches the current data
+        Returns the genres loaded
+        """
+        loaded = []
+        for genre in genres or MAJOR_GENRES:
+            if genre in self.models or genre not in self.genre_matrix.columns:
+                continue
+            if self._load_model(genre, self._fingerprint(self._genre_series(genre))):
+                loaded.append(genre)
+        return loaded
+
+    def _genre_series(self, genre, train_until_date=None):
+        """Weekly ds/y frame for one genre, gaps interpolated"""
+        if train_until_date:
+            # Resampled separately so the last training weeks aren't interpolated toward later data
+            weekly = self._resample_weekly(self.genre_matrix.loc[:train_until_date, [genre]])[genre]
+        else:
+            weekly = self.weekly_matrix[genre]
+
+        weekly = weekly.dropna()
+        return pd.DataFrame({'ds': weekly.index, 'y': weekly.to_numpy()})
 
     def forecast_genre(self, genre, periods=52, frequency='W'):
         """
@@ -138,15 +340,11 @@ class GenreForecaster:
         if genre not in self.models:
             self.train_genre_model(genre)
 
-        model = self.models[genre]
-
-        # Create future dataframe
-        future = model.make_future_dataframe(periods=periods, freq=frequency)
+        stored = self.forecasts.get(genre)
+        if frequency == 'W' and stored is not None and len(stored) >= periods:
+            return stored.head(periods).copy()
 
-        # Generate forecast
-        forecast = model.predict(future)
-
-        return forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(periods)
+        return self.models[genre].predict(periods, frequency)
 
     def forecast_quarterly(self, genre, quarters=4):
         """
@@ -159,50 +357,58 @@ class GenreForecaster:
         Returns:
             Dict with quarterly forecasts
         """
-        # Forecast weekly for next year
-        weekly_forecast = self.forecast_genre(genre, periods=quarters*13)
-
-        # Aggregate to quarters
-        weekly_forecast['quarter'] = pd.PeriodIndex(weekly_forecast['ds'], freq='Q')
-
-        quarterly = weekly_forecast.groupby('quarter').agg({
-            'yhat': 'mean',
-            'yhat_lower': 'mean',
-            'yhat_upper': 'mean'
-        }).reset_index()
-
-        results = []
-        for _, row in quarterly.iterrows():
-            results.append({
-                'quarter': str(row['quarter']),
-                'forecast': row['yhat'],
-                'lower_bound': row['yhat_lower'],
-                'upper_bound': row['yhat_upper'],
-                'confidence_95': row['yhat_upper'] - row['yhat_lower']
-            })
-
-        return results
-
-    def get_all_genres_forecast(self, quarters=4):
+        # Forecast weekly for next year, aggregated to quarters
+        return quarterly_summary(self.forecast_genre(genre, periods=quarters*13))
+
+    def get_all_genres_forecast(self, quarters=4, workers=None, timeout=300):
         """
         Forecast all major genres
 
+        With a slow backend (Prophet), genres without a fitted model are fitted
+        in parallel worker processes (workers=None uses one per CPU, workers=1
+        fits in this process). A fit that runs past `timeout` seconds is
+        abandoned and its genre reported as None, like any other failed forecast.
+
         Returns:
             Dict mapping genre to forecast data
         """
-        major_genres = ['Hip-Hop', 'Pop', 'Country', 'R&B', 'Rock', 'Alternative', 'Latin']
+        # Check if we have data for each genre
+        genres = [genre for genre in MAJOR_GENRES if genre in self.genre_matrix.columns]
+        self.load_models(genres)
+        to_fit = [genre for genre in genres if genre not in self.models]
+        workers = min(workers or os.cpu_count() or 1, len(to_fit)) if self.backend.parallel_fit else 1
 
         all_forecasts = {}
-
-        for genre in major_genres:
-            # Check if we have data for this genre
-            if genre in self.weekly_genre_data['genre'].values:
+        futures = {}
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        try:
+            if pool:
+                horizon = max(FORECAST_HORIZON, quarters * 13)
+                for genre in to_fit:
+                    series = self._genre_series(genre)
+                    futures[genre] = (
+                        self._fingerprint(series),
+                        pool.submit(_forecast_worker, self.backend.name, self.backend_params,
+                                    series, horizon, timeout)
+                    )
+
+            for genre in genres:
                 try:
-                    forecast = self.forecast_quarterly(genre, quarters)
-                    all_forecasts[genre] = forecast
+                    if genre in futures:
+                        fingerprint, future = futures[genre]
+                        model_json, forecast = future.result()
+                        self._store_model(genre, fingerprint, self.backend.from_json(model_json), forecast)
+                        all_forecasts[genre] = quarterly_summary(forecast.head(quarters * 13))
+                    else:
+                        with time_limit(timeout if genre in to_fit else None):
+                            all_forecasts[genre] = self.forecast_quarterly(genre, quarters)
                 except Exception as e:
                     print(f"Could not forecast {genre}: {e}")
                     all_forecasts[genre] = None
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
 
         return all_forecasts
 
@@ -213,9 +419,10 @@ class GenreForecaster:
         Returns:
             Dict with velocity, acceleration, and momentum score
         """
-        genre_data = self.weekly_genre_data[
-            self.weekly_genre_data['genre'] == genre
-        ].sort_values('date').tail(lookback_weeks * 2)
+        if genre not in self.genre_matrix.columns:
+            return None
+
+        genre_data = self.genre_matrix[genre].dropna().tail(lookback_weeks * 2).to_frame('percentage')
 
         if len(genre_data) < lookback_weeks:
             return None
@@ -14,6 +14,7 @@ import plotly.graph_objects as go
 import re
 import sys
 import os
+import requests
 
 # Add project root to Python path for imports
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -22,6 +23,7 @@ if project_root not in sys.path:
 
 from scripts.musicbrainz_credits import MusicBrainzCredits
 from analysis.genre_forecaster import GenreForecaster
+from src.utils.cache_store import open_cache
 
 # 80s Trading Terminal Color Palette - Gray/White with Amber accents
 COLORS = {
@@ -338,9 +340,9 @@ def load_billboard_200_data():
 
 @st.cache_data
 def load_genre_cache():
+    # Through open_cache so log entries (or the shared metadata store) are included
     data_path = os.path.join(project_root, 'data', 'billboard', 'hybrid_genre_cache.json')
-    with open(data_path, 'r') as f:
-        return json.load(f)
+    return dict(open_cache(data_path, 'artists', 'hybrid').items())
 
 billboard_data = load_billboard_data()
 billboard_200_data = load_billboard_200_data()
@@ -359,6 +361,7 @@ def get_forecaster():
     forecaster = GenreForecaster()
     forecaster.load_data()
     forecaster.prepare_weekly_genre_data()
+    forecaster.load_models()  # Persisted fits for unchanged data; others are fitted on first query
     return forecaster
 
 forecaster = get_forecaster()
@@ -793,7 +796,7 @@ def process_query(query):
                 height=500
             )
 
-            response += "\n*Forecast powered by Facebook Prophet time series analysis*"
+            response += f"\n*Forecast powered by {forecaster.backend.label} time series analysis*"
 
             return response, fig
         else:
@@ -822,8 +825,11 @@ def process_query(query):
                         break
 
             if artist_name:
-                # Fetch credits
-                credits = credits_fetcher.get_credits(song_title, artist_name)
+                # Fetch credits (outages and open circuits raise instead of caching a miss)
+                try:
+                    credits = credits_fetcher.get_credits(song_title, artist_name)
+                except requests.RequestException:
+                    return f"MusicBrainz is unavailable right now, so credits for '{song_title}' by {artist_name} couldn't be fetched. Please try again in a few minutes.", None
 
                 if credits:
                     response = f"**Credits for '{song_title}' by {artist_name}**\n\n"
@@ -7,25 +7,19 @@ One-time script to build comprehensive genre database
 import json
 from collections import Counter
 from src.spotify_genre_classifier import SpotifyGenreClassifier
+from src.classification_scheduler import rank_artists_by_impact
 
 def get_all_unique_artists(start_year="2000", end_year="2025"):
-    """Extract all unique artists from Billboard data"""
+    """Extract all unique artists from Billboard data, highest chart impact first"""
 
     # Load Billboard data
     with open('billboard_25years.json', 'r') as f:
         data = json.load(f)
 
-    # Track all unique artists
-    all_artists = set()
+    charts = {date: chart for date, chart in data.items() if start_year <= date[:4] <= end_year}
 
-    for date, chart in data.items():
-        if start_year <= date[:4] <= end_year:
-            for song in chart:
-                artist = song.get('artist')
-                if artist:
-                    all_artists.add(artist)
-
-    return sorted(list(all_artists))
+    # Interrupted runs should have covered the artists that matter most
+    return rank_artists_by_impact(charts)
 
 
 def classify_all_artists(client_id: str, client_secret: str):
@@ -79,10 +73,13 @@ def classify_all_artists(client_id: str, client_secret: str):
     print("COVERAGE ANALYSIS:")
     print("="*70)
 
-    coverage = ((results['total'] - results['not_found']) / results['total'] * 100)
+    classified = results['total'] - results['not_found'] - results['failed']
+    coverage = (classified / results['total'] * 100)
     print(f"Total unique artists: {results['total']:,}")
-    print(f"Successfully classified: {results['total'] - results['not_found']:,}")
+    print(f"Successfully classified: {classified:,}")
     print(f"Not found on Spotify: {results['not_found']:,}")
+    if results['failed']:
+        print(f"Failed (service errors, retried next run): {results['failed']:,}")
     print(f"Coverage: {coverage:.1f}%")
     print()
 
@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 """
 Classify remaining unclassified artists using hybrid approach
-Spotify first, MusicBrainz fallback
+Spotify first, MusicBrainz fallback, highest chart impact first
+
+Usage: python scripts/classify_remaining_artists.py [max_minutes] [max_requests]
 """
 
 import json
 import os
 import sys
 from src.hybrid_classifier import HybridClassifier
+from src.classification_scheduler import ClassificationScheduler
 from collections import Counter
 
 def main():
@@ -21,40 +24,15 @@ def main():
     with open('billboard_67years.json', 'r') as f:
         data = json.load(f)
 
-    # Get all unique artists
-    all_artists = set()
-    for date, chart in data.items():
-        for song in chart:
-            artist = song.get('artist')
-            if artist:
-                all_artists.add(artist)
-
-    print(f"✓ Found {len(all_artists):,} total unique artists")
-    print()
-
-    # Load Spotify cache
-    print("Step 2: Loading existing Spotify cache...")
-    try:
-        with open('spotify_genre_cache.json', 'r') as f:
-            spotify_cache = json.load(f)
-        print(f"✓ Loaded {len(spotify_cache):,} artists from Spotify cache")
-    except FileNotFoundError:
-        spotify_cache = {}
-        print("✗ No Spotify cache found")
-
+    print(f"✓ Loaded {len(data):,} chart weeks")
     print()
 
-    # Find unclassified artists
-    unclassified = sorted([a for a in all_artists if a not in spotify_cache])
-    print(f"Unclassified artists: {len(unclassified):,}")
-    print()
-
-    if len(unclassified) == 0:
-        print("All artists already classified!")
-        return
+    # Optional budgets (a partial run still covers the highest-impact artists)
+    max_minutes = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    max_requests = int(sys.argv[2]) if len(sys.argv) > 2 else None
 
     # Initialize hybrid classifier
-    print("Step 3: Initializing hybrid classifier...")
+    print("Step 2: Initializing hybrid classifier...")
 
     # Load Spotify credentials from environment variables
     client_id = os.getenv('SPOTIFY_CLIENT_ID')
@@ -78,13 +56,34 @@ def main():
     print("✓ Hybrid classifier ready")
     print()
 
+    # Rank unclassified artists by recency-weighted top 40 appearances
+    print("Step 3: Ranking unclassified artists by chart impact...")
+    scheduler = ClassificationScheduler(hybrid, data)
+    unclassified = scheduler.rank_unclassified()
+    print(f"✓ Found {len(scheduler.index):,} total unique artists")
+    print(f"Unclassified artists: {len(unclassified):,}")
+    print()
+
+    if len(unclassified) == 0:
+        print("All artists already classified!")
+        return
+
+    for artist in unclassified[:10]:
+        print(f"  {artist:<40} impact {scheduler.scores.get(artist, 0.0):>8.1f}")
+    print()
+
     # Classify unclassified artists
-    print(f"Step 4: Classifying {len(unclassified):,} artists...")
-    print("Strategy: Try Spotify first, fall back to MusicBrainz")
+    print(f"Step 4: Classifying {len(unclassified):,} artists (highest impact first)...")
+    print("Strategy: Try Spotify first, fall back to MusicBrainz (both stages run concurrently)")
     print(f"Estimated time: ~{len(unclassified) // 60} minutes")
+    if max_minutes is not None or max_requests is not None:
+        print(f"Budget: {max_minutes or '∞'} minutes, {max_requests or '∞'} requests")
     print()
 
-    results = hybrid.classify_artists(unclassified, save_interval=50)
+    results = scheduler.run(
+        max_seconds=max_minutes * 60 if max_minutes is not None else None,
+        max_requests=max_requests
+    )
 
     # Print results
     print()
@@ -98,23 +97,27 @@ def main():
     print(f"  - via Spotify: {results['spotify']:,}")
     print(f"  - via MusicBrainz: {results['musicbrainz']:,}")
     print(f"Not found: {results['not_found']:,}")
+    if results['failed']:
+        print(f"Failed (service errors, retried next run): {results['failed']:,}")
     print()
 
     success_rate = (results['found'] / results['total'] * 100) if results['total'] > 0 else 0
     print(f"Success rate: {success_rate:.1f}%")
+    print(f"Left in queue: {results['queued'] - results['total']:,}")
+    print(f"API requests: {results['requests']:,} in {results['seconds'] / 60:.1f} minutes")
     print()
 
     # Calculate new overall coverage
-    total_classified = len(spotify_cache) + results['found']
-    total_artists = len(all_artists)
-    new_coverage = (total_classified / total_artists * 100)
+    before = results['coverage_before']
+    after = results['coverage_after']
 
     print("="*70)
     print("OVERALL COVERAGE IMPROVEMENT")
     print("="*70)
-    print(f"Before: {len(spotify_cache):,} / {total_artists:,} ({len(spotify_cache)/total_artists*100:.1f}%)")
-    print(f"After:  {total_classified:,} / {total_artists:,} ({new_coverage:.1f}%)")
-    print(f"Improvement: +{results['found']:,} artists (+{new_coverage - len(spotify_cache)/total_artists*100:.1f}pp)")
+    print(f"Artists:     {before['classified_artists']:,} → {after['classified_artists']:,} / {after['artists']:,} "
+          f"({before['artist_coverage']:.1f}% → {after['artist_coverage']:.1f}%)")
+    print(f"Chart share: {before['weighted_coverage']:.1f}% → {after['weighted_coverage']:.1f}% "
+          f"(recency-weighted top 40 slots)")
     print()
 
     # Show genre distribution from MusicBrainz finds
@@ -49,27 +49,31 @@ def main():
             songs.append((artist, title, position))
 
     print(f"Processing {len(songs)} songs...")
-    print(f"Estimated quota: {len(songs)} × 101 = {len(songs) * 101:,} units")
+    print(f"Estimated quota: ≤ {len(songs)} searches × 100 + {-(-len(songs) // 50)} stats calls "
+          f"(cached songs skip the search)")
     print()
 
-    # Process songs
+    # Searches only for uncached songs; stats for all of them 50 per call
+    batch = fetcher.batch_get_songs(
+        [(artist, title) for artist, title, _ in songs],
+        max_quota=9800,
+        refresh_cached=True
+    )
+    youtube_data = {(s['artist'], s['song']): s['youtube_data'] for s in batch['songs']}
+
     results = {
-        'processed': 0,
-        'found': 0,
-        'not_found': 0,
+        'processed': batch['processed'],
+        'found': batch['found'],
+        'not_found': batch['not_found'],
         'songs': []
     }
 
     for artist, title, position in songs:
         print(f"\n#{position:2d}. {artist} - {title}")
 
-        # Get YouTube data
-        data = fetcher.get_song_data(artist, title)
-
-        results['processed'] += 1
+        data = youtube_data.get((artist, title))
 
         if data:
-            results['found'] += 1
             results['songs'].append({
                 'position': position,
                 'artist': artist,
@@ -84,18 +88,8 @@ def main():
             print(f"     Likes: {likes:,}")
             print(f"     URL: {data['video_url']}")
         else:
-            results['not_found'] += 1
             print(f"     ✗ No YouTube video found")
 
-        # Show quota status
-        quota = fetcher.get_quota_status()
-        print(f"     Quota: {quota['quota_used']:,} / 10,000 ({quota['percentage_used']:.1f}%)")
-
-        # Stop if approaching limit
-        if quota['quota_remaining'] < 200:
-            print("\n⚠️  Approaching quota limit, stopping early")
-            break
-
     # Final summary
     print("\n" + "="*70)
     print("SUMMARY")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Import a MusicBrainz JSON artist dump into the local lookup index
+Download artist.tar.xz from https://data.metabrainz.org/pub/musicbrainz/data/json-dumps/
+After importing, set DOSATSU_MUSICBRAINZ_DUMP to the database path to use it
+"""
+
+import sys
+from src.utils.musicbrainz_dump import MusicBrainzDump
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/import_musicbrainz_dump.py <artist.tar.xz|mbdump/artist> [db_path]")
+        return
+
+    dump_path = sys.argv[1]
+    db_path = sys.argv[2] if len(sys.argv) > 2 else 'musicbrainz_dump.db'
+
+    print("="*70)
+    print("IMPORTING MUSICBRAINZ ARTIST DUMP")
+    print("="*70)
+    print()
+
+    dump = MusicBrainzDump(db_path)
+    results = dump.import_dump(dump_path)
+    stats = dump.get_stats()
+    dump.close()
+
+    print()
+    print(f"✓ Read {results['read']:,} artists in {results['seconds'] / 60:.1f} minutes")
+    print(f"  Imported (tagged): {results['imported']:,}")
+    print(f"  Skipped (no tags): {results['skipped_untagged']:,}")
+    print(f"  Index: {stats['artists']:,} artists under {stats['names']:,} names")
+    print()
+    print(f"✓ Index ready: {db_path}")
+    print(f"  export DOSATSU_MUSICBRAINZ_DUMP={db_path}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migrate JSON caches into the unified SQLite metadata store
+After migrating, set DOSATSU_METADATA_DB to the database path to use it
+"""
+
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.metadata_store import MetadataStore
+
+# (cache file, table, namespace)
+CACHES = [
+    ('spotify_genre_cache.json', 'artists', 'spotify'),
+    ('musicbrainz_cache.json', 'artists', 'musicbrainz'),
+    ('hybrid_genre_cache.json', 'artists', 'hybrid'),
+    ('musicbrainz_credits_cache.json', 'credits', 'musicbrainz'),
+    ('youtube_cache.json', 'videos', 'youtube'),
+]
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'dosatsu_metadata.db'
+    cache_dir = sys.argv[2] if len(sys.argv) > 2 else '.'
+
+    print("="*70)
+    print("MIGRATING CACHES TO METADATA STORE")
+    print("="*70)
+    print()
+
+    store = MetadataStore(db_path)
+
+    for cache_file, table, namespace in CACHES:
+        path = os.path.join(cache_dir, cache_file)
+        if not os.path.exists(path) and not os.path.exists(f"{path}.log"):
+            print(f"  - {cache_file:<35} not found, skipped")
+            continue
+
+        count = store.import_json_cache(path, table, namespace)
+        print(f"  ✓ {cache_file:<35} → {table}/{namespace} ({count:,} entries)")
+
+    store.close()
+
+    print()
+    print(f"✓ Store ready: {db_path}")
+    print(f"  export DOSATSU_METADATA_DB={db_path}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,33 +4,52 @@ MusicBrainz Credits Fetcher for Dōsatsu
 Fetches songwriter, composer, lyricist, and producer credits
 """
 
-import json
+import queue
+import threading
 import requests
-import time
 from typing import Dict, Optional, List
+from src.utils.http_client import HTTPTransport, get_transport, service_url
+from src.utils.circuit_breaker import is_transient
+from src.utils.cache_store import open_cache
+from src.utils.rate_limiter import get_musicbrainz_limiter
 
 class MusicBrainzCredits:
     """Fetch music credits using MusicBrainz API"""
 
-    def __init__(self, cache_file: str = 'musicbrainz_credits_cache.json'):
+    def __init__(self, cache_file: str = 'musicbrainz_credits_cache.json',
+                 transport: Optional[HTTPTransport] = None, base_url: Optional[str] = None,
+                 works_cache_file: str = 'musicbrainz_works_cache.json'):
         self.cache_file = cache_file
+        self.works_cache_file = works_cache_file
         self.cache = self._load_cache()
-        self.base_url = "https://musicbrainz.org/ws/2/"
+        # Composer/lyricist credits per work ID - many recordings share a work
+        self.works_cache = open_cache(works_cache_file, 'credits', 'musicbrainz_works')
+        self.base_url = service_url('musicbrainz', base_url) + '/'
         self.user_agent = "Dosatsu/1.0 (jeremy@whetstone.com)"
-        self.rate_limit = 1.0  # 1 request per second
+        self.rate_limiter = get_musicbrainz_limiter()  # 1 request per second, shared
+        self.http = transport or get_transport()
+
+        # Cost model: every API call costs one rate-limit slot
+        self.request_stats = {
+            'searches': 0,
+            'recording_lookups': 0,
+            'work_lookups': 0,
+            'work_lookups_saved': 0
+        }
+        self._stats_lock = threading.Lock()
 
     def _load_cache(self) -> Dict:
-        """Load cached credits data"""
-        try:
-            with open(self.cache_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        """Load cached credits data (JSON log or shared SQLite store)"""
+        return open_cache(self.cache_file, 'credits', 'musicbrainz')
 
     def _save_cache(self):
         """Save cache to file"""
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.cache, f, indent=2)
+        self.cache.compact()
+        self.works_cache.compact()
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self.request_stats[stat] += 1
 
     def _make_request(self, endpoint: str, params: Dict) -> Optional[Dict]:
         """Make API request with rate limiting"""
@@ -42,13 +61,15 @@ class MusicBrainzCredits:
         url = f"{self.base_url}{endpoint}"
 
         try:
-            response = requests.get(url, params=params, headers=headers)
+            self.rate_limiter.acquire()  # Respect rate limit
+            response = self.http.get(url, params=params, headers=headers)
+            self.rate_limiter.defer_unavailable(response)
             response.raise_for_status()
-            time.sleep(self.rate_limit)  # Respect rate limit
             return response.json()
         except requests.exceptions.RequestException as e:
+            if is_transient(e):
+                raise  # Outages must not be cached as "no credits"
             print(f"MusicBrainz API error: {e}")
-            time.sleep(self.rate_limit)
             return None
 
     def _get_cache_key(self, song_title: str, artist_name: str) -> str:
@@ -67,6 +88,7 @@ class MusicBrainzCredits:
         }
 
         data = self._make_request('recording', params)
+        self._count('searches')
 
         if data and 'recordings' in data and len(data['recordings']) > 0:
             return data['recordings'][0]['id']
@@ -74,13 +96,18 @@ class MusicBrainzCredits:
         return None
 
     def get_recording_credits(self, recording_id: str) -> Optional[Dict]:
-        """Get credits for a recording including work relationships"""
+        """
+        Get credits for a recording including work relationships
+        work-level-rels inlines the work's composer/lyricist relations, which are
+        stored in the works cache so the work usually needs no request of its own
+        """
         params = {
-            'inc': 'artist-credits+work-rels+artist-rels',
+            'inc': 'artist-credits+work-rels+artist-rels+work-level-rels',
             'fmt': 'json'
         }
 
         recording_data = self._make_request(f'recording/{recording_id}', params)
+        self._count('recording_lookups')
 
         if not recording_data:
             return None
@@ -118,27 +145,40 @@ class MusicBrainzCredits:
                     work = rel['work']
                     credits['work_id'] = work.get('id')
                     credits['work_title'] = work.get('title')
+                    if credits['work_id'] and 'relations' in work and credits['work_id'] not in self.works_cache:
+                        self.works_cache[credits['work_id']] = self._parse_work_relations(work['relations'])
 
         return credits
 
     def get_work_credits(self, work_id: str) -> Dict[str, List[str]]:
-        """Get composer and lyricist credits from a work"""
+        """Get composer and lyricist credits from a work (cached per work ID)"""
+        if work_id in self.works_cache:
+            self._count('work_lookups_saved')
+            return self.works_cache[work_id]
+
         params = {
             'inc': 'artist-rels+aliases',
             'fmt': 'json'
         }
 
         work_data = self._make_request(f'work/{work_id}', params)
+        self._count('work_lookups')
 
+        if not work_data:
+            return {'composers': [], 'lyricists': []}
+
+        credits = self._parse_work_relations(work_data.get('relations', []))
+        self.works_cache[work_id] = credits
+        return credits
+
+    def _parse_work_relations(self, relations: List[Dict]) -> Dict[str, List[str]]:
+        """Composer and lyricist names from a work's artist relationships"""
         credits = {
             'composers': [],
             'lyricists': []
         }
 
-        if not work_data or 'relations' not in work_data:
-            return credits
-
-        for rel in work_data['relations']:
+        for rel in relations:
             rel_type = rel.get('type')
 
             if 'artist' in rel:
@@ -165,6 +205,7 @@ class MusicBrainzCredits:
         """
         Get complete credits for a song
         Returns dict with all available credit information
+        Raises requests.RequestException on transient failures (nothing is cached)
         """
         cache_key = self._get_cache_key(song_title, artist_name)
 
@@ -177,7 +218,6 @@ class MusicBrainzCredits:
 
         if not recording_id:
             self.cache[cache_key] = None
-            self._save_cache()
             return None
 
         # Get recording credits
@@ -185,14 +225,20 @@ class MusicBrainzCredits:
 
         if not credits:
             self.cache[cache_key] = None
-            self._save_cache()
             return None
 
         # If we have a work ID, get composer/lyricist info
-        if credits['work_id']:
-            work_credits = self.get_work_credits(credits['work_id'])
-            credits['composers'] = work_credits['composers']
-            credits['lyricists'] = work_credits['lyricists']
+        work_credits = self.get_work_credits(credits['work_id']) if credits['work_id'] else None
+
+        return self._finish_credits(cache_key, song_title, artist_name, recording_id, credits, work_credits)
+
+    def _finish_credits(self, cache_key: str, song_title: str, artist_name: str, recording_id: str,
+                        credits: Dict, work_credits: Optional[Dict]) -> Dict:
+        """Merge work credits and metadata into a recording's credits and cache them"""
+        credits = dict(credits)
+        if work_credits:
+            credits['composers'] = list(work_credits['composers'])
+            credits['lyricists'] = list(work_credits['lyricists'])
 
         # Add metadata
         credits['song'] = song_title
@@ -202,7 +248,6 @@ class MusicBrainzCredits:
 
         # Cache result
         self.cache[cache_key] = credits
-        self._save_cache()
 
         return credits
 
@@ -210,6 +255,11 @@ class MusicBrainzCredits:
         """
         Fetch credits for multiple songs
         songs: List of dicts with 'song' and 'artist' keys
+
+        Search, recording lookup and work lookup run as concurrent stages
+        connected by queues, all under the shared rate limiter. Songs,
+        recordings and works repeated within the batch are fetched once, and
+        works already in the works cache are not fetched at all.
         Returns dict with results and statistics
         """
         results = {
@@ -219,15 +269,171 @@ class MusicBrainzCredits:
             'credits': []
         }
 
-        for i, song_data in enumerate(songs, 1):
+        lock = threading.Lock()
+        outcome = {}
+        processed = [0]
+        found = [0]
+        recordings_done = {}
+        recording_waiters = {}  # recording ID -> [(cache key, song, artist)]
+        work_waiters = {}       # work ID -> [(entry, recording ID, recording credits)]
+        searches = queue.Queue()
+        lookups = queue.Queue()
+        works = queue.Queue()
+
+        # Dedupe songs; cache hits need no stage at all
+        pending = {}
+        for song_data in songs:
             song_title = song_data.get('song')
             artist_name = song_data.get('artist')
-
-            if not song_title or not artist_name:
-                results['not_found'] += 1
-                continue
-
-            credits = self.get_credits(song_title, artist_name)
+            if song_title and artist_name:
+                cache_key = self._get_cache_key(song_title, artist_name)
+                if cache_key in self.cache:
+                    outcome[cache_key] = self.cache[cache_key]
+                elif cache_key not in pending:
+                    pending[cache_key] = (song_title, artist_name)
+
+        def finish(cache_key: str, credits: Optional[Dict]):
+            with lock:
+                outcome[cache_key] = credits
+                processed[0] += 1
+                if credits:
+                    found[0] += 1
+                done, found_so_far = processed[0], found[0]
+
+            if done % 10 == 0:
+                print(f"Progress: {done}/{len(pending)} ({done/len(pending)*100:.1f}%) - "
+                      f"Found: {found_so_far}, Not found: {done - found_so_far} | "
+                      f"Queued: {lookups.qsize()} recordings, {works.qsize()} works")
+
+            if done % save_interval == 0:
+                self._save_cache()
+                print(f"✓ Cache saved ({len(self.cache)} songs, {len(self.works_cache)} works)")
+
+        def not_found(entries):
+            for cache_key, _, _ in entries:
+                self.cache[cache_key] = None
+                finish(cache_key, None)
+
+        def complete(entries, recording_id: str, credits: Dict, work_credits: Optional[Dict]):
+            for cache_key, song_title, artist_name in entries:
+                finish(cache_key, self._finish_credits(cache_key, song_title, artist_name,
+                                                       recording_id, credits, work_credits))
+
+        def dispatch(entries, recording_id: str, credits: Optional[Dict]):
+            """Route songs whose recording is known to the work stage, or finish them"""
+            if not credits:
+                not_found(entries)
+                return
+
+            work_id = credits['work_id']
+            if not work_id:
+                complete(entries, recording_id, credits, None)
+            elif work_id in self.works_cache:
+                complete(entries, recording_id, credits, self.get_work_credits(work_id))
+            else:
+                with lock:
+                    waiters = work_waiters.setdefault(work_id, [])
+                    first = not waiters
+                    waiters.extend((entry, recording_id, credits) for entry in entries)
+                if first:
+                    works.put(work_id)
+
+        def search_stage():
+            while True:
+                cache_key = searches.get()
+                if cache_key is None:
+                    break
+                song_title, artist_name = pending[cache_key]
+                entry = (cache_key, song_title, artist_name)
+                try:
+                    recording_id = self.search_recording(song_title, artist_name)
+                except Exception as e:
+                    print(f"Error searching {song_title} by {artist_name}: {e}")
+                    finish(cache_key, None)
+                    continue
+
+                if not recording_id:
+                    not_found([entry])
+                    continue
+
+                with lock:
+                    known = recording_id in recordings_done
+                    if not known:
+                        waiters = recording_waiters.setdefault(recording_id, [])
+                        first = not waiters
+                        waiters.append(entry)
+
+                if known:
+                    dispatch([entry], recording_id, recordings_done[recording_id])
+                elif first:
+                    lookups.put(recording_id)
+
+            lookups.put(None)
+
+        def recording_stage():
+            while True:
+                recording_id = lookups.get()
+                if recording_id is None:
+                    break
+                try:
+                    credits = self.get_recording_credits(recording_id)
+                except Exception as e:
+                    # Left uncached; a later song on the same recording tries again
+                    print(f"Error getting recording {recording_id}: {e}")
+                    with lock:
+                        entries = recording_waiters.pop(recording_id, [])
+                    for cache_key, _, _ in entries:
+                        finish(cache_key, None)
+                    continue
+
+                with lock:
+                    recordings_done[recording_id] = credits
+                    entries = recording_waiters.pop(recording_id, [])
+                dispatch(entries, recording_id, credits)
+
+            works.put(None)
+
+        def work_stage():
+            while True:
+                work_id = works.get()
+                if work_id is None:
+                    break
+                try:
+                    work_credits = self.get_work_credits(work_id)
+                except Exception as e:
+                    # Don't cache credits missing their composers; retried next run
+                    print(f"Error getting work {work_id}: {e}")
+                    with lock:
+                        waiters = work_waiters.pop(work_id, [])
+                    for (cache_key, _, _), _, _ in waiters:
+                        finish(cache_key, None)
+                    continue
+
+                with lock:
+                    waiters = work_waiters.pop(work_id, [])
+                for entry, recording_id, credits in waiters:
+                    complete([entry], recording_id, credits, work_credits)
+
+        stages = [
+            threading.Thread(target=stage, name=f'credits-{stage.__name__}', daemon=True)
+            for stage in (search_stage, recording_stage, work_stage)
+        ]
+        for thread in stages:
+            thread.start()
+
+        for cache_key in pending:
+            searches.put(cache_key)
+        searches.put(None)
+
+        for thread in stages:
+            thread.join()
+
+        for song_data in songs:
+            song_title = song_data.get('song')
+            artist_name = song_data.get('artist')
+            credits = None
+            if song_title and artist_name:
+                credits = outcome.get(self._get_cache_key(song_title, artist_name))
 
             if credits:
                 results['found'] += 1
@@ -235,15 +441,10 @@ class MusicBrainzCredits:
             else:
                 results['not_found'] += 1
 
-            # Progress update
-            if i % 10 == 0:
-                print(f"Progress: {i}/{len(songs)} ({i/len(songs)*100:.1f}%) - "
-                      f"Found: {results['found']}, Not found: {results['not_found']}")
+        # Final save
+        self._save_cache()
 
-            # Save cache periodically
-            if i % save_interval == 0:
-                self._save_cache()
-                print(f"✓ Cache saved ({len(self.cache)} songs)")
+        results['api_calls'] = dict(self.request_stats)
 
         return results
 
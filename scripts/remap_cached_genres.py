@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Re-map cached artists to Dōsatsu genres without any API calls
+Run after editing genre_mapping (Spotify) or tag_mapping (MusicBrainz)
+"""
+
+import json
+import os
+import sys
+from collections import Counter
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.hybrid_classifier import HybridClassifier
+from analysis.genre_forecaster import GenreForecaster
+
+
+def recent_genre_share(forecaster, weeks=52):
+    """Average genre share over the most recent weeks"""
+    df = forecaster.weekly_genre_data
+    recent_dates = sorted(df['date'].unique())[-weeks:]
+    recent = df[df['date'].isin(recent_dates)]
+    return recent.groupby('genre')['percentage'].sum() / len(recent_dates)
+
+
+def main():
+    cache_dir = os.path.join(project_root, 'data', 'billboard')
+    hybrid_cache = os.path.join(cache_dir, 'hybrid_genre_cache.json')
+    diff_file = os.path.join(cache_dir, 'genre_remap_diff.json')
+
+    print("="*70)
+    print("RE-MAPPING CACHED GENRES (OFFLINE)")
+    print("="*70)
+    print()
+
+    # Snapshot aggregates before the remap so the impact can be reported
+    forecaster = GenreForecaster(genre_cache_file=hybrid_cache)
+    forecaster.load_data()
+    forecaster.prepare_weekly_genre_data()
+    share_before = recent_genre_share(forecaster)
+
+    hybrid = HybridClassifier(
+        os.getenv('SPOTIFY_CLIENT_ID', ''),
+        os.getenv('SPOTIFY_CLIENT_SECRET', ''),
+        cache_file=hybrid_cache,
+        spotify_cache_file=os.path.join(cache_dir, 'spotify_genre_cache.json'),
+        musicbrainz_cache_file=os.path.join(cache_dir, 'musicbrainz_cache.json')
+    )
+
+    # Source caches first, so the unified cache can fall back to fresh raw data
+    all_changes = []
+    for label, classifier in [('Spotify', hybrid.spotify), ('MusicBrainz', hybrid.musicbrainz),
+                              ('Hybrid', hybrid)]:
+        results = classifier.remap_cache()
+        print(f"{label:<12} {results['total']:>6,} cached | "
+              f"{results['changed']:>5,} changed | {results['skipped']:>5,} skipped (no raw data)")
+        if classifier is hybrid:
+            all_changes = results['changes']
+
+    print()
+
+    with open(diff_file, 'w') as f:
+        json.dump(all_changes, f, indent=2)
+    print(f"✓ Diff saved to: {diff_file} ({len(all_changes):,} artists)")
+    print()
+
+    if not all_changes:
+        print("No genre assignments changed.")
+        return
+
+    moves = Counter((c['old_genre'], c['new_genre']) for c in all_changes)
+    print("GENRE MOVES:")
+    print("-"*70)
+    for (old_genre, new_genre), count in moves.most_common(15):
+        print(f"  {old_genre:<15} → {new_genre:<15} {count:>5,} artists")
+    print()
+
+    # Feed the diff to the weekly aggregates instead of rebuilding them
+    affected = forecaster.apply_genre_changes(all_changes)
+    share_after = recent_genre_share(forecaster)
+
+    print(f"✓ Updated {len(affected):,} affected chart weeks")
+    print()
+    print("LAST 52 WEEKS - AVERAGE TOP 40 SHARE:")
+    print("-"*70)
+    for genre in sorted(set(share_before.index) | set(share_after.index)):
+        before = share_before.get(genre, 0.0)
+        after = share_after.get(genre, 0.0)
+        print(f"  {genre:<15} {before:>6.1f}% → {after:>6.1f}% ({after - before:+.1f}pp)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
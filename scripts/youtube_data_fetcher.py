@@ -4,39 +4,104 @@ YouTube Data API Integration for Dōsatsu
 Fetches video stats (views, likes) for Billboard songs
 """
 
-import json
+import hashlib
+import os
 import requests
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional, List
 
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.http_client import HTTPTransport, get_transport, service_url
+from src.utils.cache_store import open_cache
+from src.utils.quota_ledger import QuotaExceeded, QuotaLedger
+
+# Quota cost per call (videos.list costs the same for 1 or 50 IDs)
+SEARCH_COST = 100
+VIDEOS_LIST_COST = 1
+VIDEOS_PER_CALL = 50
+DAILY_QUOTA = 10000
+
+# Quota is per API key, so every process using a key shares one ledger here,
+# wherever its cache file lives
+QUOTA_LEDGER_DIR = os.path.join(project_root, 'data', 'youtube_quota')
+
+
+def quota_ledger_path(api_key: str) -> str:
+    """Ledger file for an API key (named by a hash, so the key isn't written to disk)"""
+    digest = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(QUOTA_LEDGER_DIR, f"{digest}.json")
+
+
 class YouTubeDataFetcher:
     """Fetch and cache YouTube video data for songs"""
 
-    def __init__(self, api_key: str, cache_file: str = 'youtube_cache.json'):
+    def __init__(self, api_key: str, cache_file: str = 'youtube_cache.json',
+                 transport: Optional[HTTPTransport] = None, base_url: Optional[str] = None,
+                 ledger: Optional[QuotaLedger] = None):
         self.api_key = api_key
         self.cache_file = cache_file
         self.cache = self._load_cache()
-        self.quota_used = 0
+        # Video IDs found by a search whose stats call hasn't succeeded yet,
+        # so the 100-unit search isn't paid again on the next run
+        self.video_ids = open_cache(f"{os.path.splitext(cache_file)[0]}_video_ids.json",
+                                    'videos', 'youtube_video_ids')
+        # Today's usage across every process sharing this API key
+        if ledger is None:
+            os.makedirs(QUOTA_LEDGER_DIR, exist_ok=True)
+            ledger = QuotaLedger(quota_ledger_path(api_key), DAILY_QUOTA)
+        self.ledger = ledger
+        self.quota_used = 0  # This process only
+        self.quota_by_operation = {'search': 0, 'videos': 0}
+        self._quota_lock = threading.Lock()
+        self.http = transport or get_transport()
+        self.base_url = service_url('youtube', base_url)
 
     def _load_cache(self) -> Dict:
-        """Load cached YouTube data"""
-        try:
-            with open(self.cache_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        """Load cached YouTube data (JSON log or shared SQLite store)"""
+        return open_cache(self.cache_file, 'videos', 'youtube')
 
     def _save_cache(self):
         """Save cache to file"""
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.cache, f, indent=2)
+        self.cache.compact()
+        self.video_ids.compact()
+
+    def _find_video(self, cache_key: str, artist: str, song: str) -> Optional[str]:
+        """Video ID from an earlier search, otherwise search (and remember the result)"""
+        if cache_key in self.video_ids:
+            return self.video_ids[cache_key]
+
+        video_id = self.search_video(artist, song)
+        if video_id:
+            self.video_ids[cache_key] = video_id
+        return video_id
+
+    def _store_stats(self, cache_key: str, stats: Dict):
+        """Cache a song's stats, dropping its pending video ID"""
+        self.cache[cache_key] = stats
+        self.video_ids.pop(cache_key, None)
+
+    def _charge(self, operation: str, units: int):
+        """
+        Reserve quota for one API call before making it
+        Raises QuotaExceeded instead of letting the API fail mid-run
+        """
+        self.ledger.reserve(operation, units)
+        with self._quota_lock:
+            self.quota_used += units
+            self.quota_by_operation[operation] += units
 
     def _make_request(self, url: str, params: Dict) -> Optional[Dict]:
         """Make API request with error handling"""
         params['key'] = self.api_key
 
         try:
-            response = requests.get(url, params=params)
+            response = self.http.get(url, params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -46,11 +111,11 @@ class YouTubeDataFetcher:
     def search_video(self, artist: str, song: str) -> Optional[str]:
         """
         Search for a music video and return video ID
-        Cost: 100 units
+        Cost: 100 units (raises QuotaExceeded when today's quota can't cover it)
         """
         query = f"{artist} {song} official music video"
 
-        url = "https://www.googleapis.com/youtube/v3/search"
+        url = f"{self.base_url}/search"
         params = {
             'part': 'snippet',
             'q': query,
@@ -59,8 +124,8 @@ class YouTubeDataFetcher:
             'maxResults': 1
         }
 
+        self._charge('search', SEARCH_COST)
         data = self._make_request(url, params)
-        self.quota_used += 100  # Search costs 100 units
 
         if data and 'items' in data and len(data['items']) > 0:
             return data['items'][0]['id']['videoId']
@@ -72,33 +137,55 @@ class YouTubeDataFetcher:
         Get statistics for a video
         Cost: 1 unit
         """
-        url = "https://www.googleapis.com/youtube/v3/videos"
-        params = {
-            'part': 'statistics,snippet',
-            'id': video_id
-        }
-
-        data = self._make_request(url, params)
-        self.quota_used += 1  # Video stats costs 1 unit
+        return self.get_videos_stats([video_id]).get(video_id)
 
-        if data and 'items' in data and len(data['items']) > 0:
-            item = data['items'][0]
-            stats = item.get('statistics', {})
-            snippet = item.get('snippet', {})
-
-            return {
-                'video_id': video_id,
-                'video_url': f"https://www.youtube.com/watch?v={video_id}",
-                'title': snippet.get('title', ''),
-                'channel': snippet.get('channelTitle', ''),
-                'published_at': snippet.get('publishedAt', ''),
-                'view_count': int(stats.get('viewCount', 0)),
-                'like_count': int(stats.get('likeCount', 0)),
-                'comment_count': int(stats.get('commentCount', 0)),
-                'last_updated': time.strftime('%Y-%m-%d')
+    def get_videos_stats(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Get statistics for many videos, 50 IDs per videos.list call
+        Cost: 1 unit per 50 videos
+        Returns {video_id: stats}; deleted or private videos are absent
+        """
+        url = f"{self.base_url}/videos"
+        unique_ids = list(dict.fromkeys(video_ids))
+        stats = {}
+
+        for offset in range(0, len(unique_ids), VIDEOS_PER_CALL):
+            batch = unique_ids[offset:offset + VIDEOS_PER_CALL]
+            params = {
+                'part': 'statistics,snippet',
+                'id': ','.join(batch)
             }
 
-        return None
+            try:
+                self._charge('videos', VIDEOS_LIST_COST)
+            except QuotaExceeded as e:
+                print(f"⚠️  {e} - stats for {len(unique_ids) - offset} videos skipped")
+                break
+
+            data = self._make_request(url, params)
+
+            for item in (data or {}).get('items', []):
+                stats[item['id']] = self._parse_video(item)
+
+        return stats
+
+    def _parse_video(self, item: Dict) -> Dict:
+        """Convert a videos.list item into our cache format"""
+        video_id = item['id']
+        stats = item.get('statistics', {})
+        snippet = item.get('snippet', {})
+
+        return {
+            'video_id': video_id,
+            'video_url': f"https://www.youtube.com/watch?v={video_id}",
+            'title': snippet.get('title', ''),
+            'channel': snippet.get('channelTitle', ''),
+            'published_at': snippet.get('publishedAt', ''),
+            'view_count': int(stats.get('viewCount', 0)),
+            'like_count': int(stats.get('likeCount', 0)),
+            'comment_count': int(stats.get('commentCount', 0)),
+            'last_updated': time.strftime('%Y-%m-%d')
+        }
 
     def get_song_data(self, artist: str, song: str, force_refresh: bool = False) -> Optional[Dict]:
         """
@@ -115,20 +202,18 @@ class YouTubeDataFetcher:
 
         # Search for video
         print(f"Searching YouTube: {cache_key}")
-        video_id = self.search_video(artist, song)
+        video_id = self._find_video(cache_key, artist, song)
 
         if not video_id:
             print(f"✗ Video not found: {cache_key}")
             self.cache[cache_key] = None
-            self._save_cache()
             return None
 
         # Get video stats
         stats = self.get_video_stats(video_id)
 
         if stats:
-            self.cache[cache_key] = stats
-            self._save_cache()
+            self._store_stats(cache_key, stats)
             print(f"✓ Added to cache: {cache_key} ({stats['view_count']:,} views)")
             return stats
 
@@ -152,16 +237,50 @@ class YouTubeDataFetcher:
 
         if stats:
             self.cache[cache_key] = stats
-            self._save_cache()
             print(f"✓ Updated: {cache_key} ({stats['view_count']:,} views)")
             return stats
 
         return None
 
-    def batch_get_songs(self, songs: List[tuple], max_quota: int = 10000) -> Dict:
+    def refresh_all_stats(self, cache_keys: Optional[List[str]] = None) -> Dict:
+        """
+        Refresh view/like/comment counts for cached songs in bulk
+        cache_keys: "Artist - Song" keys to refresh (default: every cached video)
+        Cost: 1 unit per 50 videos
+        """
+        keys = cache_keys if cache_keys is not None else list(self.cache.keys())
+        video_keys = {}
+        for cache_key in keys:
+            data = self.cache.get(cache_key)
+            if data and data.get('video_id'):
+                video_keys.setdefault(data['video_id'], []).append(cache_key)
+
+        quota_before = self.quota_used
+        stats = self.get_videos_stats(list(video_keys))
+
+        for video_id, cache_keys_for_video in video_keys.items():
+            if video_id in stats:
+                for cache_key in cache_keys_for_video:
+                    self.cache[cache_key] = stats[video_id]
+
+        self._save_cache()
+
+        return {
+            'requested': len(video_keys),
+            'refreshed': len(stats),
+            'missing': len(video_keys) - len(stats),  # Deleted or made private since caching
+            'quota_used': self.quota_used - quota_before
+        }
+
+    def batch_get_songs(self, songs: List[tuple], max_quota: int = 10000,
+                        refresh_cached: bool = False, search_workers: int = 4) -> Dict:
         """
         Process multiple songs with quota limit
         songs: List of (artist, song) tuples
+
+        Searches run concurrently and only for songs not in the cache; stats
+        for every found video are then fetched 50 per videos.list call.
+        refresh_cached also re-fetches stats for cached songs in the same calls.
         Returns: Dict with results and quota usage
         """
         results = {
@@ -173,20 +292,65 @@ class YouTubeDataFetcher:
             'songs': []
         }
 
-        for artist, song in songs:
-            # Check if we'd exceed quota
-            cache_key = f"{artist} - {song}"
-            estimated_cost = 0 if cache_key in self.cache else 101
-
-            if self.quota_used + estimated_cost > max_quota:
-                print(f"\n⚠️  Quota limit reached ({self.quota_used}/{max_quota} units)")
-                print(f"Processed {results['processed']} of {len(songs)} songs")
-                break
-
-            # Process song
-            data = self.get_song_data(artist, song)
+        quota_before = self.quota_used
+        keys = {f"{artist} - {song}": (artist, song) for artist, song in songs}
+        uncached = [key for key in keys if key not in self.cache]
+        cached = [key for key in keys if key in self.cache]
+        # Searched on an earlier run whose stats call was skipped: only the stats are needed
+        known_ids = {key: self.video_ids[key] for key in uncached if key in self.video_ids}
+        unsearched = [key for key in uncached if key not in known_ids]
+
+        # Reserve the stats calls first, then spend what is left on searches
+        stats_calls = -(-(len(uncached) + (len(cached) if refresh_cached else 0)) // VIDEOS_PER_CALL)
+        budget = min(max_quota - self.quota_used, self.ledger.remaining())
+        affordable = max(0, (budget - stats_calls * VIDEOS_LIST_COST) // SEARCH_COST)
+        if affordable < len(unsearched):
+            print(f"\n⚠️  Quota limit: searching {affordable} of {len(unsearched)} uncached songs "
+                  f"({self.ledger.used()}/{self.ledger.daily_quota} units used today)")
+        to_search = unsearched[:affordable]
+
+        skipped = object()
+
+        def search(key):
+            try:
+                return self._find_video(key, *keys[key])
+            except QuotaExceeded:
+                return skipped  # Another process spent the quota first; retry another day
+
+        # Search stage: uncached songs only
+        with ThreadPoolExecutor(max_workers=search_workers) as pool:
+            found_ids = dict(zip(to_search, pool.map(search, to_search)))
+
+        found_ids = {key: video_id for key, video_id in found_ids.items() if video_id is not skipped}
+        found_ids.update(known_ids)
+        to_search = [key for key in uncached if key in found_ids]
+
+        # Stats stage: new finds plus (optionally) cached videos, 50 per call
+        video_ids = [video_id for video_id in found_ids.values() if video_id]
+        if refresh_cached:
+            video_ids += [self.cache[key]['video_id'] for key in cached if self.cache[key]]
+        stats = self.get_videos_stats(video_ids)
+
+        for key, video_id in found_ids.items():
+            if not video_id:
+                print(f"✗ Video not found: {key}")
+                self.cache[key] = None
+            elif video_id in stats:
+                self._store_stats(key, stats[video_id])
+
+        if refresh_cached:
+            for key in cached:
+                data = self.cache[key]
+                if data and data['video_id'] in stats:
+                    self.cache[key] = stats[data['video_id']]
+
+        for key in cached + to_search:
+            artist, song = keys[key]
+            data = self.cache.get(key)
 
             results['processed'] += 1
+            if key in cached:
+                results['cached'] += 1
             if data:
                 results['found'] += 1
                 results['songs'].append({
@@ -197,15 +361,19 @@ class YouTubeDataFetcher:
             else:
                 results['not_found'] += 1
 
-        results['quota_used'] = self.quota_used
-        results['cached'] = results['processed'] - results['found'] - results['not_found']
+        self._save_cache()
+
+        results['quota_used'] = self.quota_used - quota_before
 
         return results
 
     def get_quota_status(self) -> Dict:
-        """Get current quota usage"""
+        """Get today's quota usage (all processes) from the shared ledger"""
+        used_today = self.ledger.used()
         return {
-            'quota_used': self.quota_used,
-            'quota_remaining': 10000 - self.quota_used,
-            'percentage_used': (self.quota_used / 10000) * 100
+            'quota_used': used_today,
+            'quota_used_this_process': self.quota_used,
+            'quota_by_operation': dict(self.quota_by_operation),
+            'quota_remaining': max(self.ledger.daily_quota - used_today, 0),
+            'percentage_used': (used_today / self.ledger.daily_quota) * 100
         }
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Daily YouTube Quota Scheduler for Dōsatsu
+Spend each day's quota in priority order: current top 40 first, then the back catalog
+
+Run once a day (e.g. from cron). Work that doesn't fit today's quota
+carries over to the next run, because finished songs are cached.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Tuple
+from youtube_data_fetcher import YouTubeDataFetcher, SEARCH_COST, VIDEOS_LIST_COST, VIDEOS_PER_CALL
+
+
+def build_song_priorities(chart_data: Dict[str, List[Dict]]) -> List[Tuple[str, str]]:
+    """
+    (artist, song) pairs in fetch order
+    Current top 40 by position, then the rest of the current chart, then the
+    back catalog: most recently charted first, best peak position breaking ties
+    """
+    latest = max(chart_data)
+    last_seen = {}
+    peak = {}
+
+    for date_str, chart in chart_data.items():
+        for i, entry in enumerate(chart, 1):
+            artist, song = entry.get('artist'), entry.get('song')
+            if not artist or not song:
+                continue
+            key = (artist, song)
+            last_seen[key] = max(last_seen.get(key, ''), date_str)
+            peak[key] = min(peak.get(key, 999), int(entry.get('position') or i))
+
+    current = {}
+    for i, entry in enumerate(chart_data[latest], 1):
+        key = (entry.get('artist'), entry.get('song'))
+        if key in peak:
+            current[key] = int(entry.get('position') or i)
+
+    def priority(key):
+        if key in current:
+            return (0 if current[key] <= 40 else 1, 0, current[key])
+        age = -datetime.strptime(last_seen[key], '%Y-%m-%d').toordinal()
+        return (2, age, peak[key])
+
+    return sorted(peak, key=priority)
+
+
+class YouTubeQuotaScheduler:
+    """
+    Split YouTube work across days by priority
+
+    Each run first refreshes stats for the highest-priority cached songs
+    (1 unit per 50), then spends the rest of today's shared quota on
+    searches (100 units each) for uncached songs in priority order.
+    Nothing is attempted that the ledger can't cover, so a run never
+    stops on a quota error halfway through.
+    """
+
+    def __init__(self, fetcher: YouTubeDataFetcher, songs: List[Tuple[str, str]],
+                 refresh_count: int = 100, reserve: int = 0):
+        self.fetcher = fetcher
+        self.songs = songs
+        self.refresh_count = refresh_count
+        self.reserve = reserve  # Units left untouched for ad-hoc lookups
+
+    def _key(self, artist: str, song: str) -> str:
+        return f"{artist} - {song}"
+
+    def pending_searches(self) -> List[Tuple[str, str]]:
+        return [(a, s) for a, s in self.songs if self._key(a, s) not in self.fetcher.cache]
+
+    def plan(self) -> Dict:
+        """Days needed to search the remaining songs at the full daily quota"""
+        pending = len(self.pending_searches())
+        refresh_cost = -(-self.refresh_count // VIDEOS_PER_CALL) * VIDEOS_LIST_COST
+        # Each new find also needs its share of a stats call
+        per_day = (self.fetcher.ledger.daily_quota - self.reserve - refresh_cost) // (SEARCH_COST + VIDEOS_LIST_COST)
+        return {
+            'songs': len(self.songs),
+            'pending_searches': pending,
+            'searches_per_day': per_day,
+            'days_remaining': -(-pending // per_day) if per_day > 0 else None
+        }
+
+    def run_today(self) -> Dict:
+        """Spend today's remaining quota in priority order"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        results = {'refreshed': 0, 'searched': 0, 'found': 0}
+
+        # 1. Daily stats for the top of the list (cheap: 1 unit per 50 songs)
+        stale = []
+        for artist, song in self.songs[:self.refresh_count]:
+            data = self.fetcher.cache.get(self._key(artist, song))
+            if data and data.get('last_updated') != today:
+                stale.append(self._key(artist, song))
+
+        if stale and self.fetcher.ledger.remaining() - self.reserve >= -(-len(stale) // VIDEOS_PER_CALL):
+            results['refreshed'] = self.fetcher.refresh_all_stats(stale)['refreshed']
+
+        # 2. Searches for uncached songs with whatever is left
+        budget = self.fetcher.ledger.remaining() - self.reserve
+        count = max(budget, 0) // (SEARCH_COST + VIDEOS_LIST_COST)
+        batch = self.pending_searches()[:count]
+
+        if batch:
+            batch_results = self.fetcher.batch_get_songs(
+                batch, max_quota=self.fetcher.quota_used + budget
+            )
+            results['searched'] = batch_results['processed']
+            results['found'] = batch_results['found']
+
+        results['quota'] = self.fetcher.get_quota_status()
+        results['plan'] = self.plan()
+        return results
+
+
+def main():
+    print("="*70)
+    print("YOUTUBE DAILY QUOTA SCHEDULER")
+    print("="*70)
+    print()
+
+    api_key = os.getenv('YOUTUBE_API_KEY')
+    if not api_key:
+        print("❌ Set YOUTUBE_API_KEY to run the scheduler")
+        return
+
+    with open('billboard_67years.json', 'r') as f:
+        data = json.load(f)
+
+    fetcher = YouTubeDataFetcher(api_key)
+    songs = build_song_priorities(data)
+    scheduler = YouTubeQuotaScheduler(fetcher, songs)
+
+    quota = fetcher.get_quota_status()
+    print(f"Songs in priority order: {len(songs):,}")
+    print(f"Quota used today (all processes): {quota['quota_used']:,} / {fetcher.ledger.daily_quota:,}")
+    print()
+
+    results = scheduler.run_today()
+
+    print()
+    print("="*70)
+    print("TODAY'S RUN")
+    print("="*70)
+    print(f"Stats refreshed: {results['refreshed']:,}")
+    print(f"Songs searched:  {results['searched']:,} ({results['found']:,} videos found)")
+    print(f"Quota used today: {results['quota']['quota_used']:,} / {fetcher.ledger.daily_quota:,}")
+    print()
+
+    plan = results['plan']
+    print(f"Pending searches: {plan['pending_searches']:,} "
+          f"(~{plan['searches_per_day']:,} per day, {plan['days_remaining'] or 0:,} more days)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,12 +9,21 @@ import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import time
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.http_client import HTTPTransport, get_transport
 
 class BillboardDataDownloader:
     """Download Billboard Hot 100 data from GitHub repository"""
 
-    def __init__(self):
+    def __init__(self, transport: Optional[HTTPTransport] = None):
         self.base_url = "https://raw.githubusercontent.com/mhollingshead/billboard-hot-100/main"
+        self.http = transport or get_transport()
 
     def download_all_charts(self, save_path: str = "billboard_all_charts.json") -> Dict:
         """Download complete Billboard Hot 100 history"""
@@ -22,7 +31,7 @@ class BillboardDataDownloader:
         print("(This is a large file, may take a moment)")
 
         try:
-            response = requests.get(f"{self.base_url}/all.json", timeout=60)
+            response = self.http.get(f"{self.base_url}/all.json", timeout=60)
             response.raise_for_status()
             raw_data = response.json()
 
@@ -91,7 +100,7 @@ class BillboardDataDownloader:
     def get_chart_by_date(self, date: str) -> Optional[Dict]:
         """Get specific chart by date (YYYY-MM-DD format)"""
         try:
-            response = requests.get(f"{self.base_url}/{date}.json")
+            response = self.http.get(f"{self.base_url}/{date}.json")
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
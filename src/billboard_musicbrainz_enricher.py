@@ -6,19 +6,73 @@ Combines Billboard chart data with MusicBrainz metadata for comprehensive analys
 
 import requests
 import json
-import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import os
+import sys
 
-class MusicBrainzEnricher:
-    """Enrich Billboard data with MusicBrainz metadata"""
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.http_client import HTTPTransport, get_transport, service_url
+from src.utils.rate_limiter import get_musicbrainz_limiter
+from src.utils.circuit_breaker import is_transient
+from src.utils.cache_store import CacheTTL, open_cache
+from src.utils.artist_names import normalize_artist_name, normalize_title
 
-    def __init__(self, app_name: str = "BillboardEnricher", version: str = "1.0", contact: str = "jeremy@whetstone.com"):
-        self.base_url = "https://musicbrainz.org/ws/2"
+class MusicBrainzEnricher:
+    """
+    Enrich Billboard data with MusicBrainz metadata
+
+    Recordings are cached by MBID, with normalized (song, artist) keys and
+    ISRCs pointing at them; artists by MBID with normalized-name keys. A song
+    that stays on the chart for months is looked up once.
+    """
+
+    def __init__(self, app_name: str = "BillboardEnricher", version: str = "1.0", contact: str = "jeremy@whetstone.com",
+                 transport: Optional[HTTPTransport] = None, base_url: Optional[str] = None,
+                 cache_file: str = 'musicbrainz_recordings_cache.json',
+                 artist_cache_file: str = 'musicbrainz_artists_cache.json',
+                 ttl: Optional[CacheTTL] = None):
+        self.base_url = service_url('musicbrainz', base_url)
         self.headers = {
             'User-Agent': f'{app_name}/{version} ({contact})'
         }
-        self.rate_limit_delay = 1.1  # MusicBrainz requires 1 request per second
+        self.rate_limiter = get_musicbrainz_limiter()  # MusicBrainz requires 1 request per second
+        self.http = transport or get_transport()
+
+        # Keys: "song:<title>|||<artist>" and "isrc:<code>" -> MBID, "mbid:<id>" -> summary
+        self.recordings = open_cache(cache_file, 'recordings', 'musicbrainz')
+        # Keys: "name:<artist>" -> MBID, "mbid:<id>" -> artist entity
+        self.artists = open_cache(artist_cache_file, 'artists', 'musicbrainz_enricher')
+        self.ttl = ttl or CacheTTL()
+
+        # Cost model: artist lookups skipped because the search already had tags
+        self.request_stats = {
+            'artist_searches': 0,
+            'artist_lookups': 0,
+            'artist_lookups_saved': 0,
+            'recording_searches': 0,
+            'recording_lookups': 0,
+            'recording_cache_hits': 0,
+            'artist_cache_hits': 0,
+            'isrc_dedupes': 0
+        }
+
+    def _save_cache(self):
+        """Save both caches"""
+        self.recordings.compact()
+        self.artists.compact()
+
+    def _song_key(self, song_title: str, artist_name: str) -> str:
+        return f"song:{normalize_title(song_title)}|||{normalize_artist_name(artist_name)}"
+
+    def _cached(self, cache, key: str) -> bool:
+        """Cached and usable: expired misses are retried"""
+        if key not in cache:
+            return False
+        return cache[key] is not None or not self.ttl.is_expired(cache, key)
 
     def search_recording(self, song_title: str, artist_name: str) -> Optional[Dict]:
         """Search for a recording (song) in MusicBrainz"""
@@ -30,7 +84,10 @@ class MusicBrainzEnricher:
         }
 
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            self.rate_limiter.acquire()  # Respect rate limits
+            response = self.http.get(url, headers=self.headers, params=params)
+            self.request_stats['recording_searches'] += 1
+            self.rate_limiter.defer_unavailable(response)
             response.raise_for_status()
             data = response.json()
 
@@ -39,12 +96,11 @@ class MusicBrainzEnricher:
             return None
 
         except requests.RequestException as e:
+            if is_transient(e):
+                raise
             print(f"Error searching MusicBrainz: {e}")
             return None
 
-        finally:
-            time.sleep(self.rate_limit_delay)  # Respect rate limits
-
     def get_recording_details(self, mbid: str) -> Optional[Dict]:
         """Get detailed metadata for a recording"""
         url = f"{self.base_url}/recording/{mbid}"
@@ -54,19 +110,44 @@ class MusicBrainzEnricher:
         }
 
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            self.rate_limiter.acquire()
+            response = self.http.get(url, headers=self.headers, params=params)
+            self.request_stats['recording_lookups'] += 1
+            self.rate_limiter.defer_unavailable(response)
             response.raise_for_status()
             return response.json()
 
         except requests.RequestException as e:
+            if is_transient(e):
+                raise
             print(f"Error getting recording details: {e}")
             return None
 
-        finally:
-            time.sleep(self.rate_limit_delay)
-
     def get_artist_details(self, artist_name: str) -> Optional[Dict]:
-        """Get artist metadata from MusicBrainz"""
+        """Get artist metadata from MusicBrainz (cached by normalized name and MBID)"""
+        name_key = f"name:{normalize_artist_name(artist_name)}"
+        if self._cached(self.artists, name_key):
+            mbid = self.artists[name_key]
+            # Entities cached from a bare search result have no genres; look them up again
+            if mbid is None or 'genres' in self.artists.get(f"mbid:{mbid}", {}):
+                self.request_stats['artist_cache_hits'] += 1
+                return self.artists.get(f"mbid:{mbid}") if mbid else None
+
+        artist = self._fetch_artist_details(artist_name)
+        if artist is None:
+            return None
+
+        mbid = artist.get('id')
+        self.artists[name_key] = mbid
+        if mbid:
+            self.artists[f"mbid:{mbid}"] = artist
+        return artist
+
+    def _fetch_artist_details(self, artist_name: str) -> Optional[Dict]:
+        """
+        Search (and if needed look up) an artist
+        Returns the entity, {} when MusicBrainz has no match, or None on a request error
+        """
         url = f"{self.base_url}/artist"
         params = {
             'query': f'artist:"{artist_name}"',
@@ -75,13 +156,23 @@ class MusicBrainzEnricher:
         }
 
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            self.rate_limiter.acquire()
+            response = self.http.get(url, headers=self.headers, params=params)
+            self.rate_limiter.defer_unavailable(response)
             response.raise_for_status()
             data = response.json()
 
+            self.request_stats['artist_searches'] += 1
+
             if data.get('artists'):
                 artist = data['artists'][0]
 
+                # Search results carry tags but not genres, so only a
+                # result that already has genres can skip the lookup
+                if 'genres' in artist:
+                    self.request_stats['artist_lookups_saved'] += 1
+                    return artist
+
                 # Get full details
                 artist_id = artist['id']
                 detail_url = f"{self.base_url}/artist/{artist_id}"
@@ -90,30 +181,24 @@ class MusicBrainzEnricher:
                     'inc': 'tags+ratings+genres'
                 }
 
-                time.sleep(self.rate_limit_delay)
-                detail_response = requests.get(detail_url, headers=self.headers, params=detail_params)
+                self.rate_limiter.acquire()
+                detail_response = self.http.get(detail_url, headers=self.headers, params=detail_params)
+                self.request_stats['artist_lookups'] += 1
+                self.rate_limiter.defer_unavailable(detail_response)
                 detail_response.raise_for_status()
                 return detail_response.json()
 
-            return None
+            return {}
 
         except requests.RequestException as e:
             print(f"Error getting artist details: {e}")
             return None
 
-        finally:
-            time.sleep(self.rate_limit_delay)
-
     def enrich_billboard_song(self, billboard_entry: Dict) -> Dict:
         """Enrich a single Billboard chart entry with MusicBrainz data"""
         song = billboard_entry.get('song', '')
         artist = billboard_entry.get('artist', '')
 
-        print(f"  Enriching: {song} by {artist}")
-
-        # Search for the recording
-        recording = self.search_recording(song, artist)
-
         enriched = {
             **billboard_entry,  # Keep original Billboard data
             'musicbrainz': {
@@ -127,38 +212,98 @@ class MusicBrainzEnricher:
             }
         }
 
-        if recording:
-            enriched['musicbrainz']['found'] = True
-            enriched['musicbrainz']['mbid'] = recording.get('id')
-            enriched['musicbrainz']['length_ms'] = recording.get('length')
-
-            # Get detailed info
-            if recording.get('id'):
-                details = self.get_recording_details(recording['id'])
-                if details:
-                    # Extract ISRCs
-                    if 'isrcs' in details:
-                        enriched['musicbrainz']['isrc'] = details['isrcs'][0] if details['isrcs'] else None
-
-                    # Extract tags/genres
-                    if 'tags' in details:
-                        enriched['musicbrainz']['tags'] = [
-                            tag['name'] for tag in details['tags'][:10]
-                        ]
-
-                    # Extract release info
-                    if 'releases' in details:
-                        enriched['musicbrainz']['releases'] = [
-                            {
-                                'title': rel.get('title'),
-                                'date': rel.get('date'),
-                                'country': rel.get('country')
-                            }
-                            for rel in details['releases'][:5]
-                        ]
+        song_key = self._song_key(song, artist)
+        if self._cached(self.recordings, song_key):
+            mbid = self.recordings[song_key]
+            summary = self.recordings.get(f"mbid:{mbid}") if mbid else None
+            if mbid is None or summary:
+                self.request_stats['recording_cache_hits'] += 1
+                if summary:
+                    enriched['musicbrainz'] = dict(summary)
+                return enriched
+
+        print(f"  Enriching: {song} by {artist}")
+
+        # Search for the recording; transient failures are not cached
+        try:
+            recording = self.search_recording(song, artist)
+            if recording:
+                summary, complete = self._recording_summary(recording)
+        except requests.RequestException as e:
+            print(f"  MusicBrainz unavailable ({e}), will retry next run")
+            return enriched
+
+        if not recording:
+            self.recordings[song_key] = None
+            return enriched
+
+        enriched['musicbrainz'] = dict(summary)
+        if not complete:
+            return enriched  # Details lookup failed: retried next run instead of cached empty
+
+        self.recordings[song_key] = summary['mbid']
+        self.recordings[f"mbid:{summary['mbid']}"] = summary
+        for isrc in summary.get('isrcs', []):
+            self.recordings.setdefault(f"isrc:{isrc}", summary['mbid'])
 
         return enriched
 
+    def _recording_summary(self, recording: Dict) -> Tuple[Dict, bool]:
+        """
+        Cacheable MusicBrainz fields for a search hit, and whether they are complete
+        A recording whose ISRC is already cached under another MBID reuses that
+        entry (MusicBrainz often has duplicate recordings of one master).
+        The summary is incomplete (and must not be cached) if the details lookup failed.
+        """
+        mbid = recording.get('id')
+        cached = self.recordings.get(f"mbid:{mbid}")
+        if cached:
+            return cached, True
+
+        for isrc in recording.get('isrcs', []):
+            known_mbid = self.recordings.get(f"isrc:{isrc}")
+            if known_mbid and known_mbid != mbid and self.recordings.get(f"mbid:{known_mbid}"):
+                self.request_stats['isrc_dedupes'] += 1
+                return self.recordings[f"mbid:{known_mbid}"], True
+
+        summary = {
+            'found': True,
+            'mbid': mbid,
+            'isrc': None,
+            'isrcs': [],
+            'length_ms': recording.get('length'),
+            'genres': [],
+            'tags': [],
+            'releases': []
+        }
+
+        # Get detailed info
+        details = self.get_recording_details(mbid) if mbid else None
+        if details:
+            # Extract ISRCs
+            if 'isrcs' in details:
+                summary['isrcs'] = details['isrcs']
+                summary['isrc'] = details['isrcs'][0] if details['isrcs'] else None
+
+            # Extract tags/genres
+            if 'tags' in details:
+                summary['tags'] = [
+                    tag['name'] for tag in details['tags'][:10]
+                ]
+
+            # Extract release info
+            if 'releases' in details:
+                summary['releases'] = [
+                    {
+                        'title': rel.get('title'),
+                        'date': rel.get('date'),
+                        'country': rel.get('country')
+                    }
+                    for rel in details['releases'][:5]
+                ]
+
+        return summary, details is not None
+
 
 class BillboardMusicBrainzAnalyzer:
     """Combined analysis of Billboard and MusicBrainz data"""
@@ -184,6 +329,8 @@ class BillboardMusicBrainzAnalyzer:
             enriched = self.enricher.enrich_billboard_song(song)
             enriched_songs.append(enriched)
 
+        self.enricher._save_cache()
+
         return enriched_songs
 
     def analyze_artist_metadata(self, artist_name: str) -> Dict:
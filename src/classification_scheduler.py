@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Impact-Prioritized Classification for Dōsatsu
+Classify the artists that carry the most chart share first, within a budget
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.http_client import requests_sent
+
+
+def build_artist_index(chart_data: Dict[str, List[Dict]]) -> Dict[str, List[Tuple[str, int]]]:
+    """Inverted index: artist -> [(chart date, position), ...]"""
+    index = {}
+    for date_str, chart in chart_data.items():
+        for i, song in enumerate(chart, 1):
+            artist = song.get('artist')
+            if artist:
+                index.setdefault(artist, []).append((date_str, int(song.get('position') or i)))
+    return index
+
+
+def artist_impact(index: Dict[str, List[Tuple[str, int]]], top_n: int = 40,
+                  half_life_years: float = 10.0) -> Dict[str, float]:
+    """
+    Chart impact per artist: top-N appearances, each weighted by recency
+    A week's weight halves every half_life_years before the latest chart
+    """
+    latest = max((date for entries in index.values() for date, _ in entries), default=None)
+    if latest is None:
+        return {}
+
+    latest_date = datetime.strptime(latest, '%Y-%m-%d')
+    week_weights = {}
+    scores = {}
+
+    for artist, entries in index.items():
+        score = 0.0
+        for date_str, position in entries:
+            if position > top_n:
+                continue
+            weight = week_weights.get(date_str)
+            if weight is None:
+                age_years = (latest_date - datetime.strptime(date_str, '%Y-%m-%d')).days / 365.25
+                weight = 0.5 ** (age_years / half_life_years)
+                week_weights[date_str] = weight
+            score += weight
+        scores[artist] = score
+
+    return scores
+
+
+def rank_artists_by_impact(chart_data: Dict[str, List[Dict]], artists: Optional[List[str]] = None,
+                           half_life_years: float = 10.0) -> List[str]:
+    """Artists (all charted ones by default) ordered by impact, highest first"""
+    index = build_artist_index(chart_data)
+    scores = artist_impact(index, half_life_years=half_life_years)
+    candidates = artists if artists is not None else list(index)
+    # Ties (e.g. artists who never reached the top 40) fall back to total appearances
+    return sorted(candidates, key=lambda a: (-scores.get(a, 0.0), -len(index.get(a, [])), a))
+
+
+class ClassificationScheduler:
+    """
+    Classify unclassified artists highest impact first, within a budget
+
+    Artists are handed to the hybrid classifier in chunks, so the Spotify
+    and MusicBrainz stages still overlap. The time and request budgets are
+    checked between chunks. If a backfill is interrupted, the finished
+    artists are the ones that carry the most chart share.
+    """
+
+    def __init__(self, classifier, chart_data: Dict[str, List[Dict]], half_life_years: float = 10.0):
+        self.classifier = classifier
+        self.index = build_artist_index(chart_data)
+        self.scores = artist_impact(self.index, half_life_years=half_life_years)
+        self.total_impact = sum(self.scores.values())
+
+    def _is_classified(self, artist: str) -> bool:
+        return bool(self.classifier.cache.get(artist))
+
+    def rank_unclassified(self) -> List[str]:
+        """Artists without a usable cache entry, highest impact first"""
+        pending = [a for a in self.index if not self.classifier._cache_hit(a)]
+        return sorted(pending, key=lambda a: (-self.scores.get(a, 0.0), -len(self.index[a]), a))
+
+    def coverage(self) -> Dict:
+        """Share of recency-weighted top-40 slots (and of artists) that are classified"""
+        classified = [a for a in self.index if self._is_classified(a)]
+        classified_impact = sum(self.scores.get(a, 0.0) for a in classified)
+        return {
+            'artists': len(self.index),
+            'classified_artists': len(classified),
+            'artist_coverage': len(classified) / len(self.index) * 100 if self.index else 0.0,
+            'weighted_coverage': classified_impact / self.total_impact * 100 if self.total_impact else 0.0
+        }
+
+    def _requests_made(self) -> int:
+        """API requests sent so far through the classifiers' transports"""
+        return requests_sent((self.classifier.spotify.http, self.classifier.musicbrainz.http))
+
+    def run(self, max_seconds: Optional[float] = None, max_requests: Optional[int] = None,
+            chunk_size: int = 50) -> Dict:
+        """
+        Classify in impact order until the queue or a budget runs out
+        Returns classify_artists-style statistics plus coverage before and after
+        """
+        start = time.time()
+        start_requests = self._requests_made()
+        queue = self.rank_unclassified()
+        before = self.coverage()
+
+        results = {
+            'queued': len(queue),
+            'total': 0,
+            'found': 0,
+            'not_found': 0,
+            'failed': 0,
+            'spotify': 0,
+            'musicbrainz': 0,
+            'artists': [],
+            'coverage_before': before
+        }
+
+        print(f"Queue: {len(queue):,} unclassified artists | "
+              f"weighted coverage {before['weighted_coverage']:.1f}%")
+
+        for offset in range(0, len(queue), chunk_size):
+            if max_seconds is not None and time.time() - start >= max_seconds:
+                print("Time budget reached")
+                break
+            if max_requests is not None and self._requests_made() - start_requests >= max_requests:
+                print("Request budget reached")
+                break
+
+            chunk = queue[offset:offset + chunk_size]
+            chunk_results = self.classifier.classify_artists_pipelined(chunk, save_interval=chunk_size)
+            for key in ('total', 'found', 'not_found', 'failed', 'spotify', 'musicbrainz'):
+                results[key] += chunk_results[key]
+            results['artists'].extend(chunk_results['artists'])
+
+            current = self.coverage()
+            remaining_impact = sum(self.scores.get(a, 0.0) for a in queue[offset + chunk_size:])
+            print(f"✓ {results['total']:,}/{len(queue):,} processed | "
+                  f"weighted coverage {current['weighted_coverage']:.1f}% | "
+                  f"impact left in queue {remaining_impact / self.total_impact * 100:.1f}%")
+
+        results['coverage_after'] = self.coverage()
+        results['requests'] = self._requests_made() - start_requests
+        results['seconds'] = time.time() - start
+        return results
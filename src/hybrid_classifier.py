@@ -4,8 +4,19 @@ Hybrid Genre Classifier for Dōsatsu
 Tries Spotify first (fast, accurate), falls back to MusicBrainz (comprehensive)
 """
 
-import json
+import os
+import queue
+import threading
+import time
 from typing import Dict, Optional, List
+
+import requests
+
+from src.utils.cache_store import CacheTTL, open_cache
+from src.utils.circuit_breaker import RetryQueue, retry_after
+from src.utils.cache_refresher import CacheRefresher
+from src.utils.artist_names import ArtistAliases
+from src.utils.genre_matcher import remap_genres
 from src.spotify_genre_classifier import SpotifyGenreClassifier
 from src.musicbrainz_classifier import MusicBrainzClassifier
 
@@ -18,75 +29,113 @@ class HybridClassifier:
     2. Try Spotify (fast, modern artists, accurate genres)
     3. Fall back to MusicBrainz (older artists, community tags)
     4. Cache all results in unified format
+
+    Spelling variants ("Beyoncé"/"Beyonce", "P!nk"/"Pink") are resolved to a
+    canonical name first and share its record instead of a new lookup.
+
+    Transient failures (outages, 429/5xx, open circuits) are never cached:
+    batch runs queue those artists for retry with backoff, and anything
+    still failing is left uncached for the next run.
     """
 
     def __init__(self, spotify_client_id: str, spotify_client_secret: str,
-                 cache_file: str = 'hybrid_genre_cache.json'):
+                 cache_file: str = 'hybrid_genre_cache.json', ttl: Optional[CacheTTL] = None,
+                 alias_file: Optional[str] = None,
+                 spotify_cache_file: str = 'spotify_genre_cache.json',
+                 musicbrainz_cache_file: str = 'musicbrainz_cache.json'):
         self.cache_file = cache_file
+        self.ttl = ttl or CacheTTL()
         self.cache = self._load_cache()
 
         # Initialize both classifiers
-        self.spotify = SpotifyGenreClassifier(spotify_client_id, spotify_client_secret)
-        self.musicbrainz = MusicBrainzClassifier()
+        self.spotify = SpotifyGenreClassifier(spotify_client_id, spotify_client_secret,
+                                              cache_file=spotify_cache_file)
+        self.musicbrainz = MusicBrainzClassifier(cache_file=musicbrainz_cache_file, ttl=self.ttl)
+
+        if alias_file is None:
+            alias_file = os.path.join(os.path.dirname(cache_file), 'artist_aliases.json')
+        self.aliases = ArtistAliases(alias_file)
+        if not self.aliases.exists:
+            self._learn_aliases_from_caches()
+
+        # Lookups answered from another spelling's record
+        self.request_stats = {
+            'alias_hits': 0
+        }
 
     def _load_cache(self) -> Dict:
-        """Load unified cache"""
-        try:
-            with open(self.cache_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        """Load unified cache (JSON log or shared SQLite store)"""
+        return open_cache(self.cache_file, 'artists', 'hybrid')
 
     def _save_cache(self):
         """Save unified cache"""
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.cache, f, indent=2)
+        self.cache.compact()
+        self.aliases.save()
 
-    def classify_artist(self, artist_name: str) -> Optional[Dict]:
-        """
-        Classify artist using both sources
-        Returns unified dict with genre info
-        """
-        # Check unified cache first
-        if artist_name in self.cache:
-            return self.cache[artist_name]
+    def _learn_aliases_from_caches(self):
+        """Seed the alias table from names and IDs already cached (no API calls)"""
+        for artist_name in self.cache.keys():
+            self.aliases.canonical(artist_name)
 
-        # Try Spotify first (preferred)
+        for artist_name, data in self.spotify.cache.items():
+            if data:
+                self.aliases.learn(artist_name, 'spotify', data.get('spotify_id'), data.get('name'))
+
+        for artist_name, data in self.musicbrainz.cache.items():
+            if data:
+                self.aliases.learn(artist_name, 'musicbrainz', data.get('mbid'), data.get('mb_name'),
+                                   data.get('mb_aliases') or ())
+
+        self.aliases.save()
+
+    def _alias_entry(self, artist_name: str, canonical: str) -> Optional[Dict]:
+        """Cache a spelling variant as a copy of its canonical artist's record"""
+        data = self.cache.get(canonical)
+        entry = {**data, 'name': artist_name, 'canonical_name': canonical} if data else None
+        self.cache[artist_name] = entry
+        return entry
+
+    def _cache_hit(self, artist_name: str) -> bool:
+        """Cached and usable: expired misses are retried, expired hits are left to the refresher"""
+        if artist_name not in self.cache:
+            return False
+        return self.cache[artist_name] is not None or not self.ttl.is_expired(self.cache, artist_name)
+
+    def _spotify_result(self, artist_name: str, spotify_data: Dict) -> Dict:
+        """Format Spotify data as a unified cache entry"""
+        return {
+            'name': artist_name,
+            'dosatsu_genre': spotify_data.get('dosatsu_genre', 'Unknown'),
+            'source': 'spotify',
+            'spotify_genres': spotify_data.get('spotify_genres', []),
+            'popularity': spotify_data.get('popularity', 0),
+            'spotify_id': spotify_data.get('spotify_id', ''),
+            'confidence': 'high'  # Spotify genres are curated
+        }
+
+    def _classify_with_spotify(self, artist_name: str, force_refresh: bool = False) -> Optional[Dict]:
+        """Spotify stage: cache the unified result and return it, or None on a miss"""
         # Check if already in Spotify cache
-        if artist_name in self.spotify.cache:
+        if not force_refresh and artist_name in self.spotify.cache:
             spotify_data = self.spotify.cache[artist_name]
-            result = {
-                'name': artist_name,
-                'dosatsu_genre': spotify_data.get('dosatsu_genre', 'Unknown'),
-                'source': 'spotify',
-                'spotify_genres': spotify_data.get('genres', []),
-                'popularity': spotify_data.get('popularity', 0),
-                'confidence': 'high'  # Spotify genres are curated
-            }
-            self.cache[artist_name] = result
-            self._save_cache()
-            return result
+        else:
+            # Search Spotify if not in cache
+            spotify_data = self.spotify.search_artist(artist_name, force_refresh=force_refresh)
 
-        # Search Spotify if not in cache
-        spotify_result = self.spotify.search_artist(artist_name)
+        if not spotify_data:
+            return None
 
-        if spotify_result:
-            # Format Spotify result
-            result = {
-                'name': artist_name,
-                'dosatsu_genre': spotify_result.get('dosatsu_genre', 'Unknown'),
-                'source': 'spotify',
-                'spotify_genres': spotify_result.get('genres', []),
-                'popularity': spotify_result.get('popularity', 0),
-                'confidence': 'high'
-            }
-            self.cache[artist_name] = result
-            self._save_cache()
-            return result
+        result = self._spotify_result(artist_name, spotify_data)
+        owner = self.aliases.learn(artist_name, 'spotify', spotify_data.get('spotify_id'),
+                                   spotify_data.get('name'))
+        if owner != artist_name:
+            result['canonical_name'] = owner
+        self.cache[artist_name] = result
+        return result
 
-        # Fall back to MusicBrainz
-        print(f"  → Spotify not found, trying MusicBrainz...")
-        mb_result = self.musicbrainz.classify_artist(artist_name)
+    def _classify_with_musicbrainz(self, artist_name: str, force_refresh: bool = False) -> Optional[Dict]:
+        """MusicBrainz stage: cache the unified result (or the miss) and return it"""
+        mb_result = self.musicbrainz.classify_artist(artist_name, force_refresh=force_refresh)
 
         if mb_result:
             # Format MusicBrainz result
@@ -98,15 +147,46 @@ class HybridClassifier:
                 'mbid': mb_result.get('mbid', ''),
                 'confidence': 'medium'  # Community tags are less precise
             }
+            owner = self.aliases.learn(artist_name, 'musicbrainz', mb_result.get('mbid'),
+                                       mb_result.get('mb_name'), mb_result.get('mb_aliases') or ())
+            if owner != artist_name:
+                result['canonical_name'] = owner
             self.cache[artist_name] = result
-            self._save_cache()
             return result
 
         # Not found in either source
         self.cache[artist_name] = None
-        self._save_cache()
         return None
 
+    def classify_artist(self, artist_name: str, force_refresh: bool = False) -> Optional[Dict]:
+        """
+        Classify artist using both sources
+        Returns unified dict with genre info
+        force_refresh re-queries both sources instead of using any cache
+        Raises requests.RequestException on transient failures (nothing is cached)
+        """
+        # Check unified cache first
+        if not force_refresh and self._cache_hit(artist_name):
+            return self.cache[artist_name]
+
+        # Spelling variant of a known artist: reuse its record
+        canonical = self.aliases.canonical(artist_name)
+        if canonical != artist_name:
+            if force_refresh or not self._cache_hit(canonical):
+                self.classify_artist(canonical, force_refresh)
+            else:
+                self.request_stats['alias_hits'] += 1
+            return self._alias_entry(artist_name, canonical)
+
+        # Try Spotify first (preferred)
+        result = self._classify_with_spotify(artist_name, force_refresh)
+        if result:
+            return result
+
+        # Fall back to MusicBrainz
+        print(f"  → Spotify not found, trying MusicBrainz...")
+        return self._classify_with_musicbrainz(artist_name, force_refresh)
+
     def classify_artists(self, artists: List[str], save_interval: int = 50) -> Dict:
         """
         Classify multiple artists using hybrid approach
@@ -116,14 +196,14 @@ class HybridClassifier:
             'total': len(artists),
             'found': 0,
             'not_found': 0,
+            'failed': 0,
             'spotify': 0,
             'musicbrainz': 0,
             'artists': []
         }
+        retries = RetryQueue()
 
-        for i, artist in enumerate(artists, 1):
-            result = self.classify_artist(artist)
-
+        def record(result: Optional[Dict]):
             if result:
                 results['found'] += 1
                 results['artists'].append(result)
@@ -137,6 +217,13 @@ class HybridClassifier:
             else:
                 results['not_found'] += 1
 
+        for i, artist in enumerate(artists, 1):
+            try:
+                record(self.classify_artist(artist))
+            except requests.RequestException as e:
+                print(f"  {artist}: {e} (queued for retry)")
+                retries.add(artist, retry_after(e))
+
             # Progress update
             if i % 10 == 0:
                 print(f"Progress: {i}/{len(artists)} ({i/len(artists)*100:.1f}%) - "
@@ -149,16 +236,175 @@ class HybridClassifier:
                 self._save_cache()
                 print(f"✓ Cache saved ({len(self.cache)} artists)")
 
+        if retries:
+            print(f"Retrying {len(retries)} artists after transient failures...")
+            results['failed'] = retries.drain(lambda artist: record(self.classify_artist(artist)))['failed']
+
+        # Final save
+        self._save_cache()
+
+        return results
+
+    def classify_artists_pipelined(self, artists: List[str], save_interval: int = 50,
+                                   spotify_interval: float = 0.1) -> Dict:
+        """
+        Classify multiple artists with Spotify and MusicBrainz running concurrently
+
+        The Spotify stage runs at its own rate and pushes misses onto a queue;
+        a MusicBrainz thread drains the queue under the shared 1 req/s limiter.
+        Total time approaches the slower stage instead of the sum of both.
+        Spelling variants are classified once under their canonical name.
+        Transient failures from either stage are retried after both finish.
+        Returns the same statistics as classify_artists
+        """
+        results = {
+            'total': len(artists),
+            'found': 0,
+            'not_found': 0,
+            'failed': 0,
+            'spotify': 0,
+            'musicbrainz': 0,
+            'artists': []
+        }
+        lock = threading.Lock()
+        misses = queue.Queue()
+        retries = RetryQueue()
+        processed = [0]
+        variants = []
+        pending = set()
+
+        def record(result: Optional[Dict]):
+            with lock:
+                processed[0] += 1
+                if result:
+                    results['found'] += 1
+                    results['artists'].append(result)
+                    source = result.get('source', 'unknown')
+                    if source in ('spotify', 'musicbrainz'):
+                        results[source] += 1
+                else:
+                    results['not_found'] += 1
+
+                done = processed[0]
+                if done % 10 == 0:
+                    print(f"Progress: {done}/{len(artists)} ({done/len(artists)*100:.1f}%) - "
+                          f"Found: {results['found']} (Spotify: {results['spotify']}, "
+                          f"MusicBrainz: {results['musicbrainz']}) | "
+                          f"Not found: {results['not_found']} | "
+                          f"MusicBrainz queue: {misses.qsize()}")
+
+                if done % save_interval == 0:
+                    self._save_cache()
+
+        def musicbrainz_stage():
+            while True:
+                item = misses.get()
+                if item is None:
+                    break
+                artist, counted = item
+                try:
+                    result = self._classify_with_musicbrainz(artist)
+                except requests.RequestException as e:
+                    print(f"  {artist}: {e} (queued for retry)")
+                    retries.add(item, retry_after(e))
+                    continue
+                except Exception as e:
+                    print(f"Error classifying {artist} via MusicBrainz: {e}")
+                    result = None
+                if counted:
+                    record(result)
+
+        mb_thread = threading.Thread(target=musicbrainz_stage, name='musicbrainz-stage', daemon=True)
+        mb_thread.start()
+
+        # Spotify stage runs on the calling thread
+        for artist in artists:
+            if self._cache_hit(artist):
+                record(self.cache[artist])
+                continue
+
+            canonical = self.aliases.canonical(artist)
+            counted = canonical == artist
+            if not counted:
+                # Spelling variant: classify the canonical name once, fill the variant in afterwards
+                variants.append((artist, canonical))
+                if canonical in pending or self._cache_hit(canonical):
+                    self.request_stats['alias_hits'] += 1
+                    continue
+
+            pending.add(canonical)
+            from_spotify_cache = canonical in self.spotify.cache
+            try:
+                result = self._classify_with_spotify(canonical)
+            except requests.RequestException as e:
+                print(f"  {canonical}: {e} (queued for retry)")
+                retries.add((canonical, counted), retry_after(e))
+                continue
+
+            if result:
+                if counted:
+                    record(result)
+            else:
+                misses.put((canonical, counted))
+
+            if not from_spotify_cache:
+                time.sleep(spotify_interval)
+
+        misses.put(None)
+        mb_thread.join()
+
+        def retry(item):
+            artist, counted = item
+            result = self.classify_artist(artist)
+            if counted:
+                record(result)
+
+        if retries:
+            print(f"Retrying {len(retries)} artists after transient failures...")
+            retries.drain(retry)
+            results['failed'] = sum(1 for _, counted in retries.failed if counted)
+
+        for artist, canonical in variants:
+            if canonical in self.cache:
+                record(self._alias_entry(artist, canonical))
+            else:
+                # Canonical name still failing: leave the variant uncached too
+                results['failed'] += 1
+
+        # Final save
+        self._save_cache()
+
         return results
 
     def get_genre(self, artist_name: str) -> str:
         """Quick genre lookup (for compatibility with existing code)"""
+        if artist_name not in self.cache:
+            artist_name = self.aliases.resolve(artist_name) or artist_name
+
         if artist_name in self.cache:
             data = self.cache[artist_name]
             if data:
                 return data.get('dosatsu_genre', 'Unknown')
         return 'Unknown'
 
+    def _refresh_entry(self, artist_name: str) -> Optional[Dict]:
+        """Refresh one expired entry; variants copy a canonical record that is already fresh"""
+        canonical = self.aliases.canonical(artist_name)
+        if canonical != artist_name and canonical in self.cache \
+                and not self.ttl.is_expired(self.cache, canonical):
+            return self._alias_entry(artist_name, canonical)
+        return self.classify_artist(artist_name, force_refresh=True)
+
+    def create_refresher(self, priority_fn=None) -> CacheRefresher:
+        """Refresher that re-classifies expired entries (see CacheRefresher.run/start)"""
+        return CacheRefresher(
+            self.cache, self.ttl,
+            self._refresh_entry,
+            priority_fn,
+            transports=(self.spotify.http, self.musicbrainz.http)
+        )
+
+
     def get_coverage_stats(self) -> Dict:
         """Analyze cache coverage and sources"""
         stats = {
@@ -187,6 +433,34 @@ class HybridClassifier:
 
         return stats
 
+    def remap_cache(self) -> Dict:
+        """
+        Recompute dosatsu_genre for every unified entry from its stored raw genres/tags
+        Spotify entries fall back to the Spotify cache when their own genre list is empty
+        No API calls - use after editing either mapping table
+        Returns dict with statistics and the list of changed artists
+        """
+        self.spotify._genre_matcher = None
+        self.musicbrainz._tag_matcher = None
+
+        results = remap_genres(self.cache, self._remapped_genre, 'hybrid')
+        if results['changed']:
+            self._save_cache()
+
+        return results
+
+    def _remapped_genre(self, artist_name: str, data: Dict) -> Optional[str]:
+        """Genre for a unified entry from its raw source data, or None if there is none"""
+        source = data.get('source')
+        if source == 'spotify':
+            spotify_key = data.get('canonical_name', artist_name)
+            raw = data.get('spotify_genres') or (self.spotify.cache.get(spotify_key) or {}).get('spotify_genres', [])
+            return self.spotify._map_to_dosatsu_genre(raw) if raw else None
+        if source == 'musicbrainz':
+            raw = data.get('mb_tags', [])
+            return self.musicbrainz._map_tags_to_genre(raw) if raw else None
+        return None
+
     def import_existing_caches(self):
         """
         Import data from existing Spotify and MusicBrainz caches
@@ -202,7 +476,7 @@ class HybridClassifier:
                         'name': artist,
                         'dosatsu_genre': data.get('dosatsu_genre', 'Unknown'),
                         'source': 'spotify',
-                        'spotify_genres': data.get('genres', []),
+                        'spotify_genres': data.get('spotify_genres', []),
                         'popularity': data.get('popularity', 0),
                         'confidence': 'high'
                     }
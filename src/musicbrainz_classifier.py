@@ -4,60 +4,45 @@ MusicBrainz Genre Classifier for Dōsatsu
 Fallback classifier for artists not found on Spotify
 """
 
-import json
+import os
 import requests
-import time
 from typing import Dict, Optional, List
+from src.utils.http_client import HTTPTransport, get_transport, service_url
+from src.utils.circuit_breaker import RetryQueue, is_transient, retry_after
+from src.utils.cache_store import CacheTTL, open_cache
+from src.utils.cache_refresher import CacheRefresher
+from src.utils.genre_matcher import GenreMatcher, get_matcher, remap_genres
+from src.utils.rate_limiter import get_musicbrainz_limiter
+from src.utils.musicbrainz_dump import MusicBrainzDump
 
 class MusicBrainzClassifier:
-    """Classify artists using MusicBrainz API"""
-
-    def __init__(self, cache_file: str = 'musicbrainz_cache.json'):
+    """
+    Classify artists using MusicBrainz API
+
+    If a local dump index exists (scripts/import_musicbrainz_dump.py, path in
+    dump_db or DOSATSU_MUSICBRAINZ_DUMP), artists are looked up there first
+    and only dump misses use the rate-limited web API. offline=True skips
+    the API entirely and leaves dump misses uncached.
+    """
+
+    def __init__(self, cache_file: str = 'musicbrainz_cache.json',
+                 transport: Optional[HTTPTransport] = None, ttl: Optional[CacheTTL] = None,
+                 base_url: Optional[str] = None, dump_db: Optional[str] = None,
+                 offline: bool = False):
         self.cache_file = cache_file
+        self.ttl = ttl or CacheTTL()
         self.cache = self._load_cache()
-        self.base_url = "https://musicbrainz.org/ws/2/"
+        self.base_url = service_url('musicbrainz', base_url) + '/'
         self.user_agent = "Dosatsu/1.0 (jeremy@whetstone.com)"
-        self.rate_limit = 1.0  # 1 request per second
-
-    def _load_cache(self) -> Dict:
-        """Load cached MusicBrainz data"""
-        try:
-            with open(self.cache_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-
-    def _save_cache(self):
-        """Save cache to file"""
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.cache, f, indent=2)
-
-    def _make_request(self, endpoint: str, params: Dict) -> Optional[Dict]:
-        """Make API request with rate limiting"""
-        headers = {
-            'User-Agent': self.user_agent,
-            'Accept': 'application/json'
-        }
-
-        url = f"{self.base_url}{endpoint}"
+        self.rate_limiter = get_musicbrainz_limiter()  # 1 request per second, shared
+        self.http = transport or get_transport()
 
-        try:
-            response = requests.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            time.sleep(self.rate_limit)  # Respect rate limit
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"MusicBrainz API error: {e}")
-            time.sleep(self.rate_limit)
-            return None
+        dump_db = dump_db or os.getenv('DOSATSU_MUSICBRAINZ_DUMP')
+        self.dump = MusicBrainzDump(dump_db) if dump_db and os.path.exists(dump_db) else None
+        self.offline = offline
 
-    def _map_tags_to_genre(self, tags: List[str]) -> str:
-        """Map MusicBrainz tags to Dōsatsu genres"""
-        # Convert all tags to lowercase for matching
-        tags_lower = [tag.lower() for tag in tags]
-
-        # Genre mapping (order matters - check most specific first)
-        genre_mappings = {
+        # MusicBrainz tag keywords per Dōsatsu genre (order breaks score ties)
+        self.tag_mapping = {
             'Hip-Hop': [
                 'hip hop', 'hip-hop', 'rap', 'trap', 'gangsta rap',
                 'underground hip hop', 'conscious hip hop', 'east coast hip hop',
@@ -97,18 +82,100 @@ class MusicBrainzClassifier:
             ]
         }
 
-        # Count matches for each genre
-        genre_scores = {}
-        for genre, keywords in genre_mappings.items():
-            score = 0
-            for tag in tags_lower:
-                for keyword in keywords:
-                    if keyword in tag:
-                        # Weight earlier tags more heavily
-                        position_weight = 1.0 - (tags_lower.index(tag) * 0.05)
-                        score += max(position_weight, 0.5)
-            if score > 0:
-                genre_scores[genre] = score
+        self._tag_matcher = None
+
+        # Cost model: every API call costs one rate-limit slot
+        self.request_stats = {
+            'searches': 0,
+            'tag_lookups': 0,
+            'tag_lookups_saved': 0,
+            'dump_hits': 0
+        }
+
+    def _load_cache(self) -> Dict:
+        """Load cached MusicBrainz data (JSON log or shared SQLite store)"""
+        return open_cache(self.cache_file, 'artists', 'musicbrainz')
+
+    def _save_cache(self):
+        """Save cache to file"""
+        self.cache.compact()
+
+    def _make_request(self, endpoint: str, params: Dict) -> Optional[Dict]:
+        """
+        Make API request with rate limiting
+        Transient failures (outage, 503, open circuit) are raised so they never get cached as misses
+        """
+        headers = {
+            'User-Agent': self.user_agent,
+            'Accept': 'application/json'
+        }
+
+        url = f"{self.base_url}{endpoint}"
+
+        try:
+            self.rate_limiter.acquire()  # Respect rate limit
+            response = self.http.get(url, params=params, headers=headers)
+            self.rate_limiter.defer_unavailable(response)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            if is_transient(e):
+                raise
+            print(f"MusicBrainz API error: {e}")
+            return None
+
+    def remap_cache(self) -> Dict:
+        """
+        Recompute dosatsu_genre for every cached artist from its stored tags
+        No API calls - use after editing tag_mapping
+        Returns dict with statistics and the list of changed artists
+        """
+        self._tag_matcher = None
+
+        results = remap_genres(
+            self.cache,
+            lambda artist_name, data: self._map_tags_to_genre(data['tags']) if data.get('tags') else None,
+            'musicbrainz'
+        )
+        if results['changed']:
+            self._save_cache()
+
+        return results
+
+    def _get_tag_matcher(self) -> GenreMatcher:
+        """Compiled matcher for tag_mapping (set _tag_matcher = None after editing the table)"""
+        if self._tag_matcher is None:
+            self._tag_matcher = get_matcher([
+                (keyword, genre)
+                for genre, keywords in self.tag_mapping.items()
+                for keyword in keywords
+            ])
+        return self._tag_matcher
+
+    def _map_tags_to_genre(self, tags: List[str]) -> str:
+        """Map MusicBrainz tags to Dōsatsu genres"""
+        # Convert all tags to lowercase for matching
+        tags_lower = [tag.lower() for tag in tags]
+        matcher = self._get_tag_matcher()
+
+        # Weight earlier tags more heavily
+        first_position = {}
+        for position, tag in enumerate(tags_lower):
+            first_position.setdefault(tag, position)
+
+        # Count keyword matches for each genre
+        totals = {}
+        for tag in tags_lower:
+            position_weight = max(1.0 - (first_position[tag] * 0.05), 0.5)
+            for genre, matches in matcher.category_counts(tag).items():
+                for _ in range(matches):
+                    totals[genre] = totals.get(genre, 0) + position_weight
+
+        genre_scores = {
+            genre: totals[genre]
+            for genre in self.tag_mapping
+            if totals.get(genre, 0) > 0
+        }
 
         # Return genre with highest score
         if genre_scores:
@@ -116,10 +183,22 @@ class MusicBrainzClassifier:
 
         return 'Unknown'
 
-    def search_artist(self, artist_name: str) -> Optional[str]:
+    def _extract_tags(self, entity: Dict) -> List[str]:
+        """Tags and genres from an artist entity, most votes first"""
+        votes = {}
+        for tag in entity.get('genres', []) + entity.get('tags', []):
+            name = tag.get('name')
+            if name:
+                votes[name] = max(votes.get(name, 0), tag.get('count', 0))
+
+        # Return tags sorted by vote count (most popular first)
+        tags = sorted(votes, key=lambda name: votes[name], reverse=True)
+        return tags[:20]  # Top 20 tags
+
+    def search_artist_entity(self, artist_name: str) -> Optional[Dict]:
         """
-        Search for artist and return MBID (MusicBrainz ID)
-        Returns the best matching artist ID
+        Search for artist and return the best matching artist entity
+        Search results already carry community tags for most artists
         """
         params = {
             'query': f'artist:"{artist_name}"',
@@ -128,51 +207,89 @@ class MusicBrainzClassifier:
         }
 
         data = self._make_request('artist', params)
+        self.request_stats['searches'] += 1
 
         if data and 'artists' in data and len(data['artists']) > 0:
-            return data['artists'][0]['id']
+            return data['artists'][0]
 
         return None
 
+    def search_artist(self, artist_name: str) -> Optional[str]:
+        """
+        Search for artist and return MBID (MusicBrainz ID)
+        Returns the best matching artist ID
+        """
+        artist = self.search_artist_entity(artist_name)
+        return artist['id'] if artist else None
+
     def get_artist_tags(self, mbid: str) -> List[str]:
         """Get tags/genres for an artist by MBID"""
         params = {
-            'inc': 'tags+ratings',
+            'inc': 'tags+genres+ratings',
             'fmt': 'json'
         }
 
         data = self._make_request(f'artist/{mbid}', params)
+        self.request_stats['tag_lookups'] += 1
 
-        if data and 'tags' in data:
-            # Return tags sorted by vote count (most popular first)
-            tags = sorted(data['tags'], key=lambda x: x.get('count', 0), reverse=True)
-            return [tag['name'] for tag in tags[:20]]  # Top 20 tags
+        if data:
+            return self._extract_tags(data)
 
         return []
 
-    def classify_artist(self, artist_name: str) -> Optional[Dict]:
+    def get_cost_report(self) -> Dict:
+        """Report API calls made and calls saved by using search-result tags and the dump"""
+        calls_made = self.request_stats['searches'] + self.request_stats['tag_lookups']
+        calls_saved = self.request_stats['tag_lookups_saved'] + self.request_stats['dump_hits']
+
+        return {
+            **self.request_stats,
+            'calls_made': calls_made,
+            'calls_saved': calls_saved,
+            'calls_per_artist': calls_made / self.request_stats['searches'] if self.request_stats['searches'] else 0.0,
+            'seconds_saved': calls_saved * self.rate_limiter.min_interval
+        }
+
+    def _cache_hit(self, artist_name: str) -> bool:
+        """Cached and usable: expired misses are retried, expired hits are left to the refresher"""
+        if artist_name not in self.cache:
+            return False
+        return self.cache[artist_name] is not None or not self.ttl.is_expired(self.cache, artist_name)
+
+    def classify_artist(self, artist_name: str, force_refresh: bool = False) -> Optional[Dict]:
         """
         Classify a single artist
         Returns dict with genre info or None if not found
+        Raises requests.RequestException on transient failures (nothing is cached)
         """
         # Check cache first
-        if artist_name in self.cache:
+        if not force_refresh and self._cache_hit(artist_name):
             return self.cache[artist_name]
 
-        # Search for artist
-        mbid = self.search_artist(artist_name)
+        # Local dump first, then the web API
+        artist = self.dump.lookup(artist_name) if self.dump else None
+        if artist:
+            self.request_stats['dump_hits'] += 1
+        elif self.offline:
+            return None
+        else:
+            artist = self.search_artist_entity(artist_name)
 
-        if not mbid:
+        if not artist:
             self.cache[artist_name] = None
-            self._save_cache()
             return None
 
-        # Get tags
-        tags = self.get_artist_tags(mbid)
+        mbid = artist['id']
+
+        # Use tags from the search response, only look up the artist when they're missing
+        tags = self._extract_tags(artist)
+        if tags:
+            self.request_stats['tag_lookups_saved'] += 1
+        elif not self.offline:
+            tags = self.get_artist_tags(mbid)
 
         if not tags:
             self.cache[artist_name] = None
-            self._save_cache()
             return None
 
         # Map to genre
@@ -180,6 +297,8 @@ class MusicBrainzClassifier:
 
         result = {
             'name': artist_name,
+            'mb_name': artist.get('name'),  # The name MusicBrainz matched
+            'mb_aliases': [alias['name'] for alias in artist.get('aliases') or [] if alias.get('name')],
             'mbid': mbid,
             'tags': tags[:10],  # Store top 10 tags
             'dosatsu_genre': genre,
@@ -187,7 +306,6 @@ class MusicBrainzClassifier:
         }
 
         self.cache[artist_name] = result
-        self._save_cache()
 
         return result
 
@@ -200,18 +318,25 @@ class MusicBrainzClassifier:
             'total': len(artists),
             'found': 0,
             'not_found': 0,
+            'failed': 0,
             'artists': []
         }
+        retries = RetryQueue()
 
-        for i, artist in enumerate(artists, 1):
-            result = self.classify_artist(artist)
-
+        def record(result: Optional[Dict]):
             if result:
                 results['found'] += 1
                 results['artists'].append(result)
             else:
                 results['not_found'] += 1
 
+        for i, artist in enumerate(artists, 1):
+            try:
+                record(self.classify_artist(artist))
+            except requests.exceptions.RequestException as e:
+                print(f"  {artist}: {e} (queued for retry)")
+                retries.add(artist, retry_after(e))
+
             # Progress update
             if i % 10 == 0:
                 print(f"Progress: {i}/{len(artists)} ({i/len(artists)*100:.1f}%) - "
@@ -222,6 +347,19 @@ class MusicBrainzClassifier:
                 self._save_cache()
                 print(f"✓ Cache saved ({len(self.cache)} artists)")
 
+        # Transient failures: retry with backoff once the service recovers
+        if retries:
+            print(f"Retrying {len(retries)} artists after transient failures...")
+            results['retries'] = retries.drain(lambda artist: record(self.classify_artist(artist)))
+            results['failed'] = results['retries']['failed']
+
+        # Final save
+        self._save_cache()
+
+        results['api_cost'] = self.get_cost_report()
+        print(f"API calls: {results['api_cost']['calls_made']} made, "
+              f"{results['api_cost']['calls_saved']} saved via search-result tags and the local dump")
+
         return results
 
     def get_genre(self, artist_name: str) -> str:
@@ -231,3 +369,13 @@ class MusicBrainzClassifier:
             if data:
                 return data.get('dosatsu_genre', 'Unknown')
         return 'Unknown'
+
+    def create_refresher(self, priority_fn=None) -> CacheRefresher:
+        """Refresher that re-classifies expired entries (see CacheRefresher.run/start)"""
+        return CacheRefresher(
+            self.cache, self.ttl,
+            lambda artist_name: self.classify_artist(artist_name, force_refresh=True),
+            priority_fn,
+            transports=(self.http,)
+        )
+
@@ -5,20 +5,37 @@ Automatically classify artists using Spotify Web API
 """
 
 import requests
-import json
 import base64
 import time
 from typing import Optional, Dict, List
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.http_client import HTTPTransport, get_transport, service_url
+from src.utils.circuit_breaker import RetryQueue, is_transient, retry_after
+from src.utils.cache_store import CacheTTL, open_cache
+from src.utils.genre_matcher import GenreMatcher, get_matcher, remap_genres
 
 class SpotifyGenreClassifier:
     """Classify artist genres using Spotify API"""
 
-    def __init__(self, client_id: str, client_secret: str, cache_file: str = "spotify_genre_cache.json"):
+    def __init__(self, client_id: str, client_secret: str, cache_file: str = "spotify_genre_cache.json",
+                 transport: Optional[HTTPTransport] = None, ttl: Optional[CacheTTL] = None,
+                 api_url: Optional[str] = None, accounts_url: Optional[str] = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.cache_file = cache_file
         self.access_token = None
         self.token_expires = 0
+        self.http = transport or get_transport()
+        self.api_url = service_url('spotify_api', api_url)
+        self.accounts_url = service_url('spotify_accounts', accounts_url)
+        # Popularity and followers drift weekly; genres much more slowly
+        self.ttl = ttl or CacheTTL(positive_ttl=7 * 86400)
         self.cache = self._load_cache()
 
         # Map Spotify's 5000+ genres to our 7 main categories
@@ -121,19 +138,15 @@ class SpotifyGenreClassifier:
             "corrido": "Latin",
             "mariachi": "Latin",
         }
+        self._genre_matcher = None
 
     def _load_cache(self) -> Dict:
-        """Load previously classified artists from cache"""
-        try:
-            with open(self.cache_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        """Load previously classified artists from cache (JSON log or shared SQLite store)"""
+        return open_cache(self.cache_file, 'artists', 'spotify')
 
     def _save_cache(self):
         """Save cache to file"""
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.cache, f, indent=2)
+        self.cache.compact()
         print(f"✓ Saved {len(self.cache)} artists to cache: {self.cache_file}")
 
     def _get_access_token(self):
@@ -143,7 +156,7 @@ class SpotifyGenreClassifier:
             return self.access_token
 
         # Get new token
-        auth_url = "https://accounts.spotify.com/api/token"
+        auth_url = f"{self.accounts_url}/api/token"
 
         # Encode credentials
         credentials = f"{self.client_id}:{self.client_secret}"
@@ -159,7 +172,7 @@ class SpotifyGenreClassifier:
         }
 
         try:
-            response = requests.post(auth_url, headers=headers, data=data)
+            response = self.http.post(auth_url, headers=headers, data=data)
             response.raise_for_status()
 
             token_data = response.json()
@@ -170,13 +183,18 @@ class SpotifyGenreClassifier:
             return self.access_token
 
         except requests.RequestException as e:
+            if is_transient(e):
+                raise
             print(f"Error getting Spotify access token: {e}")
             return None
 
-    def search_artist(self, artist_name: str) -> Optional[Dict]:
-        """Search for artist on Spotify"""
+    def search_artist(self, artist_name: str, force_refresh: bool = False) -> Optional[Dict]:
+        """
+        Search for artist on Spotify
+        Raises requests.RequestException on transient failures (outage, 429, open circuit)
+        """
         # Check cache first
-        if artist_name in self.cache:
+        if not force_refresh and artist_name in self.cache:
             return self.cache[artist_name]
 
         # Get access token
@@ -185,7 +203,7 @@ class SpotifyGenreClassifier:
             return None
 
         # Search Spotify
-        search_url = "https://api.spotify.com/v1/search"
+        search_url = f"{self.api_url}/v1/search"
         headers = {
             "Authorization": f"Bearer {token}"
         }
@@ -196,24 +214,14 @@ class SpotifyGenreClassifier:
         }
 
         try:
-            response = requests.get(search_url, headers=headers, params=params)
+            response = self.http.get(search_url, headers=headers, params=params)
             response.raise_for_status()
 
             data = response.json()
 
             if data['artists']['items']:
                 artist = data['artists']['items'][0]
-
-                result = {
-                    'name': artist['name'],
-                    'spotify_genres': artist.get('genres', []),
-                    'popularity': artist.get('popularity', 0),
-                    'followers': artist.get('followers', {}).get('total', 0),
-                    'spotify_id': artist['id']
-                }
-
-                # Map to our genre categories
-                result['dosatsu_genre'] = self._map_to_dosatsu_genre(result['spotify_genres'])
+                result = self._build_result(artist)
 
                 # Cache the result
                 self.cache[artist_name] = result
@@ -223,9 +231,177 @@ class SpotifyGenreClassifier:
             return None
 
         except requests.RequestException as e:
+            if is_transient(e):
+                raise
             print(f"Error searching for {artist_name}: {e}")
             return None
 
+    def _build_result(self, artist: Dict) -> Dict:
+        """Convert a Spotify artist object into our cache format"""
+        result = {
+            'name': artist['name'],
+            'spotify_genres': artist.get('genres', []),
+            'popularity': artist.get('popularity', 0),
+            'followers': artist.get('followers', {}).get('total', 0),
+            'spotify_id': artist['id']
+        }
+
+        # Map to our genre categories
+        result['dosatsu_genre'] = self._map_to_dosatsu_genre(result['spotify_genres'])
+
+        return result
+
+    def get_artists_by_ids(self, spotify_ids: List[str]) -> List[Optional[Dict]]:
+        """
+        Fetch up to 50 artists in one call via the several-artists endpoint
+        Returns Spotify artist objects in request order (None for unknown IDs)
+        """
+        if len(spotify_ids) > 50:
+            raise ValueError("Spotify allows at most 50 artist IDs per request")
+
+        token = self._get_access_token()
+        if not token:
+            return []
+
+        url = f"{self.api_url}/v1/artists"
+        headers = {
+            "Authorization": f"Bearer {token}"
+        }
+        params = {
+            "ids": ",".join(spotify_ids)
+        }
+
+        try:
+            response = self.http.get(url, headers=headers, params=params)
+            response.raise_for_status()
+            return response.json().get('artists', [])
+
+        except requests.RequestException as e:
+            if is_transient(e):
+                raise  # An outage must not look like deleted artists
+            print(f"Error fetching {len(spotify_ids)} artists by ID: {e}")
+            return []
+
+    def refresh_cached_artists(self, batch_size: int = 50, only_expired: bool = False) -> Dict:
+        """
+        Refresh popularity, followers and genres for every cached artist
+        Uses cached spotify_ids, 50 per request, and only rewrites entries that changed
+        only_expired limits the refresh to entries older than the cache TTL
+        Batches that fail transiently are retried with backoff, then counted as failed
+        Returns dict with statistics and the list of changed artists
+        """
+        batch_size = min(batch_size, 50)
+        expired = set(self.ttl.expired_keys(self.cache)) if only_expired else None
+
+        # Group cache keys by Spotify ID (several chart spellings can share one artist)
+        keys_by_id = {}
+        for artist_name, data in self.cache.items():
+            if expired is not None and artist_name not in expired:
+                continue
+            if data and data.get('spotify_id'):
+                keys_by_id.setdefault(data['spotify_id'], []).append(artist_name)
+
+        spotify_ids = list(keys_by_id.keys())
+
+        results = {
+            'total': len(spotify_ids),
+            'requests': 0,
+            'changed': 0,
+            'unchanged': 0,
+            'missing': 0,
+            'failed': 0,
+            'changes': []
+        }
+
+        print(f"Refreshing {len(spotify_ids)} cached artists in batches of {batch_size}...")
+        retries = RetryQueue()
+
+        def refresh_batch(batch):
+            results['requests'] += 1
+            artists = self.get_artists_by_ids(list(batch))
+
+            if not artists:
+                results['missing'] += len(batch)
+                return
+
+            for spotify_id, artist in zip(batch, artists):
+                if not artist:
+                    results['missing'] += 1
+                    continue
+
+                fresh = self._build_result(artist)
+
+                for artist_name in keys_by_id[spotify_id]:
+                    cached = self.cache[artist_name]
+                    changed_fields = [
+                        field for field in fresh
+                        if cached.get(field) != fresh[field]
+                    ]
+
+                    if not changed_fields:
+                        results['unchanged'] += 1
+                        self.cache.touch(artist_name)
+                        continue
+
+                    results['changed'] += 1
+                    results['changes'].append({
+                        'artist': artist_name,
+                        'fields': changed_fields,
+                        'old_genre': cached.get('dosatsu_genre'),
+                        'new_genre': fresh['dosatsu_genre']
+                    })
+                    self.cache[artist_name] = {**cached, **fresh}
+
+        for start in range(0, len(spotify_ids), batch_size):
+            batch = tuple(spotify_ids[start:start + batch_size])
+            try:
+                refresh_batch(batch)
+            except requests.RequestException as e:
+                print(f"Error fetching {len(batch)} artists by ID: {e}, queued for retry")
+                retries.add(batch, retry_after(e))
+
+            # Rate limiting between batches
+            time.sleep(0.1)
+
+        if retries:
+            print(f"Retrying {len(retries)} batches after transient failures...")
+            retries.drain(refresh_batch)
+            results['failed'] = sum(len(batch) for batch in retries.failed)
+
+        if results['changed'] > 0:
+            self._save_cache()
+
+        print(f"✓ Refreshed {results['total']} artists with {results['requests']} requests "
+              f"({results['changed']} changed, {results['missing']} missing, {results['failed']} failed)")
+
+        return results
+
+    def _get_genre_matcher(self) -> GenreMatcher:
+        """Compiled matcher for genre_mapping (set _genre_matcher = None after editing the table)"""
+        if self._genre_matcher is None:
+            self._genre_matcher = get_matcher(list(self.genre_mapping.items()))
+        return self._genre_matcher
+
+    def remap_cache(self) -> Dict:
+        """
+        Recompute dosatsu_genre for every cached artist from its stored spotify_genres
+        No API calls - use after editing genre_mapping
+        Returns dict with statistics and the list of changed artists
+        """
+        self._genre_matcher = None
+
+        results = remap_genres(
+            self.cache,
+            lambda artist_name, data: (
+                self._map_to_dosatsu_genre(data['spotify_genres']) if data.get('spotify_genres') else None
+            ),
+            'spotify'
+        )
+        if results['changed']:
+            self._save_cache()
+
+        return results
+
     def _map_to_dosatsu_genre(self, spotify_genres: List[str]) -> str:
         """Map Spotify's genres to our main categories"""
         if not spotify_genres:
@@ -233,14 +409,12 @@ class SpotifyGenreClassifier:
 
         # Count matches for each category
         category_scores = {}
+        matcher = self._get_genre_matcher()
 
         for genre in spotify_genres:
-            genre_lower = genre.lower()
-
-            # Check each mapping
-            for spotify_term, dosatsu_category in self.genre_mapping.items():
-                if spotify_term in genre_lower:
-                    category_scores[dosatsu_category] = category_scores.get(dosatsu_category, 0) + 1
+            # Every mapping term contained in this genre, in one pass
+            for dosatsu_category, matches in matcher.category_counts(genre).items():
+                category_scores[dosatsu_category] = category_scores.get(dosatsu_category, 0) + matches
 
         # Return category with most matches
         if category_scores:
@@ -271,6 +445,7 @@ class SpotifyGenreClassifier:
         classified = 0
         from_cache = 0
         not_found = 0
+        retries = RetryQueue()
 
         for i, artist_name in enumerate(artist_list, 1):
             # Check cache first
@@ -281,7 +456,12 @@ class SpotifyGenreClassifier:
                 continue
 
             # Query Spotify
-            result = self.search_artist(artist_name)
+            try:
+                result = self.search_artist(artist_name)
+            except requests.RequestException as e:
+                print(f"{i:4d}. {artist_name:<40} → ERROR ({e}), queued for retry")
+                retries.add(artist_name, retry_after(e))
+                continue
 
             if result:
                 classified += 1
@@ -297,6 +477,19 @@ class SpotifyGenreClassifier:
             # Rate limiting: ~1 request per 0.1 seconds = safe
             time.sleep(0.1)
 
+        # Transient failures: retry with backoff once Spotify recovers
+        def retry(artist_name: str):
+            nonlocal classified, not_found
+            if self.search_artist(artist_name):
+                classified += 1
+            else:
+                not_found += 1
+
+        failed = 0
+        if retries:
+            print(f"Retrying {len(retries)} artists after transient failures...")
+            failed = retries.drain(retry)['failed']
+
         # Final save
         self._save_cache()
 
@@ -308,6 +501,8 @@ class SpotifyGenreClassifier:
         print(f"From cache: {from_cache}")
         print(f"Newly classified: {classified}")
         print(f"Not found: {not_found}")
+        if failed:
+            print(f"Failed (retry next run): {failed}")
         print(f"Total in cache: {len(self.cache)}")
         print()
 
@@ -315,7 +510,8 @@ class SpotifyGenreClassifier:
             'total': len(artist_list),
             'classified': classified,
             'from_cache': from_cache,
-            'not_found': not_found
+            'not_found': not_found,
+            'failed': failed
         }
 
     def get_genre(self, artist_name: str) -> str:
@@ -325,7 +521,11 @@ class SpotifyGenreClassifier:
             return self.cache[artist_name]['dosatsu_genre']
 
         # Search Spotify
-        result = self.search_artist(artist_name)
+        try:
+            result = self.search_artist(artist_name)
+        except requests.RequestException as e:
+            print(f"Error searching for {artist_name}: {e}")
+            return "Unknown"
 
         if result:
             return result['dosatsu_genre']
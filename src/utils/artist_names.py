@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Artist Name Normalization for Dōsatsu
+Collapse spelling variants of chart artist strings onto one canonical name
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, Optional
+
+
+def normalize_artist_name(name: str) -> str:
+    """
+    Matching key for an artist string
+
+    Folds accents and case, reads in-word "!" and "$" as letters (P!nk, Ke$ha),
+    treats "&" and "+" as "and", drops apostrophes and periods, turns other
+    punctuation into spaces and strips a leading "The".
+    """
+    text = re.sub(r'^the ', '', _fold(name))
+    return text or name.casefold().strip()
+
+
+def normalize_title(title: str) -> str:
+    """Matching key for a song title: the same folding, but a leading "The" is kept"""
+    return _fold(title) or title.casefold().strip()
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = text.casefold()
+
+    text = re.sub(r'(?<=\w)!(?=\w)', 'i', text)
+    text = re.sub(r'\$(?=\w)', 's', text)
+    text = re.sub(r'\s*[&+]\s*', ' and ', text)
+    text = re.sub(r"['’`.]", '', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class ArtistAliases:
+    """
+    Persistent alias table: normalized name -> canonical artist string
+
+    The first spelling seen for a normalized key becomes canonical. Spotify
+    and MusicBrainz IDs are recorded against it only when the queried name
+    normalizes to the service's matched name or one of its aliases, so a
+    fuzzy search hit or a collaboration credit ("X Featuring Y") never
+    redirects a name to another artist. MusicBrainz aliases are what link
+    different spellings: "Puff Daddy" resolving to the MBID already
+    recorded for "Diddy" makes "Diddy" its canonical name.
+    """
+
+    def __init__(self, alias_file: str = 'artist_aliases.json'):
+        self.alias_file = alias_file
+        self._lock = threading.Lock()
+        self.aliases = {}      # normalized name -> canonical name
+        self.ids = {}          # "service:id" -> canonical name
+        self.exists = self._load()
+
+    def _load(self) -> bool:
+        try:
+            with open(self.alias_file, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+
+        self.aliases = data.get('aliases', {})
+        self.ids = data.get('ids', {})
+        return True
+
+    def save(self):
+        """Write the table atomically"""
+        with self._lock:
+            data = {'aliases': dict(self.aliases), 'ids': dict(self.ids)}
+
+        tmp_file = f"{self.alias_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.alias_file)
+
+    def canonical(self, artist_name: str) -> str:
+        """Canonical spelling for a name, registering it if the key is new"""
+        key = normalize_artist_name(artist_name)
+        with self._lock:
+            return self.aliases.setdefault(key, artist_name)
+
+    def resolve(self, artist_name: str) -> Optional[str]:
+        """Canonical spelling if the name's key is known, without registering it"""
+        with self._lock:
+            return self.aliases.get(normalize_artist_name(artist_name))
+
+    def learn(self, artist_name: str, service: str, entity_id: Optional[str],
+              matched_name: Optional[str], aliases: Iterable[str] = ()) -> str:
+        """
+        Record the service ID a name resolved to, if the service matched the
+        same name or lists it among the artist's aliases
+        Returns the canonical name, which changes if the ID already belonged to another artist
+        """
+        key = normalize_artist_name(artist_name)
+        spellings = {normalize_artist_name(name) for name in [matched_name, *aliases] if name}
+
+        with self._lock:
+            canonical = self.aliases.setdefault(key, artist_name)
+            if not entity_id or key not in spellings:
+                return canonical
+
+            owner = self.ids.setdefault(f"{service}:{entity_id}", canonical)
+            if owner != canonical:
+                self.aliases[key] = owner
+            return owner
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            names = len(self.aliases)
+            canonical = len(set(self.aliases.values()))
+        return {'names': names, 'canonical_artists': canonical, 'ids': len(self.ids)}
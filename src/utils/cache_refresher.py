@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Background Cache Refresher for Dōsatsu
+Re-queries expired cache entries in priority order within a request budget
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from src.utils.cache_store import CacheTTL
+from src.utils.http_client import requests_sent
+
+
+class CacheRefresher:
+    """
+    Keep a cache fresh with a steady trickle of requests
+
+    refresh_fn(key) must re-query the source for one key (bypassing the
+    cache) and write the result back. priority_fn(key) returns a sort key;
+    lower sorts first. By default the stalest entries go first.
+
+    transports are the HTTPTransports refresh_fn sends through; the request
+    budget is counted from their metrics, since one refresh can take several
+    calls (a hybrid refresh may hit both Spotify and MusicBrainz).
+    """
+
+    def __init__(self, cache, ttl: CacheTTL, refresh_fn: Callable[[str], object],
+                 priority_fn: Optional[Callable[[str], object]] = None, transports=()):
+        self.cache = cache
+        self.ttl = ttl
+        self.refresh_fn = refresh_fn
+        self.priority_fn = priority_fn or (lambda key: cache.updated_at(key) or 0)
+        self.transports = transports
+        self._thread = None
+        self._stop = threading.Event()
+
+    def run(self, max_requests: int = 100, max_seconds: Optional[float] = None) -> Dict:
+        """Refresh expired entries until the request or time budget runs out"""
+        start = time.time()
+        start_requests = requests_sent(self.transports)
+        expired = sorted(self.ttl.expired_keys(self.cache), key=self.priority_fn)
+
+        results = {
+            'expired': len(expired),
+            'refreshed': 0,
+            'found': 0,
+            'errors': 0
+        }
+
+        for key in expired:
+            if requests_sent(self.transports) - start_requests >= max_requests:
+                break
+            if max_seconds is not None and time.time() - start > max_seconds:
+                break
+            if self._stop.is_set():
+                break
+
+            try:
+                result = self.refresh_fn(key)
+            except Exception as e:
+                print(f"Error refreshing {key}: {e}")
+                results['errors'] += 1
+                continue
+
+            results['refreshed'] += 1
+            if result:
+                results['found'] += 1
+
+        results['remaining'] = results['expired'] - results['refreshed']
+        results['requests'] = requests_sent(self.transports) - start_requests
+        return results
+
+    def start(self, interval: float = 3600, max_requests: int = 100):
+        """Run refresh passes on a daemon thread every `interval` seconds"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                self.run(max_requests=max_requests)
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name='cache-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
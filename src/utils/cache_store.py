@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Append-Only Cache Store for Dōsatsu
+JSON snapshot + JSONL write-ahead log, so each lookup costs one appended line
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from src.utils.metadata_store import get_store
+
+# Set to a database path to switch every classifier cache to the shared SQLite store
+METADATA_DB_ENV = 'DOSATSU_METADATA_DB'
+
+_DELETED = '__deleted__'
+
+
+class JSONLogCache(dict):
+    """
+    Dict-compatible cache backed by a snapshot file and an append-only log
+
+    Every assignment appends one JSON line to `<cache_file>.log`. compact()
+    folds the log into the snapshot (the same indented JSON the classifiers
+    always wrote) and truncates the log. Until then the snapshot alone is
+    stale, so readers should open the cache through open_cache() too.
+    On load the snapshot is read and the log replayed on top of it; a
+    half-written final line from a crash is skipped, so at most one entry
+    is lost. Per-entry write times are kept in a `<cache_file>.times`
+    sidecar so TTLs can be applied without changing the snapshot format.
+    """
+
+    def __init__(self, cache_file: str, compact_every: int = 1000):
+        super().__init__()
+        self.cache_file = cache_file
+        self.log_file = f"{cache_file}.log"
+        self.times_file = f"{cache_file}.times"
+        self.timestamps = {}
+        self.compact_every = compact_every
+        self._log = None
+        self._log_entries = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        """Read the snapshot, then replay the log"""
+        try:
+            with open(self.cache_file, 'r') as f:
+                super().update(json.load(f))
+            snapshot_time = os.path.getmtime(self.cache_file)
+        except FileNotFoundError:
+            snapshot_time = time.time()
+
+        try:
+            with open(self.times_file, 'r') as f:
+                self.timestamps = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.timestamps = {}
+
+        # Entries written before timestamps existed are dated by the snapshot
+        for key in self.keys():
+            self.timestamps.setdefault(key, snapshot_time)
+
+        try:
+            with open(self.log_file, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn write from a crash
+                    if entry.get('touch'):
+                        if entry['k'] in self:
+                            self.timestamps[entry['k']] = entry['t']
+                    elif entry.get(_DELETED):
+                        super().pop(entry['k'], None)
+                        self.timestamps.pop(entry['k'], None)
+                    else:
+                        super().__setitem__(entry['k'], entry['v'])
+                        self.timestamps[entry['k']] = entry.get('t', snapshot_time)
+                    self._log_entries += 1
+        except FileNotFoundError:
+            pass
+
+    def _append(self, entry: Dict):
+        """Append one entry to the log, compacting when it grows too long"""
+        with self._lock:
+            if self._log is None:
+                self._log = open(self.log_file, 'a+')
+                # Terminate a torn line left by a crash so it can't swallow the next entry
+                if self._log.tell() > 0:
+                    self._log.seek(self._log.tell() - 1)
+                    if self._log.read(1) != '\n':
+                        self._log.write('\n')
+            self._log.write(json.dumps(entry) + '\n')
+            self._log.flush()
+            self._log_entries += 1
+
+            if self._log_entries >= self.compact_every:
+                self.compact()
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            super().__setitem__(key, value)
+            self.timestamps[key] = time.time()
+            self._append({'k': key, 'v': value, 't': self.timestamps[key]})
+
+    def __delitem__(self, key):
+        with self._lock:
+            super().__delitem__(key)
+            self.timestamps.pop(key, None)
+            self._append({'k': key, _DELETED: True})
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            value = super().__getitem__(key)
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def compact(self):
+        """Write a full snapshot atomically and truncate the log"""
+        with self._lock:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(dict(self), f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+
+            with open(tmp_file, 'w') as f:
+                json.dump(self.timestamps, f)
+            os.replace(tmp_file, self.times_file)
+
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            if os.path.exists(self.log_file):
+                os.remove(self.log_file)
+            self._log_entries = 0
+
+    def touch(self, key):
+        """Mark an entry as verified fresh without rewriting its value"""
+        with self._lock:
+            if key in self:
+                self.timestamps[key] = time.time()
+                self._append({'k': key, 't': self.timestamps[key], 'touch': True})
+
+    def updated_at(self, key) -> Optional[float]:
+        """When an entry was last written (epoch seconds)"""
+        return self.timestamps.get(key)
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+def open_cache(cache_file: str, table: str, namespace: str):
+    """
+    Open a classifier cache
+
+    Uses the shared SQLite store when DOSATSU_METADATA_DB is set, otherwise
+    the per-class JSON snapshot + log file.
+    """
+    db_path = os.getenv(METADATA_DB_ENV)
+    if db_path:
+        return get_store(db_path).cache(table, namespace)
+
+    return JSONLogCache(cache_file)
+
+
+class CacheTTL:
+    """
+    Expiry policy for cached lookups
+
+    positive_ttl applies to found entries, negative_ttl to cached misses
+    (None values). Either may be None to never expire.
+    """
+
+    def __init__(self, positive_ttl: Optional[float] = 90 * 86400,
+                 negative_ttl: Optional[float] = 30 * 86400):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+
+    def is_expired(self, cache, key, now: Optional[float] = None) -> bool:
+        """True if the cached entry for key is older than its TTL"""
+        ttl = self.negative_ttl if cache.get(key) is None else self.positive_ttl
+        if ttl is None:
+            return False
+
+        updated_at = cache.updated_at(key)
+        if updated_at is None:
+            return False  # Written in this process and not yet flushed
+
+        return (now or time.time()) - updated_at > ttl
+
+    def expired_keys(self, cache, now: Optional[float] = None):
+        """Every expired key in a cache"""
+        now = now or time.time()
+        return [key for key in list(cache.keys()) if self.is_expired(cache, key, now)]
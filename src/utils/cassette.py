@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Record/Replay HTTP Cassettes for Dōsatsu
+Capture real API responses once, then replay them offline with injected latency and errors
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Dict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from src.utils.http_client import HTTPTransport
+
+# Query parameters that carry credentials and must never reach disk
+SECRET_PARAMS = {'key', 'api_key', 'access_token'}
+
+# Response body fields that carry credentials (e.g. the Spotify token exchange)
+SECRET_FIELDS = {'access_token', 'refresh_token', 'id_token', 'client_secret'}
+REDACTED = 'REDACTED'
+
+
+def redact_body(body: str) -> str:
+    """Response body with credential fields blanked out (non-JSON bodies are kept as-is)"""
+    if not any(field in body for field in SECRET_FIELDS):
+        return body  # Recorded byte-for-byte
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+
+    def scrub(value):
+        if isinstance(value, dict):
+            return {k: REDACTED if k in SECRET_FIELDS else scrub(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [scrub(item) for item in value]
+        return value
+
+    return json.dumps(scrub(data))
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Replay mode found no recorded response for a request"""
+
+
+class CassetteTransport(HTTPTransport):
+    """
+    Drop-in HTTPTransport that records to or replays from a JSONL cassette
+
+    mode='record' sends real requests and appends each response to the
+    cassette. mode='replay' never touches the network: responses come from
+    the cassette, delayed by `latency` seconds (plus up to `jitter`), and a
+    seeded fraction can be turned into 429 or 5xx errors to exercise
+    backoff and rate-limit handling. Repeated identical requests replay
+    their recorded responses in order, then repeat the last one.
+
+    Credentials are stripped from recorded URLs and response bodies, so a
+    replayed token exchange returns a placeholder token. Name cassettes
+    *.cassette.jsonl (or keep them under cassettes/); both are git-ignored.
+    """
+
+    def __init__(self, cassette_file: str, mode: str = 'replay', latency: float = 0.0,
+                 jitter: float = 0.0, error_rate_429: float = 0.0, error_rate_5xx: float = 0.0,
+                 seed: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+
+        self.cassette_file = cassette_file
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate_429 = error_rate_429
+        self.error_rate_5xx = error_rate_5xx
+        self._random = random.Random(seed)
+        self._cassette_lock = threading.Lock()
+        self._interactions = {}
+        self._replay_position = {}
+        self.stats = {'recorded': 0, 'replayed': 0, 'misses': 0, 'injected_429': 0, 'injected_5xx': 0}
+
+        if mode == 'replay':
+            self._load()
+
+    def _load(self):
+        """Read every recorded interaction, grouped by request key"""
+        try:
+            with open(self.cassette_file, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self._interactions.setdefault(interaction['key'], []).append(interaction)
+        except FileNotFoundError:
+            pass
+
+    def _redacted_url(self, method: str, url: str, params=None, data=None) -> str:
+        """Final request URL with credential parameters removed"""
+        prepared = requests.Request(method, url, params=params, data=data).prepare()
+        parts = urlsplit(prepared.url)
+        query = sorted(
+            (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name not in SECRET_PARAMS
+        )
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+    def _request_key(self, method: str, url: str, params=None, data=None) -> str:
+        body = json.dumps(data, sort_keys=True, default=str) if data else ''
+        raw = f"{method.upper()} {self._redacted_url(method, url, params)} {body}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def request(self, method: str, url: str, timeout=None, **kwargs) -> requests.Response:
+        key = self._request_key(method, url, kwargs.get('params'), kwargs.get('data'))
+
+        if self.mode == 'record':
+            response = super().request(method, url, timeout=timeout, **kwargs)
+            self._record_interaction(key, method, url, kwargs.get('params'), response)
+            return response
+
+        return self._replay(key, method, url, kwargs.get('params'))
+
+    def _record_interaction(self, key: str, method: str, url: str, params, response: requests.Response):
+        interaction = {
+            'key': key,
+            'method': method.upper(),
+            'url': self._redacted_url(method, url, params),
+            'status': response.status_code,
+            'headers': {
+                name: value for name, value in response.headers.items()
+                if name.lower() in ('content-type', 'retry-after')
+            },
+            'body': redact_body(response.text),
+            'elapsed': response.elapsed.total_seconds()
+        }
+
+        with self._cassette_lock:
+            with open(self.cassette_file, 'a') as f:
+                f.write(json.dumps(interaction) + '\n')
+            self.stats['recorded'] += 1
+
+    def _replay(self, key: str, method: str, url: str, params) -> requests.Response:
+        host = self._host(url)
+        self.session_for(url)  # Registers the host for metrics
+        self._check_circuit(host)
+        start = time.monotonic()
+
+        with self._cassette_lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                self.stats['misses'] += 1
+            else:
+                position = self._replay_position.get(key, 0)
+                self._replay_position[key] = position + 1
+                interaction = recorded[min(position, len(recorded) - 1)]
+
+            roll = self._random.random()
+            delay = self.latency + self._random.uniform(0, self.jitter)
+
+        if delay > 0:
+            time.sleep(delay)
+
+        if not recorded:
+            self._record(host, time.monotonic() - start, error=True)
+            raise CassetteMiss(f"No recorded response for {method.upper()} "
+                               f"{self._redacted_url(method, url, params)}")
+
+        if roll < self.error_rate_429:
+            self.stats['injected_429'] += 1
+            response = self._build_response(url, 429, '{"error": "rate limited"}',
+                                            {'Content-Type': 'application/json', 'Retry-After': '1'})
+        elif roll < self.error_rate_429 + self.error_rate_5xx:
+            self.stats['injected_5xx'] += 1
+            response = self._build_response(url, 503, '{"error": "service unavailable"}',
+                                            {'Content-Type': 'application/json'})
+        else:
+            self.stats['replayed'] += 1
+            response = self._build_response(url, interaction['status'], interaction['body'],
+                                            interaction['headers'])
+
+        self._record(host, time.monotonic() - start, response=response)
+        return response
+
+    def _build_response(self, url: str, status: int, body: str, headers: Dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response._content = body.encode('utf-8')
+        response.encoding = 'utf-8'
+        response.headers.update(headers)
+        response.url = url
+        return response
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
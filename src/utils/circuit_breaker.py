@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker for Dōsatsu
+Stop calling a degraded service, probe it with backoff, and queue failed work for retry
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+import requests
+
+
+class CircuitOpen(requests.ConnectionError):
+    """A call was rejected without being sent because the service's circuit is open"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Failures worth retrying later: no connection, timeouts, an open circuit,
+    429 and 5xx. Anything else (404, 400, ...) is a real answer.
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return is_transient_status(error.response.status_code)
+    return False
+
+
+def is_transient_status(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def retry_after(error: Exception) -> float:
+    """Seconds the service asked us to wait (Retry-After, or the circuit's open time)"""
+    if isinstance(error, CircuitOpen):
+        return error.retry_after
+
+    response = getattr(error, 'response', None)
+    return response_retry_after(response) if response is not None else 0.0
+
+
+def response_retry_after(response: requests.Response) -> float:
+    try:
+        return float(response.headers.get('Retry-After', 0))
+    except ValueError:  # HTTP-date form
+        return 0.0
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, rng=random) -> float:
+    """Exponential backoff with jitter: half the capped delay is fixed, half random"""
+    delay = min(base_delay * 2 ** attempt, max_delay)
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """
+    Per-service breaker driven by the error rate of recent calls
+
+    closed:    calls go through; once at least min_calls of the last `window`
+               outcomes are in and failure_threshold of them failed, it opens
+    open:      calls are rejected with CircuitOpen until the backoff elapses
+    half_open: one probe call goes through; success closes the circuit,
+               failure reopens it with the backoff doubled
+    """
+
+    def __init__(self, name: str, failure_threshold: float = 0.5, window: int = 20, min_calls: int = 5,
+                 base_delay: float = 5.0, max_delay: float = 300.0, seed: Optional[int] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = 'closed'
+
+        self._outcomes = deque(maxlen=window)
+        self._consecutive_opens = 0
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'opened': 0, 'rejected': 0, 'probes': 0}
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now (in half-open state, only the probe may)"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+
+            if self.state == 'open':
+                if time.time() < self._open_until:
+                    self.stats['rejected'] += 1
+                    return False
+                self.state = 'half_open'
+                self._probe_in_flight = False
+
+            if self._probe_in_flight:
+                self.stats['rejected'] += 1
+                return False
+
+            self._probe_in_flight = True
+            self.stats['probes'] += 1
+            return True
+
+    def record(self, success: bool, retry_after: float = 0.0):
+        """Report a call's outcome; retry_after (e.g. from a 429) extends the open time"""
+        with self._lock:
+            if self.state == 'half_open':
+                self._probe_in_flight = False
+                if success:
+                    self.state = 'closed'
+                    self._consecutive_opens = 0
+                    self._outcomes.clear()
+                else:
+                    self._open(retry_after)
+                return
+
+            if self.state == 'open':
+                return  # Result of a call sent before the circuit opened
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and \
+                    failures / len(self._outcomes) >= self.failure_threshold:
+                self._open(retry_after)
+
+    def _open(self, retry_after: float):
+        delay = backoff_delay(self._consecutive_opens, self.base_delay, self.max_delay, self._random)
+        self._consecutive_opens += 1
+        self._open_until = time.time() + max(delay, retry_after)
+        self._outcomes.clear()
+        self.state = 'open'
+        self.stats['opened'] += 1
+        print(f"⚠️  {self.name}: circuit open for {max(delay, retry_after):.0f}s")
+
+    def retry_in(self) -> float:
+        """Seconds until a call will be allowed again (0 when closed)"""
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(self._open_until - time.time(), 0.0)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, 'state': self.state}
+
+
+class RetryQueue:
+    """
+    Work items that failed transiently, retried with exponential backoff and jitter
+
+    Items that still fail after max_attempts are moved to `failed`. They were
+    never cached, so the next run picks them up again.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 2.0, max_delay: float = 120.0,
+                 seed: Optional[int] = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failed = []
+
+        self._heap = []
+        self._attempts = {}
+        self._order = itertools.count()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
+
+    def add(self, item, retry_after: float = 0.0):
+        """Queue an item after a failed attempt"""
+        with self._lock:
+            attempts = self._attempts.get(item, 0) + 1
+            self._attempts[item] = attempts
+            if attempts > self.max_attempts:
+                self.failed.append(item)
+                return
+
+            delay = max(backoff_delay(attempts - 1, self.base_delay, self.max_delay, self._random), retry_after)
+            heapq.heappush(self._heap, (time.time() + delay, next(self._order), item))
+
+    def drain(self, fn: Callable[[object], object], max_wait: float = 300.0) -> Dict:
+        """
+        Call fn(item) for each queued item as its backoff elapses
+        Transient failures are requeued; stops early rather than wait past max_wait
+        """
+        start = time.time()
+        results = {'retried': 0, 'recovered': 0}
+
+        while True:
+            with self._lock:
+                if not self._heap:
+                    break
+                due, order, item = heapq.heappop(self._heap)
+                wait = due - time.time()
+                if time.time() + wait - start > max_wait:
+                    heapq.heappush(self._heap, (due, order, item))
+                    break
+
+            if wait > 0:
+                time.sleep(wait)
+
+            results['retried'] += 1
+            try:
+                fn(item)
+            except requests.RequestException as e:
+                if not is_transient(e):
+                    raise
+                self.add(item, retry_after(e))
+                continue
+            results['recovered'] += 1
+
+        with self._lock:
+            self.failed.extend(item for _, _, item in self._heap)
+            self._heap.clear()
+            results['failed'] = len(self.failed)
+        return results
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Compiled Genre-Term Matcher for Dōsatsu
+Aho-Corasick automaton over the genre mapping tables, with a memo per raw string
+"""
+
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class GenreMatcher:
+    """
+    Find every mapping term contained in a genre/tag string in one pass
+
+    Equivalent to testing `term in text` for each (term, category) pair,
+    including overlapping terms ("southern hip hop" also contains "hip hop"),
+    but built once from the mapping table. Results per raw string are
+    memoized, so remapping a whole cache touches each distinct string once.
+    """
+
+    def __init__(self, terms: List[Tuple[str, str]]):
+        self.terms = [(term.lower(), category) for term, category in terms]
+        self._memo = {}
+        self._build()
+
+    def _build(self):
+        """Build the trie, failure links and output sets"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+
+        for index, (term, _) in enumerate(self.terms):
+            state = 0
+            for char in term:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._out[state].add(index)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] |= self._out[self._fail[child]]
+
+    def match_terms(self, text: str) -> List[int]:
+        """Indices of every term contained in text, in mapping-table order"""
+        found = set()
+        state = 0
+        for char in text.lower():
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._out[state]:
+                found |= self._out[state]
+        return sorted(found)
+
+    def category_counts(self, text: str) -> Dict[str, int]:
+        """
+        Number of matching terms per category for one raw string
+        Categories appear in the order their first term appears in the table
+        """
+        counts = self._memo.get(text)
+        if counts is None:
+            counts = {}
+            for index in self.match_terms(text):
+                category = self.terms[index][1]
+                counts[category] = counts.get(category, 0) + 1
+            self._memo[text] = counts
+        return counts
+
+
+_matchers = {}
+
+
+def get_matcher(terms: List[Tuple[str, str]]) -> GenreMatcher:
+    """Compiled matcher for a mapping table, rebuilt only when the table changes"""
+    key = tuple(terms)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = GenreMatcher(terms)
+        _matchers[key] = matcher
+    return matcher
+
+
+def remap_genres(cache, genre_fn: Callable[[str, Dict], Optional[str]], source: str) -> Dict:
+    """
+    Recompute dosatsu_genre for every cached artist, without API calls
+
+    genre_fn(artist_name, data) returns the new genre from the entry's stored
+    raw genres/tags, or None when there's nothing to remap from (skipped).
+    Changed entries are written back after the scan; the caller saves the cache.
+    Returns dict with statistics and the list of changed artists
+    """
+    results = {'total': 0, 'skipped': 0, 'changed': 0, 'changes': []}
+    updates = {}
+
+    for artist_name, data in cache.items():
+        results['total'] += 1
+        new_genre = genre_fn(artist_name, data) if data else None
+        if new_genre is None:
+            results['skipped'] += 1
+            continue
+
+        if new_genre != data.get('dosatsu_genre'):
+            updates[artist_name] = {**data, 'dosatsu_genre': new_genre}
+            results['changes'].append({
+                'artist': artist_name,
+                'old_genre': data.get('dosatsu_genre'),
+                'new_genre': new_genre,
+                'source': data.get('source') or source
+            })
+
+    for artist_name, data in updates.items():
+        cache[artist_name] = data
+
+    results['changed'] = len(updates)
+    return results
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Transport for Dōsatsu
+Keep-alive connection pools per host, shared by every external API client
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpen, is_transient_status, response_retry_after
+
+# (connect, read) seconds - several API calls previously had no timeout at all
+DEFAULT_TIMEOUT = (5, 30)
+
+# Real API base URLs; each can be overridden (e.g. to point at src/utils/mock_apis.py)
+SERVICE_URLS = {
+    'spotify_accounts': 'https://accounts.spotify.com',
+    'spotify_api': 'https://api.spotify.com',
+    'musicbrainz': 'https://musicbrainz.org/ws/2',
+    'youtube': 'https://www.googleapis.com/youtube/v3'
+}
+
+
+def service_url(service: str, override: Optional[str] = None) -> str:
+    """Base URL for a service: explicit override, then DOSATSU_<SERVICE>_URL, then the real API"""
+    url = override or os.getenv(f"DOSATSU_{service.upper()}_URL") or SERVICE_URLS[service]
+    return url.rstrip('/')
+
+
+class HTTPTransport:
+    """
+    Pooled HTTP sessions, one per host
+
+    Reusing a session keeps the TCP+TLS connection alive between calls,
+    so long backfills stop paying a handshake on every request.
+
+    Each host also gets a CircuitBreaker: when a service starts failing,
+    requests to it raise CircuitOpen immediately instead of waiting on
+    timeouts, until a probe request succeeds again.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_maxsize: int = 10,
+                 user_agent: Optional[str] = None, breaker_settings: Optional[Dict] = None):
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.user_agent = user_agent
+        self.breaker_settings = breaker_settings or {}  # CircuitBreaker keyword arguments
+        self._sessions = {}
+        self._metrics = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url: str) -> str:
+        return urlsplit(url).netloc
+
+    def session_for(self, url: str) -> requests.Session:
+        """Get (or create) the pooled session for a URL's host"""
+        host = self._host(url)
+
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers['Accept-Encoding'] = 'gzip, deflate'
+                if self.user_agent:
+                    session.headers['User-Agent'] = self.user_agent
+
+                self._sessions[host] = session
+                self._breakers[host] = CircuitBreaker(host, **self.breaker_settings)
+                self._metrics[host] = {
+                    'requests': 0,
+                    'errors': 0,
+                    'status_codes': {},
+                    'total_seconds': 0.0,
+                    'bytes_received': 0
+                }
+
+        return session
+
+    def request(self, method: str, url: str, timeout=None, **kwargs) -> requests.Response:
+        """
+        Send a request through the host's pooled session
+        Raises requests.RequestException exactly like requests.get/post
+        """
+        session = self.session_for(url)
+        host = self._host(url)
+        self._check_circuit(host)
+
+        start = time.monotonic()
+        try:
+            response = session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            self._record(host, time.monotonic() - start, error=True)
+            raise
+
+        self._record(host, time.monotonic() - start, response=response)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def breaker_for(self, url: str) -> CircuitBreaker:
+        """The circuit breaker guarding a URL's host"""
+        self.session_for(url)
+        with self._lock:
+            return self._breakers[self._host(url)]
+
+    def _check_circuit(self, host: str):
+        """Raise CircuitOpen instead of sending to a host whose circuit is open"""
+        breaker = self._breakers[host]
+        if not breaker.allow():
+            raise CircuitOpen(f"{host} circuit is open, retry in {breaker.retry_in():.0f}s",
+                              retry_after=breaker.retry_in())
+
+    def _record(self, host: str, elapsed: float, response: Optional[requests.Response] = None,
+                error: bool = False):
+        """Update per-host metrics and the host's circuit breaker"""
+        if error:
+            self._breakers[host].record(False)
+        elif is_transient_status(response.status_code):
+            self._breakers[host].record(False, response_retry_after(response))
+        else:
+            self._breakers[host].record(True)
+
+        with self._lock:
+            metrics = self._metrics[host]
+            metrics['requests'] += 1
+            metrics['total_seconds'] += elapsed
+
+            if error:
+                metrics['errors'] += 1
+                return
+
+            status = str(response.status_code)
+            metrics['status_codes'][status] = metrics['status_codes'].get(status, 0) + 1
+            if response.status_code >= 400:
+                metrics['errors'] += 1
+            metrics['bytes_received'] += len(response.content or b'')
+
+    def _connections_opened(self, session: requests.Session) -> int:
+        """Count TCP connections opened by a session's pools"""
+        opened = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += getattr(pool, 'num_connections', 0)
+        return opened
+
+    def get_metrics(self) -> Dict:
+        """Per-host request counts, latency and connection reuse"""
+        with self._lock:
+            report = {}
+            for host, metrics in self._metrics.items():
+                requests_made = metrics['requests']
+                connections = self._connections_opened(self._sessions[host])
+                report[host] = {
+                    **metrics,
+                    'status_codes': dict(metrics['status_codes']),
+                    'avg_seconds': metrics['total_seconds'] / requests_made if requests_made else 0.0,
+                    'connections_opened': connections,
+                    'connections_reused': max(requests_made - connections, 0),
+                    'circuit': self._breakers[host].get_stats()
+                }
+            return report
+
+    def close(self):
+        """Close every pooled session"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._metrics.clear()
+            self._breakers.clear()
+
+
+_shared_transport = None
+_shared_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Process-wide transport shared by all API clients"""
+    global _shared_transport
+
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = HTTPTransport()
+        return _shared_transport
+
+
+def requests_sent(transports) -> int:
+    """API requests sent so far through a set of transports (each counted once)"""
+    unique = {id(transport): transport for transport in transports}
+    return sum(
+        metrics['requests']
+        for transport in unique.values()
+        for metrics in transport.get_metrics().values()
+    )
+
+
+def set_transport(transport: HTTPTransport):
+    """Replace the process-wide transport (e.g. with a CassetteTransport)"""
+    global _shared_transport
+
+    with _shared_lock:
+        _shared_transport = transport
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Unified Metadata Store for Dōsatsu
+One SQLite database (WAL mode) for every enrichment cache
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from typing import Optional
+
+TABLES = ('artists', 'recordings', 'credits', 'videos')
+
+# Marks a buffered delete
+_REMOVED = object()
+
+
+class MetadataStore:
+    """
+    Embedded SQLite store with one table per entity type
+
+    Each table holds (namespace, key) -> JSON rows, so the Spotify,
+    MusicBrainz and hybrid artist caches share the artists table under
+    different namespaces. WAL mode lets the dashboard read while a
+    backfill writes.
+    """
+
+    def __init__(self, db_path: str = 'dosatsu_metadata.db'):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+
+        for table in TABLES:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    data TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+        self.conn.commit()
+
+    def cache(self, table: str, namespace: str, batch_size: int = 100) -> 'StoreCache':
+        """Dict-like view of one namespace of a table"""
+        if table not in TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        return StoreCache(self, table, namespace, batch_size)
+
+    def import_json_cache(self, json_file: str, table: str, namespace: str) -> int:
+        """
+        Copy an existing JSON cache into the store
+        Entries still in its write-ahead log are included, and each keeps
+        its recorded write time so TTLs carry over
+        """
+        # cache_store imports this module, so import it here
+        from src.utils.cache_store import JSONLogCache
+
+        cache = JSONLogCache(json_file)
+        now = time.time()
+        rows = [
+            (namespace, key, json.dumps(value), cache.updated_at(key) or now)
+            for key, value in cache.items()
+        ]
+        cache.close()
+
+        with self._lock:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (namespace, key, data, updated_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class StoreCache(MutableMapping):
+    """
+    Drop-in replacement for a classifier's cache dict
+
+    Reads are indexed primary-key lookups; writes are buffered and committed
+    in one transaction every `batch_size` entries (or on compact()).
+    """
+
+    def __init__(self, store: MetadataStore, table: str, namespace: str, batch_size: int = 100):
+        self.store = store
+        self.table = table
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self._pending = {}
+
+    def _query(self, sql: str, params=()):
+        with self.store._lock:
+            return self.store.conn.execute(sql, params).fetchall()
+
+    def _stream(self, sql: str, params=(), chunk_size: int = 1000):
+        """Rows from a cursor, fetched a chunk at a time instead of all at once"""
+        with self.store._lock:
+            cursor = self.store.conn.execute(sql, params)
+        while True:
+            with self.store._lock:
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield from rows
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            value = self._pending[key]
+            if value is _REMOVED:
+                raise KeyError(key)
+            return value
+
+        rows = self._query(
+            f"SELECT data FROM {self.table} WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        )
+        if not rows:
+            raise KeyError(key)
+        return json.loads(rows[0][0])
+
+    def __contains__(self, key):
+        if key in self._pending:
+            return self._pending[key] is not _REMOVED
+        return bool(self._query(
+            f"SELECT 1 FROM {self.table} WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ))
+
+    def __setitem__(self, key, value):
+        with self.store._lock:
+            self._pending[key] = value
+            if len(self._pending) >= self.batch_size:
+                self.compact()
+
+    def __delitem__(self, key):
+        with self.store._lock:
+            if key not in self:
+                raise KeyError(key)
+            self._pending[key] = _REMOVED
+            if len(self._pending) >= self.batch_size:
+                self.compact()
+
+    def __iter__(self):
+        self.compact()
+        for (key,) in self._stream(
+            f"SELECT key FROM {self.table} WHERE namespace = ? ORDER BY key", (self.namespace,)
+        ):
+            yield key
+
+    def __len__(self):
+        self.compact()
+        return self._query(
+            f"SELECT COUNT(*) FROM {self.table} WHERE namespace = ?", (self.namespace,)
+        )[0][0]
+
+    def items(self):
+        """Stream (key, value) pairs with one query instead of one per key"""
+        self.compact()
+        for key, data in self._stream(
+            f"SELECT key, data FROM {self.table} WHERE namespace = ? ORDER BY key", (self.namespace,)
+        ):
+            yield key, json.loads(data)
+
+    def values(self):
+        for _, value in self.items():
+            yield value
+
+    def updated_at(self, key) -> Optional[float]:
+        """When an entry was last written (epoch seconds)"""
+        rows = self._query(
+            f"SELECT updated_at FROM {self.table} WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        )
+        return rows[0][0] if rows else None
+
+    def touch(self, key):
+        """Mark an entry as verified fresh without rewriting its value"""
+        with self.store._lock:
+            with self.store.conn:
+                self.store.conn.execute(
+                    f"UPDATE {self.table} SET updated_at = ? WHERE namespace = ? AND key = ?",
+                    (time.time(), self.namespace, key)
+                )
+
+    def compact(self):
+        """Commit buffered writes in a single transaction"""
+        with self.store._lock:
+            if not self._pending:
+                return
+
+            pending, self._pending = self._pending, {}
+            now = time.time()
+
+            with self.store.conn:
+                for key, value in pending.items():
+                    if value is _REMOVED:
+                        self.store.conn.execute(
+                            f"DELETE FROM {self.table} WHERE namespace = ? AND key = ?",
+                            (self.namespace, key)
+                        )
+                    else:
+                        self.store.conn.execute(
+                            f"INSERT OR REPLACE INTO {self.table} (namespace, key, data, updated_at) "
+                            f"VALUES (?, ?, ?, ?)",
+                            (self.namespace, key, json.dumps(value), now)
+                        )
+
+    def close(self):
+        self.compact()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_path: str) -> MetadataStore:
+    """One MetadataStore connection per database path in this process"""
+    with _stores_lock:
+        if db_path not in _stores:
+            _stores[db_path] = MetadataStore(db_path)
+        return _stores[db_path]
+
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+Local Mock APIs for Dōsatsu
+Stand-ins for the Spotify, MusicBrainz and YouTube endpoints our clients use,
+with synthetic data and each service's rate-limit/quota behaviour
+
+Run all three:  python -m src.utils.mock_apis [host] [first_port]
+then point the clients at them with the printed DOSATSU_*_URL variables.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')  # YouTube quotas reset at Pacific midnight
+except Exception:
+    QUOTA_TIMEZONE = None
+
+SPOTIFY_GENRES = [
+    'pop', 'dance pop', 'hip hop', 'rap', 'trap', 'southern hip hop', 'r&b', 'neo soul',
+    'country', 'contemporary country', 'rock', 'classic rock', 'alternative rock', 'indie rock',
+    'latin', 'reggaeton', 'edm', 'house', 'singer-songwriter', 'adult standards', 'soul', 'funk'
+]
+
+MUSICBRAINZ_TAGS = [
+    'pop', 'hip hop', 'rap', 'r&b', 'soul', 'country', 'rock', 'hard rock', 'alternative rock',
+    'indie', 'punk', 'latin', 'reggaeton', 'electronic', 'house', 'jazz', 'blues', 'american', 'british'
+]
+
+Response = Tuple[int, Dict, Dict]  # (status, JSON body, extra headers)
+
+
+class SyntheticCatalog:
+    """
+    Deterministic fake catalog: the same name always yields the same entity
+
+    IDs handed out by searches are remembered so later by-ID lookups return
+    the same entity; unknown IDs still get a stable synthetic entity, so
+    caches filled against an earlier server run remain usable.
+    """
+
+    def __init__(self, seed: int = 0, miss_rate: float = 0.08):
+        self.seed = seed
+        self.miss_rate = miss_rate
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def _digest(self, *parts) -> int:
+        raw = '|'.join([str(self.seed)] + [str(part).lower() for part in parts])
+        return int(hashlib.sha1(raw.encode()).hexdigest(), 16)
+
+    def _pick(self, pool, count: int, *parts):
+        value = self._digest(*parts)
+        picked = []
+        while len(picked) < count:
+            choice = pool[value % len(pool)]
+            if choice not in picked:
+                picked.append(choice)
+            value //= len(pool)
+            if value == 0:
+                value = self._digest(*parts, len(picked))
+        return picked
+
+    def exists(self, service: str, name: str) -> bool:
+        return (self._digest(service, 'exists', name) % 10000) / 10000 >= self.miss_rate
+
+    def make_id(self, service: str, name: str, length: int = 22) -> str:
+        alphabet = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        value = self._digest(service, 'id', name)
+        chars = []
+        for _ in range(length):
+            value, index = divmod(value, len(alphabet))
+            chars.append(alphabet[index])
+        entity_id = ''.join(chars)
+
+        with self._lock:
+            self._names[entity_id] = name
+        return entity_id
+
+    def make_mbid(self, kind: str, name: str) -> str:
+        raw = hashlib.md5(f"{self.seed}|{kind}|{name.lower()}".encode()).hexdigest()
+        mbid = f"{raw[:8]}-{raw[8:12]}-{raw[12:16]}-{raw[16:20]}-{raw[20:32]}"
+
+        with self._lock:
+            self._names[mbid] = name
+        return mbid
+
+    def name_for(self, entity_id: str, prefix: str) -> str:
+        with self._lock:
+            return self._names.get(entity_id) or f"{prefix} {entity_id[:8]}"
+
+    # Spotify ------------------------------------------------------------
+
+    def spotify_artist(self, name: str) -> Dict:
+        value = self._digest('spotify', name)
+        genre_count = value % 4  # Some artists have no genres at all
+        return {
+            'id': self.make_id('spotify', name),
+            'name': name,
+            'type': 'artist',
+            'genres': self._pick(SPOTIFY_GENRES, genre_count, 'spotify-genres', name) if genre_count else [],
+            'popularity': value % 101,
+            'followers': {'href': None, 'total': (value // 101) % 50_000_000}
+        }
+
+    # MusicBrainz --------------------------------------------------------
+
+    def musicbrainz_artist(self, name: str) -> Dict:
+        value = self._digest('musicbrainz', name)
+        tags = [
+            {'name': tag, 'count': 1 + (value >> (4 * i)) % 20}
+            for i, tag in enumerate(self._pick(MUSICBRAINZ_TAGS, 1 + value % 5, 'mb-tags', name))
+        ]
+        return {
+            'id': self.make_mbid('artist', name),
+            'name': name,
+            'score': 100,
+            'type': 'Person' if value % 3 else 'Group',
+            'country': ['US', 'GB', 'CA', 'PR', 'KR'][value % 5],
+            # Roughly a third of search results carry no tags, forcing a lookup
+            'tags': tags if value % 3 else [],
+            'genres': tags[:1] if value % 3 else []
+        }
+
+    def musicbrainz_recording(self, title: str, artist: str) -> Dict:
+        key = f"{title}|||{artist}"
+        value = self._digest('recording', key)
+        work_title = title
+        return {
+            'id': self.make_mbid('recording', key),
+            'title': title,
+            'score': 100,
+            'length': 120000 + value % 240000,
+            'artist-credit': [{'name': artist, 'artist': {'id': self.make_mbid('artist', artist), 'name': artist}}],
+            'isrcs': [f"US{value % 1000:03d}{value % 100:02d}{value % 100000:05d}"],
+            'relations': [
+                {'type': 'producer', 'artist': {'name': f"Producer {value % 997}"}},
+                {'type': 'performance', 'work': {'id': self.make_mbid('work', work_title), 'title': work_title}}
+            ]
+        }
+
+    def musicbrainz_work(self, work_id: str) -> Dict:
+        title = self.name_for(work_id, 'Work')
+        value = self._digest('work', title)
+        writers = [f"Writer {(value >> (8 * i)) % 5000}" for i in range(1 + value % 3)]
+        relation_types = ['composer', 'lyricist', 'writer']
+        return {
+            'id': work_id,
+            'title': title,
+            'relations': [
+                {'type': relation_types[(value >> i) % 3], 'artist': {'name': writer}}
+                for i, writer in enumerate(writers)
+            ]
+        }
+
+    # YouTube ------------------------------------------------------------
+
+    def youtube_video(self, video_id: str) -> Dict:
+        query = self.name_for(video_id, 'Video')
+        value = self._digest('youtube', query)
+        views = value % 2_000_000_000
+        return {
+            'id': video_id,
+            'snippet': {
+                'title': query.replace(' official music video', ' (Official Video)'),
+                'channelTitle': f"Channel {value % 10000}",
+                'publishedAt': f"{2005 + value % 20}-{1 + value % 12:02d}-{1 + value % 28:02d}T00:00:00Z"
+            },
+            'statistics': {
+                'viewCount': str(views),
+                'likeCount': str(views // 100),
+                'commentCount': str(views // 5000)
+            }
+        }
+
+
+def _query_value(query: str, field: str) -> str:
+    """Pull field:"value" out of a Lucene-style MusicBrainz query"""
+    marker = f'{field}:"'
+    start = query.find(marker)
+    if start == -1:
+        return query
+    start += len(marker)
+    end = query.find('"', start)
+    return query[start:end if end != -1 else len(query)]
+
+
+class MockService:
+    """Base class: route a request to a handler and apply rate limiting"""
+
+    def __init__(self, catalog: SyntheticCatalog, latency: float = 0.0):
+        self.catalog = catalog
+        self.latency = latency
+        self.stats = {'requests': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+    def handle(self, method: str, path: str, params: Dict, headers: Dict, client: str) -> Response:
+        with self._lock:
+            self.stats['requests'] += 1
+            rejection = self.check_limits(path, params, client)
+            if rejection:
+                self.stats['rejected'] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+        if rejection:
+            return rejection
+        return self.route(method, path, params, headers)
+
+    def check_limits(self, path: str, params: Dict, client: str) -> Optional[Response]:
+        """Return an error response if the request exceeds the service's limits (lock held)"""
+        return None
+
+    def route(self, method: str, path: str, params: Dict, headers: Dict) -> Response:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+class SpotifyMock(MockService):
+    """
+    Client-credentials token, /v1/search and /v1/artists
+
+    Spotify limits by a rolling 30-second window per app and answers
+    429 with Retry-After when it is exceeded.
+    """
+
+    def __init__(self, catalog: SyntheticCatalog, requests_per_window: int = 180,
+                 window_seconds: float = 30.0, **kwargs):
+        super().__init__(catalog, **kwargs)
+        self.requests_per_window = requests_per_window
+        self.window_seconds = window_seconds
+        self._window = []
+        self._tokens = set()
+
+    def check_limits(self, path, params, client):
+        now = time.monotonic()
+        self._window = [t for t in self._window if now - t < self.window_seconds]
+        if len(self._window) >= self.requests_per_window:
+            retry_after = max(1, int(self.window_seconds - (now - self._window[0])) + 1)
+            return 429, {'error': {'status': 429, 'message': 'API rate limit exceeded'}}, \
+                {'Retry-After': str(retry_after)}
+        self._window.append(now)
+        return None
+
+    def route(self, method, path, params, headers):
+        if method == 'POST' and path == '/api/token':
+            if not headers.get('Authorization', '').startswith('Basic '):
+                return 400, {'error': 'invalid_client'}, {}
+            token = hashlib.sha1(f"{time.time()}".encode()).hexdigest()
+            with self._lock:
+                self._tokens.add(token)
+            return 200, {'access_token': token, 'token_type': 'Bearer', 'expires_in': 3600}, {}
+
+        token = headers.get('Authorization', '')[len('Bearer '):]
+        with self._lock:
+            authorized = token in self._tokens
+        if not authorized:
+            return 401, {'error': {'status': 401, 'message': 'Invalid access token'}}, {}
+
+        if path == '/v1/search':
+            name = params.get('q', '')
+            items = [self.catalog.spotify_artist(name)] if name and self.catalog.exists('spotify', name) else []
+            return 200, {'artists': {'items': items, 'total': len(items)}}, {}
+
+        if path == '/v1/artists':
+            ids = [i for i in params.get('ids', '').split(',') if i]
+            if len(ids) > 50:
+                return 400, {'error': {'status': 400, 'message': 'Too many ids requested'}}, {}
+            artists = [self.catalog.spotify_artist(self.catalog.name_for(i, 'Artist')) for i in ids]
+            for artist, requested_id in zip(artists, ids):
+                artist['id'] = requested_id
+            return 200, {'artists': artists}, {}
+
+        return 404, {'error': {'status': 404, 'message': 'Not found'}}, {}
+
+
+class MusicBrainzMock(MockService):
+    """
+    /ws/2 artist, recording and work lookups and searches
+
+    MusicBrainz allows an average of one request per second per client IP
+    and answers 503 beyond that; a small burst allowance absorbs jitter.
+    """
+
+    def __init__(self, catalog: SyntheticCatalog, min_interval: float = 1.0, burst: float = 2.0,
+                 **kwargs):
+        super().__init__(catalog, **kwargs)
+        self.min_interval = min_interval
+        self.burst = burst
+        self._buckets = {}
+
+    def check_limits(self, path, params, client):
+        now = time.monotonic()
+        tokens, last = self._buckets.get(client, (self.burst, now))
+        if self.min_interval > 0:
+            tokens = min(self.burst, tokens + (now - last) / self.min_interval)
+        else:
+            tokens = self.burst
+
+        if tokens < 1:
+            self._buckets[client] = (tokens, now)
+            return 503, {'error': 'Your requests are exceeding the allowable rate limit.'}, \
+                {'Retry-After': str(max(1, int(self.min_interval)))}
+
+        self._buckets[client] = (tokens - 1, now)
+        return None
+
+    def route(self, method, path, params, headers):
+        if not headers.get('User-Agent'):
+            return 403, {'error': 'A User-Agent header is required'}, {}
+
+        parts = [p for p in path.split('/') if p]
+        if parts[:2] != ['ws', '2'] or len(parts) < 3:
+            return 404, {'error': 'Not Found'}, {}
+
+        entity = parts[2]
+        entity_id = parts[3] if len(parts) > 3 else None
+        query = params.get('query', '')
+
+        if entity == 'artist' and entity_id is None:
+            name = _query_value(query, 'artist')
+            found = self.catalog.exists('musicbrainz', name)
+            artists = [self.catalog.musicbrainz_artist(name)] if found else []
+            return 200, {'count': len(artists), 'offset': 0, 'artists': artists}, {}
+
+        if entity == 'artist':
+            artist = self.catalog.musicbrainz_artist(self.catalog.name_for(entity_id, 'Artist'))
+            artist['id'] = entity_id
+            if not artist['tags']:
+                # Lookups carry the full tag list even when search results did not
+                artist['tags'] = [{'name': 'pop', 'count': 1}]
+            return 200, artist, {}
+
+        if entity == 'recording' and entity_id is None:
+            title = _query_value(query, 'recording')
+            artist = _query_value(query, 'artist')
+            found = self.catalog.exists('musicbrainz-recording', f"{title}|||{artist}")
+            recordings = [self.catalog.musicbrainz_recording(title, artist)] if found else []
+            return 200, {'count': len(recordings), 'offset': 0, 'recordings': recordings}, {}
+
+        if entity == 'recording':
+            key = self.catalog.name_for(entity_id, 'Recording|||Unknown')
+            title, _, artist = key.partition('|||')
+            recording = self.catalog.musicbrainz_recording(title, artist)
+            recording['id'] = entity_id
+            if 'work-level-rels' in params.get('inc', ''):
+                for relation in recording['relations']:
+                    if 'work' in relation:
+                        work = self.catalog.musicbrainz_work(relation['work']['id'])
+                        relation['work']['relations'] = work['relations']
+            return 200, recording, {}
+
+        if entity == 'work' and entity_id:
+            return 200, self.catalog.musicbrainz_work(entity_id), {}
+
+        return 404, {'error': 'Not Found'}, {}
+
+
+class YouTubeMock(MockService):
+    """
+    /youtube/v3 search and videos.list
+
+    Every call is charged against a daily quota (search 100 units,
+    videos.list 1 unit for up to 50 IDs); once spent, the API answers
+    403 quotaExceeded until the quota resets at midnight Pacific time.
+    """
+
+    COSTS = {'search': 100, 'videos': 1}
+
+    def __init__(self, catalog: SyntheticCatalog, daily_quota: int = 10000, **kwargs):
+        super().__init__(catalog, **kwargs)
+        self.daily_quota = daily_quota
+        self._quota_day = None
+        self.stats['quota_used'] = 0
+
+    def _today(self) -> str:
+        return datetime.now(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+    def check_limits(self, path, params, client):
+        if not params.get('key'):
+            return 403, {'error': {'code': 403, 'message': 'API key missing',
+                                   'errors': [{'reason': 'forbidden'}]}}, {}
+
+        today = self._today()
+        if today != self._quota_day:
+            self._quota_day = today
+            self.stats['quota_used'] = 0
+
+        cost = self.COSTS.get(path.rstrip('/').split('/')[-1], 1)
+        if self.stats['quota_used'] + cost > self.daily_quota:
+            return 403, {'error': {'code': 403, 'message': 'The request cannot be completed because '
+                                                          'you have exceeded your quota.',
+                                   'errors': [{'reason': 'quotaExceeded'}]}}, {}
+
+        self.stats['quota_used'] += cost
+        return None
+
+    def route(self, method, path, params, headers):
+        endpoint = path.rstrip('/').split('/')[-1]
+
+        if endpoint == 'search':
+            query = params.get('q', '')
+            items = []
+            if query and self.catalog.exists('youtube', query):
+                items = [{'id': {'kind': 'youtube#video', 'videoId': self.catalog.make_id('youtube', query, 11)}}]
+            return 200, {'items': items}, {}
+
+        if endpoint == 'videos':
+            ids = [i for i in params.get('id', '').split(',') if i]
+            if len(ids) > 50:
+                return 400, {'error': {'code': 400, 'message': 'Too many video IDs'}}, {}
+            return 200, {'items': [self.catalog.youtube_video(i) for i in ids]}, {}
+
+        return 404, {'error': {'code': 404, 'message': 'Not Found'}}, {}
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """Translate HTTP requests into MockService.handle calls"""
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real APIs
+
+    def _dispatch(self, method: str):
+        parts = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        if length:
+            body = self.rfile.read(length).decode('utf-8', 'replace')
+            params.update({k: v[-1] for k, v in parse_qs(body).items()})
+
+        status, payload, extra_headers = self.server.service.handle(
+            method, parts.path, params, dict(self.headers), self.client_address[0]
+        )
+
+        content = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in extra_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def log_message(self, format, *args):
+        pass  # Load tests make far too many requests to log each one
+
+
+def serve(service: MockService, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Serve a mock service on a daemon thread; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), _MockHandler)
+    server.daemon_threads = True
+    server.service = service
+    threading.Thread(target=server.serve_forever, name=f'mock-{type(service).__name__}',
+                     daemon=True).start()
+    return server
+
+
+def start_mock_apis(host: str = '127.0.0.1', first_port: int = 0, seed: int = 0,
+                    **limits) -> Dict[str, ThreadingHTTPServer]:
+    """
+    Start Spotify, MusicBrainz and YouTube mocks sharing one synthetic catalog
+    limits: spotify_requests_per_window, musicbrainz_min_interval, youtube_daily_quota, latency
+    """
+    catalog = SyntheticCatalog(seed=seed)
+    latency = limits.get('latency', 0.0)
+
+    services = {
+        'spotify': SpotifyMock(catalog, latency=latency,
+                               requests_per_window=limits.get('spotify_requests_per_window', 180)),
+        'musicbrainz': MusicBrainzMock(catalog, latency=latency,
+                                       min_interval=limits.get('musicbrainz_min_interval', 1.0)),
+        'youtube': YouTubeMock(catalog, latency=latency,
+                               daily_quota=limits.get('youtube_daily_quota', 10000))
+    }
+
+    servers = {}
+    for offset, (name, service) in enumerate(services.items()):
+        servers[name] = serve(service, host, first_port + offset if first_port else 0)
+    return servers
+
+
+def mock_environment(servers: Dict[str, ThreadingHTTPServer]) -> Dict[str, str]:
+    """DOSATSU_*_URL variables that point every client at the mock servers"""
+    def base(name):
+        host, port = servers[name].server_address[:2]
+        return f"http://{host}:{port}"
+
+    return {
+        'DOSATSU_SPOTIFY_ACCOUNTS_URL': base('spotify'),
+        'DOSATSU_SPOTIFY_API_URL': base('spotify'),
+        'DOSATSU_MUSICBRAINZ_URL': f"{base('musicbrainz')}/ws/2",
+        'DOSATSU_YOUTUBE_URL': f"{base('youtube')}/youtube/v3"
+    }
+
+
+def main():
+    host = sys.argv[1] if len(sys.argv) > 1 else '127.0.0.1'
+    first_port = int(sys.argv[2]) if len(sys.argv) > 2 else 8801
+
+    servers = start_mock_apis(host, first_port)
+
+    print("="*70)
+    print("DŌSATSU MOCK APIS")
+    print("="*70)
+    print()
+    for name, value in mock_environment(servers).items():
+        print(f"export {name}={value}")
+    print()
+    print("Press Ctrl+C to stop")
+
+    try:
+        while True:
+            time.sleep(60)
+            for name, server in servers.items():
+                print(f"{name:<12} {server.service.get_stats()}")
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Offline MusicBrainz Artist Index for Dōsatsu
+Import the MusicBrainz JSON artist dump into SQLite for rate-limit-free tag lookups
+"""
+
+import json
+import sqlite3
+import tarfile
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from src.utils.artist_names import normalize_artist_name
+
+# Tags kept per artist (the classifier only looks at the top few)
+MAX_TAGS = 20
+
+
+def read_dump(dump_path: str) -> Iterator[Dict]:
+    """
+    Artist entities from a JSON dump, one per line
+    Accepts the extracted mbdump/artist file (or any JSON-lines file) or the
+    artist.tar.xz archive from data.metabrainz.org, read as a stream
+    """
+    if tarfile.is_tarfile(dump_path):
+        with tarfile.open(dump_path, 'r|*') as archive:
+            for member in archive:
+                if member.isfile() and member.name.endswith('mbdump/artist'):
+                    yield from _read_lines(archive.extractfile(member))
+                    return
+        raise ValueError(f"No mbdump/artist file in {dump_path}")
+
+    with open(dump_path, 'rb') as f:
+        yield from _read_lines(f)
+
+
+def _read_lines(f) -> Iterator[Dict]:
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def artist_tags(entity: Dict) -> List[Dict]:
+    """Genres and tags with positive votes, most votes first"""
+    votes = {}
+    for tag in entity.get('genres', []) + entity.get('tags', []):
+        name = tag.get('name')
+        if name and tag.get('count', 0) > 0:
+            votes[name] = max(votes.get(name, 0), tag['count'])
+
+    names = sorted(votes, key=lambda name: votes[name], reverse=True)[:MAX_TAGS]
+    return [{'name': name, 'count': votes[name]} for name in names]
+
+
+class MusicBrainzDump:
+    """
+    Local artist index built from a MusicBrainz JSON dump
+
+    Artists are indexed under the normalized form of their name, sort name
+    and aliases, so chart spellings match without a fuzzy search. lookup()
+    returns an entity shaped like a web-service search result, which
+    MusicBrainzClassifier can use in place of an API call.
+    """
+
+    def __init__(self, db_path: str = 'musicbrainz_dump.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS artists (
+                mbid TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                disambiguation TEXT,
+                tags TEXT NOT NULL,
+                votes INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS artist_names (
+                name_key TEXT NOT NULL,
+                mbid TEXT NOT NULL,
+                PRIMARY KEY (name_key, mbid)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS dump_info (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self.conn.commit()
+
+    def import_dump(self, dump_path: str, tagged_only: bool = True, batch_size: int = 10000) -> Dict:
+        """
+        Load a dump, replacing any artists already imported
+        tagged_only skips artists without community tags: the classifier
+        can't use them, and they make up most of the dump
+        """
+        results = {'read': 0, 'imported': 0, 'skipped_untagged': 0, 'names': 0}
+        artists, names = [], []
+        start = time.time()
+
+        def flush():
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO artists (mbid, name, disambiguation, tags, votes) "
+                    "VALUES (?, ?, ?, ?, ?)", artists
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO artist_names (name_key, mbid) VALUES (?, ?)", names
+                )
+            artists.clear()
+            names.clear()
+
+        for entity in read_dump(dump_path):
+            results['read'] += 1
+            tags = artist_tags(entity)
+            if tagged_only and not tags:
+                results['skipped_untagged'] += 1
+                continue
+
+            mbid = entity['id']
+            artists.append((mbid, entity.get('name', ''), entity.get('disambiguation', ''),
+                            json.dumps(tags), sum(tag['count'] for tag in tags)))
+
+            spellings = [entity.get('name'), entity.get('sort-name')]
+            spellings += [alias.get('name') for alias in entity.get('aliases') or []]
+            keys = {normalize_artist_name(spelling) for spelling in spellings if spelling}
+            names.extend((key, mbid) for key in keys)
+            results['imported'] += 1
+            results['names'] += len(keys)
+
+            if len(artists) >= batch_size:
+                flush()
+                print(f"  {results['read']:,} read, {results['imported']:,} imported "
+                      f"({time.time() - start:.0f}s)")
+
+        flush()
+
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO dump_info (key, value) VALUES (?, ?)",
+                [('source', dump_path), ('imported_at', time.strftime('%Y-%m-%d %H:%M:%S'))]
+            )
+
+        results['seconds'] = time.time() - start
+        return results
+
+    def lookup(self, artist_name: str) -> Optional[Dict]:
+        """
+        Best indexed artist for a name, as a search-result-style entity
+        An exact (case-insensitive) name match wins over an alias match;
+        ties go to the artist with the most tag votes
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT a.mbid, a.name, a.disambiguation, a.tags, a.votes "
+                "FROM artist_names n JOIN artists a ON a.mbid = n.mbid "
+                "WHERE n.name_key = ?",
+                (normalize_artist_name(artist_name),)
+            ).fetchall()
+
+        if not rows:
+            return None
+
+        wanted = artist_name.casefold()
+        mbid, name, disambiguation, tags, _ = max(
+            rows, key=lambda row: (row[1].casefold() == wanted, row[4])
+        )
+        entity = {
+            'id': mbid,
+            'name': name,
+            'disambiguation': disambiguation,
+            'tags': json.loads(tags)
+        }
+        # Matched through an alias or sort name: report the spelling like a search result would
+        if normalize_artist_name(name) != normalize_artist_name(artist_name):
+            entity['aliases'] = [{'name': artist_name}]
+        return entity
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            artists = self.conn.execute("SELECT COUNT(*) FROM artists").fetchone()[0]
+            names = self.conn.execute("SELECT COUNT(*) FROM artist_names").fetchone()[0]
+            info = dict(self.conn.execute("SELECT key, value FROM dump_info").fetchall())
+        return {'artists': artists, 'names': names, **info}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
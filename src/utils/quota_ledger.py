@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Persistent Quota Ledger for Dōsatsu
+Per-day API quota usage shared by every thread and process on this host
+"""
+
+import json
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: ledger is still shared across threads, not processes
+    fcntl = None
+
+try:
+    from zoneinfo import ZoneInfo
+    PACIFIC = ZoneInfo('America/Los_Angeles')
+except Exception:
+    PACIFIC = None
+
+# Days of history kept in the ledger file
+HISTORY_DAYS = 30
+
+
+class QuotaExceeded(RuntimeError):
+    """The daily quota cannot cover a call"""
+
+
+class QuotaLedger:
+    """
+    Daily quota usage in a small JSON file guarded by an exclusive file lock
+
+    Units are reserved before a call is made, atomically across processes,
+    so concurrent scripts can never overspend the day's quota between them.
+    Days roll over at midnight Pacific time, when YouTube resets quotas.
+    """
+
+    def __init__(self, ledger_file: str, daily_quota: int = 10000):
+        self.ledger_file = ledger_file
+        self.daily_quota = daily_quota
+        self._thread_lock = threading.Lock()
+
+    def today(self) -> str:
+        return datetime.now(PACIFIC).strftime('%Y-%m-%d')
+
+    def _update(self, update):
+        """Read the ledger, apply update(days) -> result, write it back"""
+        with self._thread_lock:
+            with open(self.ledger_file, 'a+') as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        days = json.loads(f.read() or '{}')
+                    except ValueError:
+                        days = {}
+
+                    result = update(days)
+
+                    for day in sorted(days)[:-HISTORY_DAYS]:
+                        del days[day]
+
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(days, indent=2, sort_keys=True))
+                    f.flush()
+                finally:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+        return result
+
+    def reserve(self, operation: str, units: int):
+        """Charge units to today's quota, or raise QuotaExceeded if they don't fit"""
+        def charge(days):
+            day = days.setdefault(self.today(), {'used': 0, 'by_operation': {}})
+            if day['used'] + units > self.daily_quota:
+                raise QuotaExceeded(
+                    f"{operation} needs {units} units, {self.daily_quota - day['used']} left today"
+                )
+            day['used'] += units
+            day['by_operation'][operation] = day['by_operation'].get(operation, 0) + units
+
+        self._update(charge)
+
+    def used(self, day: Optional[str] = None) -> int:
+        day = day or self.today()
+        return self._update(lambda days: days.get(day, {}).get('used', 0))
+
+    def remaining(self) -> int:
+        return max(self.daily_quota - self.used(), 0)
+
+    def history(self) -> Dict[str, Dict]:
+        """Usage per day, oldest first"""
+        return self._update(lambda days: {day: dict(days[day]) for day in sorted(days)})
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Shared Rate Limiter for Dōsatsu
+Schedules requests on a token clock shared by every thread and process on this host
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict
+
+from src.utils.circuit_breaker import response_retry_after
+
+try:
+    import fcntl
+except ImportError:  # Windows: limiter is still shared across threads, not processes
+    fcntl = None
+
+# MusicBrainz allows 1 request per second per client IP
+MUSICBRAINZ_MIN_INTERVAL = 1.0
+
+
+class SharedRateLimiter:
+    """
+    Cross-process request scheduler
+
+    The next free request slot lives in a small state file guarded by an
+    exclusive file lock. Each caller reserves the next slot and sleeps until
+    it arrives, so the interval is measured between request *starts*: time
+    already spent in flight counts toward the wait instead of being added to it.
+    """
+
+    def __init__(self, name: str, min_interval: float, state_dir: str = None):
+        self.name = name
+        self.min_interval = min_interval
+        self.state_dir = state_dir or os.path.join(tempfile.gettempdir(), 'dosatsu_rate_limits')
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.state_file = os.path.join(self.state_dir, f"{name}.json")
+        self._thread_lock = threading.Lock()
+        self.stats = {'acquired': 0, 'waited_seconds': 0.0}
+
+    def _update_clock(self, update) -> float:
+        """Read the shared clock, apply update(next_slot) -> (result, new_next_slot)"""
+        with self._thread_lock:
+            with open(self.state_file, 'a+') as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        next_slot = json.loads(f.read() or '{}').get('next_slot', 0.0)
+                    except ValueError:
+                        next_slot = 0.0
+
+                    result, next_slot = update(next_slot)
+
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps({'next_slot': next_slot}))
+                    f.flush()
+                finally:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+        return result
+
+    def acquire(self):
+        """Block until this caller's request slot arrives"""
+        def reserve(next_slot):
+            slot = max(time.time(), next_slot)
+            return slot, slot + self.min_interval
+
+        slot = self._update_clock(reserve)
+        wait = slot - time.time()
+
+        if wait > 0:
+            time.sleep(wait)
+
+        self.stats['acquired'] += 1
+        self.stats['waited_seconds'] += max(wait, 0.0)
+
+    def defer(self, seconds: float):
+        """Push the shared clock back (e.g. after a 503 or Retry-After)"""
+        def push(next_slot):
+            return None, max(next_slot, time.time() + seconds)
+
+        self._update_clock(push)
+
+    def defer_unavailable(self, response):
+        """After a 503, push the clock back by its Retry-After (1s if missing or unparseable)"""
+        if response.status_code == 503:
+            self.defer(response_retry_after(response) or 1.0)
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, min_interval: float) -> SharedRateLimiter:
+    """One limiter instance per service name in this process"""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = SharedRateLimiter(name, min_interval)
+        return _limiters[name]
+
+
+def get_musicbrainz_limiter() -> SharedRateLimiter:
+    """
+    Limiter shared by every MusicBrainz client
+    DOSATSU_MUSICBRAINZ_INTERVAL overrides the interval, for load tests against a mock server
+    """
+    interval = float(os.getenv('DOSATSU_MUSICBRAINZ_INTERVAL', MUSICBRAINZ_MIN_INTERVAL))
+    return get_rate_limiter('musicbrainz', interval)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test the Append-Only Cache Store
+Log replay after a crash, compaction, and per-entry write times for TTLs
+"""
+
+import json
+import os
+import tempfile
+import time
+from src.utils.cache_store import CacheTTL, JSONLogCache
+
+
+def test_log_replay_and_compaction():
+    """Writes survive a reopen through the log, and compact() folds them into the snapshot"""
+    print("="*70)
+    print("TESTING CACHE LOG REPLAY AND COMPACTION")
+    print("="*70)
+    print()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, 'genre_cache.json')
+
+        cache = JSONLogCache(cache_file)
+        cache['Drake'] = {'dosatsu_genre': 'Hip-Hop'}
+        cache['Nobody'] = None
+        cache['Adele'] = {'dosatsu_genre': 'Pop'}
+        del cache['Adele']
+        cache.close()
+
+        # Nothing compacted yet: the snapshot doesn't exist, the log holds every write
+        assert not os.path.exists(cache_file)
+        with open(f"{cache_file}.log") as f:
+            print(f"  Log entries before compaction: {len(f.readlines())}")
+
+        # A crash mid-write leaves a torn final line
+        with open(f"{cache_file}.log", 'a') as f:
+            f.write('{"k": "Torn", "v": {"dosatsu_')
+
+        reopened = JSONLogCache(cache_file)
+        assert dict(reopened) == {'Drake': {'dosatsu_genre': 'Hip-Hop'}, 'Nobody': None}
+        print(f"  Replayed after torn write: {sorted(reopened)}")
+
+        # The next append starts on a fresh line instead of joining the torn one
+        reopened['Sza'] = {'dosatsu_genre': 'R&B'}
+        reopened.close()
+        assert JSONLogCache(cache_file)['Sza'] == {'dosatsu_genre': 'R&B'}
+
+        reopened = JSONLogCache(cache_file)
+        reopened.compact()
+        assert not os.path.exists(f"{cache_file}.log")
+        with open(cache_file) as f:
+            snapshot = json.load(f)
+        assert snapshot == dict(reopened)
+        assert JSONLogCache(cache_file) == reopened
+        print(f"  Compacted snapshot: {sorted(snapshot)}")
+
+        # Hitting compact_every compacts automatically
+        small = JSONLogCache(os.path.join(tmp, 'small.json'), compact_every=3)
+        for i in range(3):
+            small[f"artist {i}"] = i
+        assert not os.path.exists(small.log_file)
+        assert len(JSONLogCache(small.cache_file)) == 3
+
+    print()
+    print("✓ Log replay and compaction keep every complete write")
+    print()
+
+
+def test_write_times():
+    """Write times survive replay and compaction, so TTLs don't restart on reopen"""
+    print("="*70)
+    print("TESTING CACHE WRITE TIMES AND TTL")
+    print("="*70)
+    print()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, 'genre_cache.json')
+
+        cache = JSONLogCache(cache_file)
+        cache['Drake'] = {'dosatsu_genre': 'Hip-Hop'}
+        cache['Nobody'] = None
+        written = cache.updated_at('Drake')
+        cache.close()
+
+        # Replayed from the log with its original time
+        assert JSONLogCache(cache_file).updated_at('Drake') == written
+
+        # Kept in the .times sidecar through compaction
+        cache = JSONLogCache(cache_file)
+        cache.compact()
+        with open(f"{cache_file}.times") as f:
+            assert json.load(f)['Drake'] == written
+        assert JSONLogCache(cache_file).updated_at('Drake') == written
+
+        # touch() refreshes the time without rewriting the value
+        time.sleep(0.01)
+        cache = JSONLogCache(cache_file)
+        cache.touch('Drake')
+        cache.close()
+        touched = JSONLogCache(cache_file).updated_at('Drake')
+        assert touched > written
+        print(f"  Touched entry moved forward {touched - written:.3f}s")
+
+        # Misses and hits expire on their own TTLs
+        ttl = CacheTTL(positive_ttl=100, negative_ttl=10)
+        cache = JSONLogCache(cache_file)
+        now = cache.updated_at('Nobody')
+        assert not ttl.is_expired(cache, 'Nobody', now + 5)
+        assert ttl.is_expired(cache, 'Nobody', now + 20)
+        assert not ttl.is_expired(cache, 'Drake', now + 20)
+        assert ttl.expired_keys(cache, now + 200) == ['Drake', 'Nobody']
+
+        # Snapshots written before the sidecar existed are dated by the snapshot file
+        legacy_file = os.path.join(tmp, 'legacy_cache.json')
+        with open(legacy_file, 'w') as f:
+            json.dump({'Drake': {'dosatsu_genre': 'Hip-Hop'}}, f)
+        legacy = JSONLogCache(legacy_file)
+        assert legacy.updated_at('Drake') == os.path.getmtime(legacy_file)
+
+    print()
+    print("✓ Write times drive TTLs across reopens and compaction")
+    print()
+
+
+if __name__ == "__main__":
+    test_log_replay_and_compaction()
+    test_write_times()
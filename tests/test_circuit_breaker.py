@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test the Circuit Breaker and Retry Queue
+State transitions with short backoffs, and retries of transiently failed work
+"""
+
+import time
+import requests
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpen, RetryQueue, is_transient, retry_after
+
+
+def http_error(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status_code} error", response=response)
+
+
+def test_breaker_transitions():
+    """closed → open → half_open → open (backoff doubled) → half_open → closed"""
+    print("="*70)
+    print("TESTING CIRCUIT BREAKER TRANSITIONS")
+    print("="*70)
+    print()
+
+    breaker = CircuitBreaker('test', failure_threshold=0.5, window=10, min_calls=4,
+                             base_delay=0.1, max_delay=1.0, seed=44)
+
+    # Failures below min_calls never open the circuit
+    for success in (False, False, False):
+        assert breaker.allow()
+        breaker.record(success)
+    assert breaker.state == 'closed'
+
+    # The fourth outcome reaches min_calls with 100% failures
+    breaker.record(False)
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    first_wait = breaker.retry_in()
+    assert 0.05 <= first_wait <= 0.1
+    print(f"  open: retry in {first_wait:.3f}s")
+
+    # After the backoff a single probe is let through
+    time.sleep(first_wait + 0.01)
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()  # Only the probe
+
+    # A failed probe reopens with the backoff doubled
+    breaker.record(False)
+    assert breaker.state == 'open'
+    second_wait = breaker.retry_in()
+    assert 0.1 <= second_wait <= 0.2
+    print(f"  reopened: retry in {second_wait:.3f}s")
+
+    # Retry-After from the service wins over a shorter backoff
+    time.sleep(second_wait + 0.01)
+    assert breaker.allow()
+    breaker.record(False, retry_after=0.5)
+    assert breaker.retry_in() > 0.4
+
+    # A successful probe closes it and starts a fresh window
+    time.sleep(breaker.retry_in() + 0.01)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == 'closed'
+    assert breaker.retry_in() == 0.0
+    for success in (True, False, True, False):
+        breaker.record(success)
+    assert breaker.state == 'open'  # 50% failures reaches the threshold
+
+    stats = breaker.get_stats()
+    print(f"  stats: {stats}")
+    assert stats['opened'] == 4
+    assert stats['probes'] == 3
+    assert stats['rejected'] == 2
+
+    print()
+    print("✓ Breaker opens, probes and closes as configured")
+    print()
+
+
+def test_transient_errors():
+    """Only connection problems, 429 and 5xx are retried"""
+    assert is_transient(requests.ConnectionError())
+    assert is_transient(requests.Timeout())
+    assert is_transient(CircuitOpen('open', retry_after=3))
+    assert is_transient(http_error(429))
+    assert is_transient(http_error(503))
+    assert not is_transient(http_error(404))
+    assert not is_transient(ValueError())
+
+    assert retry_after(http_error(429, {'Retry-After': '7'})) == 7.0
+    assert retry_after(http_error(503, {'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'})) == 0.0
+    assert retry_after(CircuitOpen('open', retry_after=3)) == 3
+
+
+def test_retry_queue():
+    """Items are retried with backoff until they succeed or run out of attempts"""
+    print("="*70)
+    print("TESTING RETRY QUEUE")
+    print("="*70)
+    print()
+
+    queue = RetryQueue(max_attempts=3, base_delay=0.01, max_delay=0.05, seed=44)
+    calls = {}
+    outcomes = {
+        'recovers': [http_error(503), None],
+        'always down': [requests.ConnectionError()] * 5,
+    }
+
+    def fn(item):
+        calls[item] = calls.get(item, 0) + 1
+        error = outcomes[item][calls[item] - 1]
+        if error is not None:
+            raise error
+
+    for item in outcomes:
+        queue.add(item)
+    assert len(queue) == 2
+
+    results = queue.drain(fn)
+    print(f"  drain: {results}, calls: {calls}")
+    # max_attempts counts retries after the original failure
+    assert results == {'retried': 5, 'recovered': 1, 'failed': 1}
+    assert calls == {'recovers': 2, 'always down': 3}
+    assert queue.failed == ['always down']
+    assert len(queue) == 0
+
+    # A non-transient error is a real answer and propagates
+    def not_found(item):
+        raise http_error(404)
+
+    queue.add('gone')
+    try:
+        queue.drain(not_found)
+        assert False, "404 should not be retried"
+    except requests.HTTPError:
+        pass
+
+    # Items not due within max_wait are handed back as failed instead of waited on
+    slow = RetryQueue(seed=44)
+    slow.add('later', retry_after=60)
+    results = slow.drain(fn, max_wait=0.1)
+    assert results == {'retried': 0, 'recovered': 0, 'failed': 1}
+    assert slow.failed == ['later']
+
+    print()
+    print("✓ Retry queue recovers transient failures and gives up on the rest")
+    print()
+
+
+if __name__ == "__main__":
+    test_breaker_transitions()
+    test_transient_errors()
+    test_retry_queue()
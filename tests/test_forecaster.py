@@ -4,7 +4,14 @@ Test script for GenreForecaster
 Validates forecasting on historical Billboard data
 """
 
-from genre_forecaster import GenreForecaster
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from analysis.genre_forecaster import GenreForecaster
 import pandas as pd
 
 print('='*70)
@@ -47,7 +54,7 @@ print()
 
 # Test forecasting on Hip-Hop
 print('Step 4: Testing forecast for Hip-Hop...')
-print('Training Prophet model (this may take 20-30 seconds)...')
+print(f'Fitting {forecaster.backend.label} model...')
 forecast_quarters = forecaster.forecast_quarterly('Hip-Hop', quarters=4)
 
 print('✓ Forecast complete!')
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the Compiled Genre Matcher
+The Aho-Corasick mapping must pick exactly what the original substring loops picked
+"""
+
+import os
+import random
+import tempfile
+from src.spotify_genre_classifier import SpotifyGenreClassifier
+from src.musicbrainz_classifier import MusicBrainzClassifier
+from src.utils.genre_matcher import GenreMatcher
+
+# Words that appear in real genre strings but match no mapping term
+FILLER = ['modern', 'classic', 'canadian', 'atl', 'brazilian', 'lo-fi', 'new', 'deep', 'italian']
+
+
+def substring_spotify_genre(genre_mapping, spotify_genres):
+    """The substring loop SpotifyGenreClassifier used before the matcher (without the fallback)"""
+    category_scores = {}
+    for genre in spotify_genres:
+        genre_lower = genre.lower()
+        for spotify_term, dosatsu_category in genre_mapping.items():
+            if spotify_term in genre_lower:
+                category_scores[dosatsu_category] = category_scores.get(dosatsu_category, 0) + 1
+    if category_scores:
+        return max(category_scores, key=category_scores.get)
+    return None
+
+
+def substring_mb_genre(tag_mapping, tags):
+    """The substring loop MusicBrainzClassifier used before the matcher"""
+    tags_lower = [tag.lower() for tag in tags]
+    genre_scores = {}
+    for genre, keywords in tag_mapping.items():
+        score = 0
+        for tag in tags_lower:
+            for keyword in keywords:
+                if keyword in tag:
+                    position_weight = 1.0 - (tags_lower.index(tag) * 0.05)
+                    score += max(position_weight, 0.5)
+        if score > 0:
+            genre_scores[genre] = score
+    if genre_scores:
+        return max(genre_scores.items(), key=lambda x: x[1])[0]
+    return 'Unknown'
+
+
+def random_strings(rng, terms, count):
+    """Genre/tag strings built from mapping terms, overlaps and filler words"""
+    strings = []
+    for _ in range(count):
+        words = rng.sample(terms, rng.randint(0, 2)) + rng.sample(FILLER, rng.randint(0, 2))
+        rng.shuffle(words)
+        text = ' '.join(words) or rng.choice(FILLER)
+        strings.append(text.upper() if rng.random() < 0.1 else text)
+    return strings
+
+
+def test_matcher_terms():
+    """match_terms finds every contained term, overlapping ones included"""
+    print("="*70)
+    print("TESTING GENRE MATCHER TERMS")
+    print("="*70)
+    print()
+
+    terms = [('hip hop', 'Hip-Hop'), ('southern hip hop', 'Hip-Hop'), ('hop', 'X'),
+             ('pop', 'Pop'), ('pop rap', 'Pop'), ('rap', 'Hip-Hop')]
+    matcher = GenreMatcher(terms)
+    rng = random.Random(34)
+    for text in ['southern hip hop', 'pop rap', 'Dirty South Hip Hop', 'k-pop', 'trap', 'rock']:
+        expected = [index for index, (term, _) in enumerate(terms) if term in text.lower()]
+        assert matcher.match_terms(text) == expected, text
+    for text in random_strings(rng, [term for term, _ in terms], 500):
+        expected = [index for index, (term, _) in enumerate(terms) if term in text.lower()]
+        assert matcher.match_terms(text) == expected, text
+
+    # Categories come out in the order of their first matching term
+    assert list(matcher.category_counts('pop rap hip hop')) == ['Hip-Hop', 'X', 'Pop']
+    print("✓ Every overlapping term found, in table order")
+    print()
+
+
+def test_classifiers_match_substring_loops():
+    """Both classifiers map random genre lists exactly like the substring loops, ties included"""
+    print("="*70)
+    print("TESTING MATCHER AGAINST SUBSTRING LOOPS")
+    print("="*70)
+    print()
+
+    rng = random.Random(2024)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spotify = SpotifyGenreClassifier('id', 'secret', cache_file=os.path.join(tmp, 'spotify.json'))
+        terms = list(spotify.genre_mapping)
+        compared = 0
+        for _ in range(2000):
+            genres = random_strings(rng, terms, rng.randint(1, 5))
+            expected = substring_spotify_genre(spotify.genre_mapping, genres)
+            if expected is not None:  # The first-genre fallback is unchanged
+                assert spotify._map_to_dosatsu_genre(genres) == expected, genres
+                compared += 1
+
+        # Ties go to the category whose term matched first
+        matcher = spotify._get_genre_matcher()
+        assert matcher.category_counts('country') == {'Country': 1}
+        assert matcher.category_counts('boy band') == {'Pop': 1}
+        assert spotify._map_to_dosatsu_genre(['country', 'boy band']) == 'Country'
+        assert spotify._map_to_dosatsu_genre(['boy band', 'country']) == 'Pop'
+        print(f"  Spotify: {compared} genre lists mapped identically")
+
+        musicbrainz = MusicBrainzClassifier(cache_file=os.path.join(tmp, 'musicbrainz.json'), offline=True)
+        keywords = [keyword for words in musicbrainz.tag_mapping.values() for keyword in words]
+        for _ in range(2000):
+            tags = random_strings(rng, keywords, rng.randint(1, 20))
+            assert musicbrainz._map_tags_to_genre(tags) == substring_mb_genre(musicbrainz.tag_mapping, tags), tags
+
+        # Equal scores: the genre listed first in tag_mapping wins, whatever the word order
+        for tag in ['salsa bluegrass', 'bluegrass salsa']:
+            assert musicbrainz._map_tags_to_genre([tag]) == 'Country'
+            assert substring_mb_genre(musicbrainz.tag_mapping, [tag]) == 'Country'
+        print("  MusicBrainz: 2000 tag lists mapped identically")
+
+    print()
+    print("✓ Compiled matcher agrees with the substring loops")
+    print()
+
+
+if __name__ == "__main__":
+    test_matcher_terms()
+    test_classifiers_match_substring_loops()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test Offline MusicBrainz Dump Lookups
+Imports a small fixture dump and classifies artists without touching the web API
+"""
+
+import os
+import tempfile
+from src.utils.musicbrainz_dump import MusicBrainzDump
+from src.musicbrainz_classifier import MusicBrainzClassifier
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'musicbrainz_artist_dump.jsonl')
+
+
+def test_dump_classification():
+    """Import the fixture and classify chart spellings offline"""
+    print("="*70)
+    print("TESTING MUSICBRAINZ DUMP IMPORT")
+    print("="*70)
+    print()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = MusicBrainzDump(os.path.join(tmp, 'musicbrainz_dump.db'))
+        results = dump.import_dump(FIXTURE)
+        print(f"Imported {results['imported']} of {results['read']} artists "
+              f"({results['skipped_untagged']} untagged skipped, {results['names']} names indexed)")
+        assert results['imported'] == 5
+        assert results['skipped_untagged'] == 1
+
+        # Spelling variants, sort names and aliases all resolve
+        assert dump.lookup('Beyonce')['name'] == 'Beyoncé'
+        assert dump.lookup('Diana Ross & The Supremes')['name'] == 'The Supremes'
+        assert dump.lookup('Supremes')['name'] == 'The Supremes'
+
+        # Name clash: the artist with the most tag votes wins
+        assert dump.lookup('Prince')['disambiguation'] == 'US singer-songwriter'
+
+        # Downvoted tags are dropped
+        assert 'overrated' not in [tag['name'] for tag in dump.lookup('Michael Jackson')['tags']]
+        assert dump.lookup('The Untagged Quartet') is None
+        dump.close()
+
+        classifier = MusicBrainzClassifier(
+            cache_file=os.path.join(tmp, 'musicbrainz_cache.json'),
+            dump_db=os.path.join(tmp, 'musicbrainz_dump.db'),
+            offline=True
+        )
+
+        expected = {
+            'Michael Jackson': 'Pop',
+            'Diana Ross & The Supremes': 'R&B',
+            'Beyonce': 'R&B'
+        }
+        for artist, genre in expected.items():
+            result = classifier.classify_artist(artist)
+            print(f"  {artist:<30} → {result['dosatsu_genre']:<10} (tags: {', '.join(result['tags'][:3])})")
+            assert result['dosatsu_genre'] == genre
+
+        # Offline misses are not cached, so an online run still tries the API
+        assert classifier.classify_artist('Nobody In The Dump') is None
+        assert 'Nobody In The Dump' not in classifier.cache
+
+        report = classifier.get_cost_report()
+        print(f"  API calls made: {report['calls_made']}, dump hits: {report['dump_hits']}")
+        assert report['calls_made'] == 0
+        assert report['dump_hits'] == len(expected)
+
+    print()
+    print("✓ Dump lookups classified every artist without an API call")
+    print()
+
+
+if __name__ == "__main__":
+    test_dump_classification()